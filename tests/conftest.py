@@ -0,0 +1,27 @@
+import pytest
+
+from xrocket.simulation import simulate
+from xrocket.telemetry import TelemetryRecorder
+
+
+@pytest.fixture
+def fly():
+    # fly(rocket, t_end, dt, **kwargs) simulates rocket, kwargs as for simulate, and returns
+    # the telemetry rows recorded every step
+    def fly(rocket, t_end, dt, **kwargs):
+        telemetry = TelemetryRecorder.for_run(t_end, dt)
+
+        def record(t, rocket):
+            telemetry.record(
+                t,
+                rocket,
+                rocket.core_stage,
+                rocket.srb_stage,
+                rocket.interim_stage,
+                rocket.exploration_stage,
+            )
+
+        simulate(rocket, t_end, dt=dt, callback=record, **kwargs)
+        return telemetry.rows
+
+    return fly
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from xrocket.atmosphere import (
+    ATMOSPHERE_TOP,
+    GEOPOTENTIAL_RADIUS,
+    LAYERS,
+    _standard_atmosphere,
+    atmosphere,
+)
+
+# Base geopotential altitude (m), temperature (K) and pressure (Pa) of each layer in the
+# tables of the U.S. Standard Atmosphere 1976
+LAYER_BASES = [
+    (0, 288.15, 101325.0),
+    (11000, 216.65, 22632.06),
+    (20000, 216.65, 5474.889),
+    (32000, 228.65, 868.0187),
+    (47000, 270.65, 110.9063),
+    (51000, 270.65, 66.93887),
+    (71000, 214.65, 3.956420),
+]
+
+
+def geometric(h):
+    return GEOPOTENTIAL_RADIUS * h / (GEOPOTENTIAL_RADIUS - h)
+
+
+def test_layers_start_at_the_table_boundaries():
+    assert [(base, t) for base, t, _ in LAYERS] == [(base, t) for base, t, _ in LAYER_BASES]
+
+
+@pytest.mark.parametrize("h, temperature, pressure", LAYER_BASES)
+def test_layer_boundaries_match_the_1976_tables(h, temperature, pressure):
+    # The layers below and above a boundary meet there
+    for offset in (-1e-6, 0, 1e-6):
+        t, p = _standard_atmosphere(geometric(h) + offset)
+        assert t == pytest.approx(temperature, abs=1e-6)
+        assert p == pytest.approx(pressure, rel=1e-5)
+
+
+def test_sea_level():
+    density, temperature, speed_of_sound = atmosphere(0.0)
+    assert density == pytest.approx(1.2250, rel=1e-4)
+    assert temperature == 288.15
+    assert speed_of_sound == pytest.approx(340.294, rel=1e-5)
+    assert atmosphere(-100.0) == atmosphere(0.0)
+
+
+def test_above_the_tables():
+    density, temperature, speed_of_sound = atmosphere(ATMOSPHERE_TOP + 1.0)
+    assert density == 0
+    assert (temperature, speed_of_sound) == atmosphere(float(ATMOSPHERE_TOP))[1:]
+
+
+def test_arrays_match_scalars():
+    altitudes = np.array([-10.0, 0.0, 5432.1, 11019.0, 47350.0, 85999.0, 90000.0])
+    densities, temperatures, speeds = atmosphere(altitudes)
+    for index, altitude in enumerate(altitudes):
+        expected = atmosphere(float(altitude))
+        assert densities[index] == pytest.approx(expected[0], rel=1e-12, abs=1e-15)
+        assert temperatures[index] == pytest.approx(expected[1], rel=1e-12)
+        assert speeds[index] == pytest.approx(expected[2], rel=1e-12)
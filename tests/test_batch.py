@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from xrocket.batch import BatchRocket, build_batch
+from xrocket.settings import (
+    CORE_STAGE,
+    EARTH_MASS,
+    EARTH_RADIUS,
+    EXPLORATION_UPPER_STAGE,
+    INTERIM_CRYOGENIC_STAGE,
+    SOLID_ROCKET_BOOSTERS,
+)
+from xrocket.simulation import build_rocket, build_vehicle
+from xrocket.vehicle import load_vehicle
+
+TWO_STAGE = os.path.join(
+    os.path.dirname(__file__), os.pardir, "xrocket", "data", "vehicles", "two_stage.json"
+)
+
+# Every vehicle of a batch flies as a scalar Rocket with the same settings, up to rounding
+# in the vectorized sums
+TOLERANCE = 1e-9
+
+
+def test_batch_columns_match_scalar_rockets():
+    mass_flows = [-2060.0, -2000.0, -2120.0]
+    core = dict(CORE_STAGE, **{"Mass Flow": np.array(mass_flows)})
+    batch = BatchRocket(
+        [core, SOLID_ROCKET_BOOSTERS, INTERIM_CRYOGENIC_STAGE, EXPLORATION_UPPER_STAGE],
+        EARTH_MASS,
+        EARTH_RADIUS,
+        n=len(mass_flows),
+    )
+    rockets = [build_rocket({"CORE_STAGE.Mass Flow": mass_flow}) for mass_flow in mass_flows]
+    # Past the booster and core stage burnouts of every vehicle
+    for _ in range(6000):
+        batch.update(0.1)
+        for rocket in rockets:
+            rocket.update(0.1)
+
+    for column, rocket in enumerate(rockets):
+        assert rocket.current_stage == "Interim"
+        assert batch.current_stage[column] == rocket.current_stage
+        np.testing.assert_allclose(batch.pos[column], rocket.pos, rtol=TOLERANCE)
+        np.testing.assert_allclose(
+            batch.rocket_velocity[column], rocket.rocket_velocity, rtol=TOLERANCE
+        )
+        np.testing.assert_allclose(
+            batch.prop_mass[column], rocket.stages.prop_mass, rtol=TOLERANCE, atol=1e-6
+        )
+        assert batch.theta[column] == rocket.theta
+
+
+def test_batch_flies_custom_vehicles():
+    mass_flows = [-2800.0, -2700.0]
+    vehicle = load_vehicle(TWO_STAGE)
+    batch = build_batch(
+        dict(
+            vehicle,
+            stages=dict(
+                vehicle["stages"],
+                Booster=dict(vehicle["stages"]["Booster"], **{"Mass Flow": np.array(mass_flows)}),
+            ),
+        ),
+        n=len(mass_flows),
+    )
+    rockets = []
+    for mass_flow in mass_flows:
+        vehicle = load_vehicle(TWO_STAGE)
+        vehicle["stages"]["Booster"]["Mass Flow"] = mass_flow
+        rockets.append(build_vehicle(vehicle))
+    # Past the booster burnout of every vehicle
+    for _ in range(2000):
+        batch.update(0.1)
+        for rocket in rockets:
+            rocket.update(0.1)
+
+    for column, rocket in enumerate(rockets):
+        assert rocket.current_stage == batch.current_stage[column] == "Upper"
+        assert batch.theta[column] == rocket.theta == 120
+        np.testing.assert_allclose(batch.pos[column], rocket.pos, rtol=TOLERANCE)
+        np.testing.assert_allclose(
+            batch.prop_mass[column], rocket.stages.prop_mass, rtol=TOLERANCE, atol=1e-6
+        )
+        assert list(batch.attached[column]) == [False, True]
+
+
+def test_positional_stages_are_deprecated():
+    with pytest.deprecated_call():
+        batch = BatchRocket(
+            CORE_STAGE,
+            SOLID_ROCKET_BOOSTERS,
+            INTERIM_CRYOGENIC_STAGE,
+            EXPLORATION_UPPER_STAGE,
+            EARTH_MASS,
+            EARTH_RADIUS,
+            n=2,
+        )
+    assert batch.prop_mass.shape == (2, 4)
+
+
+def test_stages_must_match_the_staging_table():
+    with pytest.raises(ValueError):
+        BatchRocket([CORE_STAGE], EARTH_MASS, EARTH_RADIUS, n=2)
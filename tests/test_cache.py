@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from xrocket import cache
+from xrocket.cache import SUMMARY_FILE, ResultsCache, scenario_key
+from xrocket.settings import CORE_STAGE
+
+SUMMARY = {"Max Altitude": 1000.0, "Max Velocity": 100.0}
+
+
+def test_scenario_key_is_stable():
+    key = scenario_key({"CORE_STAGE.Mass Flow": -2000}, t_end=100, dt=0.1)
+    assert key == scenario_key({"CORE_STAGE.Mass Flow": -2000}, t_end=100, dt=0.1)
+    assert len(key) == 64
+    # Overriding a setting with its own value is the same flight
+    assert scenario_key() == scenario_key({"CORE_STAGE.Mass Flow": CORE_STAGE["Mass Flow"]})
+    # Tolerances only matter to rk45
+    assert scenario_key(rtol=1e-3) == scenario_key(rtol=1e-9)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"overrides": {"CORE_STAGE.Mass Flow": -2000}},
+        {"t_end": 100},
+        {"dt": 0.1},
+        {"integrator": "rk4"},
+        {"stop": [("impact", None)]},
+        {"coast": True},
+        {"rates": {"drag": 1.0}},
+        {"start": 10.0},
+        {"gravity": {"model": "j2"}},
+    ],
+)
+def test_scenario_key_changes_with_the_flight(changes):
+    assert scenario_key(**changes) != scenario_key()
+
+
+def test_scenario_key_changes_with_the_model_version(monkeypatch):
+    key = scenario_key()
+    monkeypatch.setattr(cache, "MODEL_VERSION", cache.MODEL_VERSION + 1)
+    assert scenario_key() != key
+
+
+def test_rk45_tolerances_change_the_key():
+    assert scenario_key(integrator="rk45", rtol=1e-3) != scenario_key(
+        integrator="rk45", rtol=1e-9
+    )
+
+
+def test_put_writes_under_a_temporary_name(tmp_path):
+    results = ResultsCache(tmp_path)
+    final = tmp_path / "key" / SUMMARY_FILE
+    written = []
+
+    def write(path):
+        # Until the rename readers find nothing
+        assert not final.exists()
+        assert results.get_summary("key") is None
+        assert os.path.basename(path) != SUMMARY_FILE
+        written.append(path)
+        with open(path, "w") as summary_file:
+            summary_file.write('{"Max Altitude": 1.0}')
+
+    results._put("key", SUMMARY_FILE, write)
+    assert not os.path.exists(written[0])
+    assert os.listdir(tmp_path / "key") == [SUMMARY_FILE]
+    assert results.get_summary("key") == {"Max Altitude": 1.0}
+
+
+def test_summary_round_trip(tmp_path):
+    results = ResultsCache(tmp_path)
+    assert results.get_summary("key") is None
+    results.put_summary("key", SUMMARY)
+    assert results.get_summary("key") == SUMMARY
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    results = ResultsCache(tmp_path)
+    for age, key in enumerate(["newest", "middle", "oldest"]):
+        results.put_summary(key, SUMMARY)
+        used = 1_000_000 - 100 * age
+        os.utime(tmp_path / key, (used, used))
+    # A hit marks the oldest entry as used just now
+    assert results.get_summary("oldest") == SUMMARY
+    entry_size = results.size() // 3
+    results.max_bytes = 2 * entry_size
+    results.evict()
+    assert sorted(os.listdir(tmp_path)) == ["newest", "oldest"]
+    assert results.size() <= results.max_bytes
@@ -0,0 +1,24 @@
+import numpy as np
+
+from xrocket.coast import coasting
+from xrocket.simulation import build_rocket
+
+# The last stage burns out at about 1600 s, the rocket then coasts above the atmosphere
+T_END = 3000
+DT = 0.1
+# Closed form arcs are exact, euler steps of 0.1 s drift from them by about 3e-5
+TOLERANCE = 1e-4
+
+
+def test_coast_matches_stepped_flight(fly):
+    stepped_rocket = build_rocket()
+    stepped = fly(stepped_rocket, T_END, DT, coast=False)
+    coasted_rocket = build_rocket()
+    coasted = fly(coasted_rocket, T_END, DT, coast=True)
+    assert coasting(stepped_rocket)
+    np.testing.assert_array_equal(coasted["Time"], stepped["Time"])
+    for channel in ("X Position", "Altitude", "Velocity", "Current Total Mass"):
+        np.testing.assert_allclose(
+            coasted[channel], stepped[channel], rtol=TOLERANCE, err_msg=channel
+        )
+    np.testing.assert_allclose(coasted_rocket.pos, stepped_rocket.pos, rtol=TOLERANCE)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from xrocket.decimate import DECIMATION_METHODS, decimate, minmax_indices
+
+ROWS = 30001
+
+
+def telemetry():
+    t = np.linspace(0, 3000, ROWS)
+    return {
+        "Time": t,
+        "Altitude": t**2,
+        "Velocity": np.sin(t / 50) * t,
+        "Thrust": np.where(t < 500, 1e7, 0.0),
+        "Drag Force": np.exp(-((t - 80) ** 2) / 100),
+        "Noise": np.random.default_rng(1).normal(size=ROWS),
+    }
+
+
+@pytest.mark.parametrize("method", DECIMATION_METHODS)
+@pytest.mark.parametrize("max_points", [1, 2, 3, 10, 1000])
+def test_decimated_telemetry_keeps_at_most_max_points_rows(method, max_points):
+    reduced = decimate(telemetry(), max_points, method=method)
+    assert 0 < len(reduced["Time"]) <= max_points
+    assert all(len(column) == len(reduced["Time"]) for column in reduced.values())
+    assert np.all(np.diff(reduced["Time"]) > 0)
+
+
+def test_minmax_keeps_extremes_within_max_points():
+    data = telemetry()
+    indices = minmax_indices(data["Time"], data["Noise"], 1000)
+    assert len(indices) <= 1000
+    assert np.argmin(data["Noise"]) in indices
+    assert np.argmax(data["Noise"]) in indices
+
+
+def test_decimate_keeps_every_row_below_max_points():
+    reduced = decimate(telemetry(), ROWS, method="lttb")
+    assert len(reduced["Time"]) == ROWS
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from xrocket.drag import DEFAULT_DRAG_CURVE, DragCurve, load_drag_curve
+
+MACH = [0.0, 0.9, 1.125, 1.375, 1.75]
+DRAG_COEFFICIENT = [0.25, 0.25, 0.60, 0.65, 0.55]
+
+
+@pytest.mark.parametrize("method", ["linear", "pchip"])
+def test_passes_through_the_points_and_holds_outside(method):
+    curve = DragCurve(MACH, DRAG_COEFFICIENT, method=method)
+    for mach, drag_coefficient in zip(MACH, DRAG_COEFFICIENT):
+        assert curve(mach) == pytest.approx(drag_coefficient, abs=1e-12)
+    assert curve(-1.0) == 0.25
+    assert curve(10.0) == 0.55
+
+
+def test_linear_interpolates_between_points():
+    curve = DragCurve(MACH, DRAG_COEFFICIENT, method="linear")
+    assert curve(1.0) == pytest.approx(0.25 + 0.35 * 0.1 / 0.225)
+    assert curve(1.25) == pytest.approx(0.625)
+
+
+@pytest.mark.parametrize("method", ["linear", "pchip"])
+def test_monotone_across_mach_1(method):
+    # The transonic rise and the fall after the peak stay monotone, without overshooting
+    # the points or dipping below the subsonic plateau
+    curve = load_drag_curve(DEFAULT_DRAG_CURVE, method)
+    subsonic = curve(np.linspace(0.0, 0.9, 200))
+    np.testing.assert_allclose(subsonic, 0.25, atol=1e-12)
+    rise = curve(np.linspace(0.9, 1.375, 500))
+    assert np.all(np.diff(rise) >= -1e-12)
+    fall = curve(np.linspace(1.375, 9.0, 2000))
+    assert np.all(np.diff(fall) <= 1e-12)
+    assert rise.max() == pytest.approx(0.65)
+
+
+@pytest.mark.parametrize("method", ["linear", "pchip"])
+def test_arrays_match_scalars(method):
+    curve = DragCurve(MACH, DRAG_COEFFICIENT, method=method)
+    mach = np.linspace(-0.5, 2.5, 301)
+    np.testing.assert_allclose(curve(mach), [curve(float(value)) for value in mach], rtol=1e-12)
+
+
+def test_pchip_is_smooth_where_linear_has_a_kink():
+    linear = DragCurve(MACH, DRAG_COEFFICIENT, method="linear")
+    pchip = DragCurve(MACH, DRAG_COEFFICIENT, method="pchip")
+    step = 1e-6
+
+    def slope_jump(curve, mach):
+        return abs(
+            (curve(mach + step) - curve(mach)) - (curve(mach) - curve(mach - step))
+        ) / step
+
+    assert slope_jump(linear, 1.125) > 1
+    assert slope_jump(pchip, 1.125) < 1e-3
+
+
+@pytest.mark.parametrize(
+    "mach, drag_coefficient, method",
+    [
+        ([0.0], [0.25], "pchip"),
+        ([0.0, 1.0], [0.25], "pchip"),
+        ([0.0, 1.0, 1.0], [0.25, 0.5, 0.4], "pchip"),
+        ([0.0, 1.0], [0.25, 0.5], "cubic"),
+    ],
+)
+def test_invalid_curves(mach, drag_coefficient, method):
+    with pytest.raises(ValueError):
+        DragCurve(mach, drag_coefficient, method=method)
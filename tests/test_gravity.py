@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from xrocket.gravity import J2Gravity, PointMassGravity, earth_gravity, gravity_acceleration_calc
+from xrocket.settings import EARTH_J2, EARTH_MASS, EARTH_RADIUS
+from xrocket.simulation import build_rocket
+
+ALTITUDES = np.array([0.0, 1e4, 2e5, 3.6e7])
+
+
+def test_point_mass_matches_gravity_acceleration_calc():
+    gravity = PointMassGravity(EARTH_MASS, EARTH_RADIUS)
+    for altitude in ALTITUDES:
+        assert gravity.acceleration(altitude) == gravity_acceleration_calc(
+            EARTH_MASS, EARTH_RADIUS, altitude
+        )
+    assert gravity.acceleration(0.0) == pytest.approx(-9.82, abs=0.01)
+
+
+@pytest.mark.parametrize("latitude", [0.0, 28.5, 90.0])
+def test_j2_of_zero_is_point_mass(latitude):
+    point_mass = PointMassGravity(EARTH_MASS, EARTH_RADIUS)
+    j2 = J2Gravity(EARTH_MASS, EARTH_RADIUS, 0.0, latitude)
+    np.testing.assert_array_equal(j2.acceleration(ALTITUDES), point_mass.acceleration(ALTITUDES))
+    x = np.array([0.0, 1e5, -3e6])
+    y = np.array([0.0, 2e5, 1e6])
+    for j2_component, point_mass_component in zip(j2.radial(x, y), point_mass.radial(x, y)):
+        np.testing.assert_allclose(j2_component, point_mass_component, rtol=1e-14)
+
+
+def test_j2_flight_at_zero_matches_point_mass():
+    point_mass = build_rocket()
+    j2 = build_rocket(gravity_model=J2Gravity(EARTH_MASS, EARTH_RADIUS, 0.0))
+    for _ in range(2000):
+        point_mass.update(0.1)
+        j2.update(0.1)
+    np.testing.assert_array_equal(j2.pos, point_mass.pos)
+    assert j2.rocket_velocity == point_mass.rocket_velocity
+
+
+def test_j2_strengthens_gravity_at_the_equator_and_weakens_it_at_the_poles():
+    point_mass = PointMassGravity(EARTH_MASS, EARTH_RADIUS).acceleration(0.0)
+    equator = J2Gravity(EARTH_MASS, EARTH_RADIUS, EARTH_J2, 0.0).acceleration(0.0)
+    pole = J2Gravity(EARTH_MASS, EARTH_RADIUS, EARTH_J2, 90.0).acceleration(0.0)
+    assert equator / point_mass == pytest.approx(1 + 1.5 * EARTH_J2)
+    assert pole / point_mass == pytest.approx(1 - 3 * EARTH_J2)
+    # The term vanishes where 3 sin(latitude)**2 == 1
+    neutral = math.degrees(math.asin(math.sqrt(1 / 3)))
+    assert J2Gravity(EARTH_MASS, EARTH_RADIUS, EARTH_J2, neutral).acceleration(
+        0.0
+    ) == pytest.approx(point_mass, rel=1e-15)
+
+
+def test_earth_gravity():
+    assert earth_gravity().describe()["model"] == "point mass"
+    described = earth_gravity(True, 10.0).describe()
+    assert (described["model"], described["j2"], described["latitude"]) == ("j2", EARTH_J2, 10.0)
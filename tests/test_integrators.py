@@ -0,0 +1,29 @@
+import numpy as np
+
+from xrocket.simulation import build_rocket, simulate
+
+# Past the booster and core stage burnouts, where steps end exactly on staging events
+T_END = 600
+
+
+def fly(integrator, dt, kernel="reference", **kwargs):
+    rocket = build_rocket(kernel=kernel)
+    simulate(rocket, T_END, dt=dt, integrator=integrator, **kwargs)
+    return np.array([rocket.pos[0], rocket.pos[1], rocket.rocket_velocity])
+
+
+def test_rk4_converges_through_staging():
+    reference = fly("rk4", 0.1)
+    errors = [np.abs(fly("rk4", dt) - reference).max() for dt in (2.0, 1.0, 0.5)]
+    assert errors[1] < errors[0] / 2
+    assert errors[2] < errors[1] / 2
+    assert errors[2] < 0.05
+
+
+def test_integrators_agree_with_fine_euler():
+    rk4 = fly("rk4", 0.1)
+    rk45 = fly("rk45", 0.1, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(rk45, rk4, rtol=1e-6)
+    # Rocket.update is first order, 5 ms steps land within about 1e-4 of the solution
+    euler = fly("euler", 0.005, kernel="fast")
+    np.testing.assert_allclose(euler, rk4, rtol=2e-4)
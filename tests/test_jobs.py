@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from xrocket.__main__ import cli
+from xrocket.jobs import MANIFEST_FILE, SUMMARY_FILE, load_jobs, run_batch
+from xrocket.telemetry import load_telemetry
+
+JOBS = [
+    {"id": "nominal", "t_end": 20, "dt": 0.1, "telemetry": "npy"},
+    {"id": "heavy core", "overrides": {"CORE_STAGE.Dry Mass": 90000}, "t_end": 20, "dt": 0.1},
+    {"id": "broken", "overrides": {"CORE_STAGE.Thrust": 1}, "t_end": 20, "dt": 0.1},
+]
+
+
+def write_jobs(tmp_path, jobs=JOBS):
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("\n".join(json.dumps(job) for job in jobs) + "\n\n")
+    return str(path)
+
+
+def manifest(output_dir):
+    with open(os.path.join(output_dir, MANIFEST_FILE)) as manifest_file:
+        return [json.loads(line) for line in manifest_file]
+
+
+def test_batch_writes_outputs_and_manifest(tmp_path):
+    output_dir = str(tmp_path / "results")
+    totals = run_batch(load_jobs(write_jobs(tmp_path)), output_dir)
+    assert (totals["jobs"], totals["failed"]) == (3, 1)
+
+    entries = {entry["id"]: entry for entry in manifest(output_dir)}
+    assert [entries[job["id"]]["status"] for job in JOBS] == ["ok", "ok", "error"]
+    assert "CORE_STAGE.Thrust" in entries["broken"]["error"]
+    summary_path, telemetry_path = entries["nominal"]["outputs"]
+    assert summary_path == os.path.join(output_dir, "nominal", SUMMARY_FILE)
+    with open(summary_path) as summary_file:
+        summary = json.load(summary_file)
+    assert summary["reason"] == "time limit"
+    assert summary["flight_time"] == pytest.approx(20)
+    assert len(load_telemetry(telemetry_path)["Time"]) == 200
+    assert entries["heavy core"]["outputs"] == [
+        os.path.join(output_dir, "heavy core", SUMMARY_FILE)
+    ]
+
+
+def test_resumed_batch_skips_completed_jobs(tmp_path):
+    jobs = load_jobs(write_jobs(tmp_path))
+    output_dir = str(tmp_path / "results")
+    run_batch(jobs[:1], output_dir)
+    done = []
+    totals = run_batch(jobs, output_dir, progress=lambda *args: done.append(args))
+    assert totals["jobs"] == 2
+    assert [(finished, total, entry["id"]) for finished, total, entry in done] == [
+        (2, 3, "heavy core"),
+        (3, 3, "broken"),
+    ]
+    # Failed jobs are run again
+    assert run_batch(jobs, output_dir)["jobs"] == 1
+    assert [entry["id"] for entry in manifest(output_dir)] == [
+        "nominal",
+        "heavy core",
+        "broken",
+        "broken",
+    ]
+
+
+def test_run_batch_command_resumes(tmp_path):
+    jobs = write_jobs(tmp_path, JOBS[:2])
+    output_dir = str(tmp_path / "results")
+    runner = CliRunner()
+    assert runner.invoke(cli, ["run-batch", jobs, "--output-dir", output_dir]).exit_code == 0
+    assert len(manifest(output_dir)) == 2
+    result = runner.invoke(cli, ["run-batch", jobs, "--output-dir", output_dir])
+    assert result.exit_code == 0
+    assert len(manifest(output_dir)) == 2
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        {"id": "a", "thrust": 1},
+        {"id": "a/b"},
+        {"telemetry": "hdf5"},
+        {"integrator": "rk4", "multirate": True},
+        ["not", "an", "object"],
+    ],
+)
+def test_invalid_jobs(tmp_path, line):
+    with pytest.raises(ValueError, match="Line 1"):
+        load_jobs(write_jobs(tmp_path, [line]))
+
+
+def test_job_ids_must_be_unique(tmp_path):
+    with pytest.raises(ValueError, match="unique"):
+        load_jobs(write_jobs(tmp_path, [{"id": "a"}, {"id": "a"}]))
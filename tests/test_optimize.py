@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+from xrocket.coast import RadialArc
+from xrocket.optimize import PitchProgram, coast_apogee, knot_times, optimize
+from xrocket.simulation import build_rocket
+
+# Small enough to run in about a second
+SETTINGS = {"knots": 3, "dt": 0.5}
+SEARCH = {"population": 8, "elites": 2, "generations": 3, "seed": 1}
+
+
+def test_pitch_program_interpolates_between_knots():
+    program = PitchProgram([0, 100, 200], [90, 120, 60])
+    assert program(-5) == 90
+    assert program(0) == 90
+    assert program(50) == 105
+    assert program(100) == 120
+    assert program(150) == 90
+    assert program(250) == 60
+    assert not program.fixed(199.9)
+    assert program.fixed(200)
+
+
+@pytest.mark.parametrize(
+    "times, angles",
+    [([], []), ([0, 100], [90]), ([0, 100, 100], [90, 100, 110]), ([100, 0], [90, 100])],
+)
+def test_pitch_program_validation(times, angles):
+    with pytest.raises(ValueError):
+        PitchProgram(times, angles)
+
+
+def test_knot_times():
+    assert knot_times(3, 300) == (0.0, 150.0, 300.0)
+    assert knot_times(1, 300) == (0.0,)
+    with pytest.raises(ValueError):
+        knot_times(0, 300)
+
+
+@pytest.mark.parametrize("velocity, theta", [(3000.0, 60.0), (5000.0, 90.0), (7000.0, 150.0)])
+def test_coast_apogee_is_the_top_of_the_radial_arc(velocity, theta):
+    rocket = build_rocket()
+    rocket.pos = np.array([1e5, 2e5])
+    rocket.rocket_velocity = velocity
+    rocket.theta = theta
+    arc = RadialArc(rocket)
+    assert arc.bound
+    # The arc peaks at eccentric anomaly pi
+    r_top, _ = arc.radius_velocity(math.pi)
+    top = arc.y0 + (r_top - arc.r0) * arc.sin_theta
+    apogee = coast_apogee(
+        rocket.gravity_model.gm,
+        rocket.earth_radius,
+        rocket.altitude,
+        velocity,
+        math.sin(math.radians(theta)),
+    )
+    assert apogee == pytest.approx(top, rel=1e-12)
+
+
+def test_coast_apogee_edge_cases():
+    rocket = build_rocket()
+    gm, radius = rocket.gravity_model.gm, rocket.earth_radius
+    assert coast_apogee(gm, radius, 1e5, 2e4, 1.0) == math.inf
+    assert coast_apogee(gm, radius, 1e5, -10.0, 1.0) == 1e5
+    assert coast_apogee(gm, radius, 1e5, 3000.0, 0.0) == 1e5
+    # Steeper pitches climb higher
+    assert coast_apogee(gm, radius, 1e5, 3000.0, 0.5) < coast_apogee(gm, radius, 1e5, 3000.0, 1.0)
+
+
+@pytest.mark.parametrize("objective", ["apogee", "horizontal"])
+def test_pruning_keeps_the_best_score(objective):
+    settings = dict(SETTINGS, objective=objective)
+    pruned = optimize(settings, prune=True, **SEARCH)
+    unpruned = optimize(settings, prune=False, **SEARCH)
+    assert pruned["pruned"] > 0
+    assert unpruned["pruned"] == 0
+    assert pruned["best"]["score"] == unpruned["best"]["score"]
+    assert pruned["best"]["angles"] == unpruned["best"]["angles"]
+    assert pruned["best"]["score"] > pruned["baseline"]["score"]
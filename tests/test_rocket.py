@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+
+from xrocket.instrumentation import Instrumentation
+from xrocket.rocket import Rocket
+from xrocket.settings import EARTH_MASS, EARTH_RADIUS
+from xrocket.simulation import build_rocket
+
+# Past the booster burnout, so both kernels go through a staging event
+T_END = 200
+DT = 0.05
+
+
+def assert_same_telemetry(rows, expected):
+    assert len(rows) == len(expected)
+    for channel in expected.dtype.names:
+        np.testing.assert_array_equal(rows[channel], expected[channel], err_msg=channel)
+
+
+@pytest.mark.parametrize("integrator", ["euler", "rk4"])
+def test_fast_kernel_matches_reference(fly, integrator):
+    reference = fly(build_rocket(), T_END, DT, integrator=integrator)
+    fast = fly(build_rocket(kernel="fast"), T_END, DT, integrator=integrator)
+    assert_same_telemetry(fast, reference)
+
+
+@pytest.mark.parametrize("kernel", ["reference", "fast"])
+def test_instrumented_steps_match_plain_steps(fly, kernel):
+    instrumentation = Instrumentation()
+    timed = fly(build_rocket(kernel=kernel), T_END, DT, instrumentation=instrumentation)
+    assert_same_telemetry(timed, fly(build_rocket(kernel=kernel), T_END, DT))
+    steps = instrumentation.steps
+    assert steps == len(timed)
+    # Staging events split a step in two
+    for phase in ("atmosphere", "drag", "integration"):
+        assert steps <= instrumentation.calls[phase] <= steps + len(build_rocket().plan_staging())
+
+
+def test_restored_snapshot_continues_the_flight(fly):
+    # Through the core stage burnout after the snapshot, restored on a new rocket from the
+    # JSON a checkpoint file holds
+    t_end = 600
+    uninterrupted = fly(build_rocket(), t_end, DT)
+    rocket = build_rocket()
+    before = fly(rocket, 150, DT)
+    snapshot = json.loads(json.dumps(rocket.snapshot()))
+    resumed = build_rocket()
+    resumed.restore(snapshot)
+    after = fly(resumed, t_end, DT)
+    assert resumed.current_stage == "Interim"
+    assert_same_telemetry(np.concatenate([before, after]), uninterrupted)
+
+
+def test_positional_stages_are_deprecated(fly):
+    stages = build_rocket().stage_objects
+    with pytest.deprecated_call():
+        rocket = Rocket(*stages, EARTH_MASS, EARTH_RADIUS)
+    np.testing.assert_array_equal(
+        fly(rocket, T_END, DT)["Altitude"], fly(build_rocket(), T_END, DT)["Altitude"]
+    )
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from xrocket.__main__ import cli
+from xrocket.scheduler import Scheduler
+from xrocket.simulation import build_rocket
+
+# Past the booster burnout and well above the atmosphere, where the default subsystems skip
+T_END = 300
+DT = 0.05
+
+
+def test_default_multirate_matches_full_rate(fly):
+    rocket = build_rocket()
+    rocket.scheduler = scheduler = Scheduler()
+    multirate = fly(rocket, T_END, DT)
+    full_rate = fly(build_rocket(), T_END, DT)
+    for name in ("atmosphere", "reference_area", "drag"):
+        assert scheduler.skips[name] > 0, name
+    assert len(multirate) == len(full_rate)
+    for channel in full_rate.dtype.names:
+        np.testing.assert_array_equal(multirate[channel], full_rate[channel], err_msg=channel)
+
+
+@pytest.mark.parametrize("integrator", ["rk4", "rk45"])
+@pytest.mark.parametrize("options", [["--multirate"], ["--rate", "drag=1"]])
+def test_run_rejects_multirate_runge_kutta(integrator, options):
+    result = CliRunner().invoke(cli, ["run", "--integrator", integrator, *options])
+    assert result.exit_code == 2
+    assert "--integrator euler" in result.output
@@ -0,0 +1,42 @@
+from xrocket.stage import STAGE_FIELDS, Stage, StageSet
+
+
+def stage_set():
+    # One stage of each state: burning, idle, detached and burning out within a step
+    stages = [
+        Stage(1000, 5000, -100, 3000, 10),
+        Stage(2000, 8000, -50, 4000, 20),
+        Stage(500, 1000, -20, 2500, 5),
+        Stage(800, 10, -100, 3500, 8),
+    ]
+    stages[1].firing = False
+    stages[2].firing = False
+    stages[2].attached = False
+    return StageSet(stages), stages
+
+
+def test_update_matches_the_separate_steps():
+    single_pass, _ = stage_set()
+    separate, _ = stage_set()
+    for _ in range(3):
+        single_pass.update(0.5)
+        separate.calc_mass(0.5)
+        separate.check_firing()
+        separate.check_attachment()
+        separate.calc_thrust()
+    for field in STAGE_FIELDS:
+        assert getattr(single_pass, field) == getattr(separate, field), field
+    assert single_pass.prop_mass[3] == 0
+    assert single_pass.thrust[3] == 0
+    assert single_pass.dry_mass[2] == 0
+
+
+def test_adopted_stages_read_and_write_the_set():
+    stages, views = stage_set()
+    views[0].prop_mass = 42.0
+    assert stages.prop_mass[0] == 42.0
+    stages.thrust[1] = 7.0
+    assert views[1].thrust == 7.0
+    views[3].update(1.0)
+    assert stages.prop_mass[3] == 0
+    assert stages.view(3).total_mass == views[3].total_mass == 800
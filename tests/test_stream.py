@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import numpy as np
+
+from xrocket.simulation import build_rocket
+from xrocket.stream import (
+    TelemetryServer,
+    encode_end,
+    encode_frame,
+    encode_header,
+    read_messages,
+    stream_flight,
+)
+from xrocket.telemetry import CHANNELS
+
+T_END = 20
+DT = 0.1
+
+
+async def read_all(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return [message async for message in read_messages(reader)]
+
+
+def test_messages_round_trip():
+    row = tuple(float(index) + 0.5 for index in range(len(CHANNELS)))
+    messages = asyncio.run(
+        read_all(encode_header() + encode_frame(row) + encode_end("ground impact"))
+    )
+    assert messages == [("header", list(CHANNELS)), ("frame", row), ("end", "ground impact")]
+
+
+async def stream(interval):
+    # Rows every client received from a streamed flight, the first subscribed to interval
+    # and the second to every step
+    server = TelemetryServer(port=0)
+    await server.start()
+    connections = [await asyncio.open_connection(server.host, server.port) for _ in range(2)]
+    reader, writer = connections[0]
+    writer.write(json.dumps({"interval": interval}).encode() + b"\n")
+    await writer.drain()
+    await server.wait_for_clients(2)
+    while not any(client.interval for client in server.clients):
+        await asyncio.sleep(0.01)
+
+    reason = await stream_flight(build_rocket(), T_END, server, dt=DT)
+    received = []
+    for reader, writer in connections:
+        messages = [message async for message in read_messages(reader)]
+        writer.close()
+        assert messages[0] == ("header", list(CHANNELS))
+        assert messages[-1] == ("end", reason)
+        received.append(np.array([row for kind, row in messages[1:-1]]))
+    return received
+
+
+def test_stream_decimates_to_the_client_interval(fly):
+    expected = fly(build_rocket(), T_END, DT)
+    decimated, full = asyncio.run(stream(1.0))
+
+    assert len(full) == len(expected)
+    for index, channel in enumerate(CHANNELS):
+        # Time is sent as float64, every other channel as float32
+        np.testing.assert_allclose(full[:, index], expected[channel], rtol=1e-6, err_msg=channel)
+    np.testing.assert_array_equal(full[:, 0], expected["Time"])
+
+    # One frame per second of flight time, on the grid of the first frame
+    assert len(decimated) == T_END
+    np.testing.assert_allclose(np.diff(decimated[:, 0]), 1.0)
+    np.testing.assert_array_equal(decimated, full[:: int(round(1.0 / DT))])
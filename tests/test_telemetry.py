@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from xrocket.simulation import build_rocket, simulate
+from xrocket.telemetry import CHANNELS, TELEMETRY_WRITERS, TelemetryRecorder, load_telemetry
+
+T_END = 150
+DT = 0.1
+
+
+def record_flight(recorder):
+    def record(t, rocket):
+        recorder.record(
+            t,
+            rocket,
+            rocket.core_stage,
+            rocket.srb_stage,
+            rocket.interim_stage,
+            rocket.exploration_stage,
+        )
+
+    simulate(build_rocket(), T_END, dt=DT, callback=record)
+    recorder.close()
+
+
+@pytest.mark.parametrize("output_format", sorted(TELEMETRY_WRITERS))
+def test_written_telemetry_loads_back(fly, tmp_path, output_format):
+    expected = fly(build_rocket(), T_END, DT)
+    path = str(tmp_path / "telemetry")
+    # A chunk size that does not divide the run, so the last chunk is partial
+    writer = TELEMETRY_WRITERS[output_format](path)
+    record_flight(TelemetryRecorder(growth_chunk=97, writer=writer))
+
+    loaded = load_telemetry(path)
+    assert list(loaded) == list(CHANNELS)
+    for channel in CHANNELS:
+        assert loaded[channel].dtype == np.float64
+        np.testing.assert_array_equal(loaded[channel], expected[channel], err_msg=channel)
+
+
+def test_empty_npy_telemetry_loads_back(tmp_path):
+    path = str(tmp_path / "telemetry")
+    TELEMETRY_WRITERS["npy"](path).close()
+    loaded = load_telemetry(path)
+    assert all(len(loaded[channel]) == 0 for channel in CHANNELS)
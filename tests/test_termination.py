@@ -0,0 +1,108 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from xrocket.gravity import PointMassGravity
+from xrocket.settings import EARTH_MASS, EARTH_RADIUS
+from xrocket.simulation import build_rocket, simulate
+from xrocket.termination import (
+    TIME_LIMIT,
+    AltitudeReached,
+    Apogee,
+    Burnout,
+    GroundImpact,
+    OrbitInsertion,
+    StopCondition,
+    VelocityReached,
+    stop_check,
+)
+
+
+def state(altitude=1000.0, velocity=100.0, theta=90.0, propellant=1.0):
+    # The rocket attributes the stop conditions read
+    return SimpleNamespace(
+        altitude=altitude,
+        rocket_velocity=velocity,
+        theta=theta,
+        total_propellant_mass=propellant,
+        earth_radius=EARTH_RADIUS,
+        gravity_model=PointMassGravity(EARTH_MASS, EARTH_RADIUS),
+    )
+
+
+def test_ground_impact():
+    condition = GroundImpact()
+    assert not condition(0, state(altitude=0.0))
+    assert condition(0, state(altitude=-0.1))
+
+
+def test_apogee_is_the_first_step_lower_than_the_one_before():
+    condition = Apogee()
+    results = [condition(t, state(altitude=altitude)) for t, altitude in enumerate([1, 5, 5, 4])]
+    assert results == [False, False, False, True]
+
+
+def test_burnout_waits_value_seconds():
+    condition = Burnout(10)
+    assert not condition(5, state(propellant=1.0))
+    assert not condition(20, state(propellant=0.0))
+    assert not condition(29.9, state(propellant=0.0))
+    assert condition(30, state(propellant=0.0))
+
+
+def test_altitude_and_velocity_reached():
+    assert not AltitudeReached(1000.5)(0, state(altitude=1000.0))
+    assert AltitudeReached(1000.0)(0, state(altitude=1000.0))
+    assert not VelocityReached(100.5)(0, state(velocity=100.0))
+    assert VelocityReached(100.0)(0, state(velocity=100.0))
+
+
+def test_orbit_insertion():
+    altitude = 200000.0
+    circular = math.sqrt(PointMassGravity(EARTH_MASS, EARTH_RADIUS).gm / (EARTH_RADIUS + altitude))
+    condition = OrbitInsertion()
+    assert condition(0, state(altitude=altitude, velocity=circular, theta=0.0))
+    assert condition(0, state(altitude=altitude, velocity=circular, theta=180.0))
+    assert not condition(0, state(altitude=altitude, velocity=0.99 * circular, theta=0.0))
+    # Fast enough but climbing straight up, or still inside the atmosphere
+    assert not condition(0, state(altitude=altitude, velocity=2 * circular, theta=90.0))
+    assert not condition(0, state(altitude=80000.0, velocity=2 * circular, theta=0.0))
+
+
+def test_first_condition_listed_gives_the_reason():
+    rocket = state(altitude=-1.0, velocity=500.0)
+    assert stop_check([("impact", None), ("velocity", 100)])(0, rocket) == "ground impact"
+    assert stop_check([("velocity", 100), ("impact", None)])(0, rocket) == "velocity reached"
+    assert stop_check([("velocity", 1000), ("impact", None)])(0, rocket) == "ground impact"
+    assert stop_check([("velocity", 1000)])(0, rocket) is None
+
+
+def test_stop_check_takes_instances_and_rejects_unknown_names():
+    class Always(StopCondition):
+        reason = "always"
+
+        def __call__(self, t, rocket):
+            return True
+
+    assert stop_check([Always()])(0, state()) == "always"
+    assert stop_check(None) is None
+    assert stop_check([]) is None
+    with pytest.raises(ValueError):
+        stop_check([("landing", None)])
+
+
+def test_stop_check_builds_fresh_conditions():
+    stop = [("apogee", None)]
+    first = stop_check(stop)
+    assert first(0, state(altitude=10.0)) is None
+    assert first(1, state(altitude=5.0)) == "apogee"
+    assert stop_check(stop)(2, state(altitude=1.0)) is None
+
+
+def test_flight_stops_after_the_first_step_a_condition_holds():
+    rocket = build_rocket()
+    reason = simulate(rocket, 600, dt=0.1, stop=[("altitude", 10000), ("velocity", 1e6)])
+    assert reason == "altitude reached"
+    assert 10000 <= rocket.altitude < 10000 + 0.1 * rocket.rocket_velocity
+    assert simulate(build_rocket(), 1, dt=0.1, stop=[("altitude", 10000)]) == TIME_LIMIT
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from xrocket.vehicle import load_vehicle, tomllib
+
+STAGE = {
+    "name": "Booster",
+    "dry_mass": 25600,
+    "propellant_mass": 395700,
+    "mass_flow": -2800,
+    "exhaust_velocity": -2770,
+    "reference_area": 10.52,
+}
+PHASE = {"name": "Boost", "burning": ["Booster"]}
+
+
+def write_json(tmp_path, definition):
+    path = tmp_path / "vehicle.json"
+    path.write_text(json.dumps(definition))
+    return str(path)
+
+
+def test_loads_a_vehicle(tmp_path):
+    vehicle = load_vehicle(write_json(tmp_path, {"stages": [STAGE], "phases": [PHASE]}))
+    assert vehicle["name"] == "vehicle"
+    assert vehicle["stages"]["Booster"]["Mass Flow"] == -2800
+    assert vehicle["stages"]["Booster"]["Drag Curve"] is None
+
+
+def test_bad_json(tmp_path):
+    path = tmp_path / "vehicle.json"
+    path.write_text('{"stages": [')
+    with pytest.raises(json.JSONDecodeError):
+        load_vehicle(str(path))
+
+
+@pytest.mark.skipif(tomllib is None, reason="needs Python 3.11 or tomli")
+def test_bad_toml(tmp_path):
+    path = tmp_path / "vehicle.toml"
+    path.write_text('name = "Unterminated\n[[stages]]\n')
+    with pytest.raises(tomllib.TOMLDecodeError):
+        load_vehicle(str(path))
+
+
+@pytest.mark.parametrize("key", ["burning", "burnt_out", "ignite", "shutdown", "jettison"])
+def test_unknown_stage_in_a_phase(tmp_path, key):
+    phase = dict(PHASE, **{key: ["Upper"]})
+    with pytest.raises(ValueError, match="Unknown stage Upper"):
+        load_vehicle(write_json(tmp_path, {"stages": [STAGE], "phases": [phase]}))
+
+
+def test_unknown_leading_stage(tmp_path):
+    phase = dict(PHASE, leading="Upper")
+    with pytest.raises(ValueError, match="Unknown leading stage Upper"):
+        load_vehicle(write_json(tmp_path, {"stages": [STAGE], "phases": [phase]}))
+
+
+@pytest.mark.parametrize("key", sorted(set(STAGE) - {"name"}))
+def test_missing_stage_field(tmp_path, key):
+    stage = {name: value for name, value in STAGE.items() if name != key}
+    with pytest.raises(ValueError, match=f"Missing keys \\['{key}'\\] in stage Booster"):
+        load_vehicle(write_json(tmp_path, {"stages": [stage], "phases": [PHASE]}))
+
+
+def test_unknown_stage_field(tmp_path):
+    stage = dict(STAGE, thrust=1e6)
+    with pytest.raises(ValueError, match="Unknown keys"):
+        load_vehicle(write_json(tmp_path, {"stages": [stage], "phases": [PHASE]}))
+
+
+@pytest.mark.parametrize(
+    "definition",
+    [
+        {"stages": [], "phases": [PHASE]},
+        {"stages": [STAGE], "phases": []},
+        {"stages": [STAGE], "phases": [PHASE, PHASE]},
+    ],
+)
+def test_invalid_vehicle(tmp_path, definition):
+    with pytest.raises(ValueError):
+        load_vehicle(write_json(tmp_path, definition))
@@ -1,37 +1,30 @@
 import logging
+import os
 
 import click
 
-from xrocket.plots import (
-    create_plots,
-    create_rocket_dict,
-    csv_output,
-    update_rocket_dict,
-)
-from xrocket.plots import (
-    create_plots,
-    create_rocket_dict,
-    csv_output,
-    update_rocket_dict,
-)
-from xrocket.rocket import Rocket
-from xrocket.settings import (
-    CORE_STAGE,
-    EARTH_MASS,
-    EARTH_RADIUS,
-    EXPLORATION_UPPER_STAGE,
-    INTERIM_CRYOGENIC_STAGE,
-    SOLID_ROCKET_BOOSTERS,
-)
-from xrocket.settings import (
-    CORE_STAGE,
-    EARTH_MASS,
-    EARTH_RADIUS,
-    EXPLORATION_UPPER_STAGE,
-    INTERIM_CRYOGENIC_STAGE,
-    SOLID_ROCKET_BOOSTERS,
-)
-from xrocket.stage import Stage
+from xrocket.decimate import DECIMATION_METHODS, decimate
+from xrocket.gravity import earth_gravity
+from xrocket.instrumentation import REPORT_FORMATS, Instrumentation, format_report
+from xrocket.plots import create_plots, csv_output
+from xrocket.scheduler import SUBSYSTEMS, Scheduler
+from xrocket.settings import LAUNCH_LATITUDE
+from xrocket.simulation import (
+    INTEGRATOR_NAMES,
+    ROCKET_KERNELS,
+    build_rocket,
+    build_vehicle,
+    load_checkpoint,
+    save_checkpoint,
+    simulate,
+)
+from xrocket.telemetry import (
+    GROWTH_CHUNK,
+    TELEMETRY_WRITERS,
+    TelemetryRecorder,
+    load_telemetry,
+)
+from xrocket.termination import TIME_LIMIT
 
 LOG = logging.getLogger(__name__)
 
@@ -40,111 +33,932 @@ def log_setup(log_level):
     logger = logging.getLogger()
     logger.setLevel(log_level)
 
-
     ch = logging.StreamHandler()
     ch.setLevel(log_level)
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-
     formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
     ch.setFormatter(formatter)
 
-
     logger.addHandler(ch)
 
 
-@click.command()
-@click.option("--show-plots", is_flag=True)
-@click.option("--save-plots", is_flag=True)
-@click.option("--verbose", is_flag=True)
+class DefaultCommandGroup(click.Group):
+    # Arguments that do not start with a command name go to the run command, so
+    # "python -m xrocket --save-plots" keeps working next to "python -m xrocket sweep"
+    default_command = "run"
+
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.commands and args[0] != "--help"):
+            args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+
+def cache_options(command):
+    # Results cache options shared by the commands that fly rockets, see xrocket.cache.
+    # Their defaults are resolved by open_cache, so xrocket.cache loads only when used
+    options = [
+        click.option(
+            "--no-cache", is_flag=True, help="Fly every run, neither read nor store results"
+        ),
+        click.option("--clear-cache", is_flag=True, help="Empty the results cache first"),
+        click.option(
+            "--cache-dir",
+            type=click.Path(file_okay=False),
+            help="Results cache directory, xrocket in $XDG_CACHE_HOME or ~/.cache by default",
+        ),
+        click.option(
+            "--cache-size",
+            type=int,
+            help="Megabytes the results cache may use before the least recently used "
+            "results are removed, 1024 by default",
+        ),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def open_cache(cache_dir, cache_size=None):
+    # ResultsCache of the cache_options, cache_size in megabytes
+    from xrocket.cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, ResultsCache
+
+    max_bytes = DEFAULT_CACHE_SIZE if cache_size is None else cache_size * 2**20
+    return ResultsCache(cache_dir or DEFAULT_CACHE_DIR, max_bytes=max_bytes)
+
+
+def parse_rates(ctx, param, values):
+    # NAME=SECONDS periods of --rate as a dictionary
+    rates = {}
+    for value in values:
+        name, _, period = value.partition("=")
+        try:
+            rates[name] = float(period)
+        except ValueError:
+            raise click.BadParameter(f"{value} is not NAME=SECONDS")
+    return rates
+
+
+def parse_vehicle(ctx, param, value):
+    # Vehicle definition of --vehicle, see xrocket.vehicle
+    from xrocket.vehicle import load_vehicle
+
+    if value is None:
+        return None
+    try:
+        return load_vehicle(value)
+    except (ValueError, KeyError, RuntimeError) as error:
+        raise click.BadParameter(f"{value}: {error}")
+
+
+def parse_objective(ctx, param, value):
+    # Name of an objective of xrocket.optimize, checked without loading it up front
+    from xrocket.optimize import OBJECTIVES
+
+    if value not in OBJECTIVES:
+        raise click.BadParameter(f"{value} is not one of {', '.join(OBJECTIVES)}")
+    return value
+
+
+def parse_cases(ctx, param, values):
+    # Names of benchmark cases of xrocket.benchmark, checked without loading it up front
+    from xrocket.benchmark import BENCHMARKS
+
+    for value in values:
+        if value not in BENCHMARKS:
+            raise click.BadParameter(f"{value} is not one of {', '.join(BENCHMARKS)}")
+    return values
+
+
+def vehicle_option(command):
+    return click.option(
+        "--vehicle",
+        type=click.Path(exists=True, dir_okay=False),
+        callback=parse_vehicle,
+        help="Fly the vehicle of this TOML or JSON file instead of the SLS of settings.py",
+    )(command)
+
+
+def gravity_options(command):
+    # Gravity model options shared by the commands that fly one rocket, see xrocket.gravity
+    options = [
+        click.option(
+            "--j2",
+            is_flag=True,
+            help="Add the J2 oblateness term of the Earth to point mass gravity",
+        ),
+        click.option(
+            "--latitude",
+            type=float,
+            default=LAUNCH_LATITUDE,
+            show_default=True,
+            metavar="DEGREES",
+            help="Latitude the J2 term is taken at, Kennedy Space Center by default",
+        ),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def stop_options(command):
+    # Stop conditions shared by the commands that fly rockets, see xrocket.termination
+    options = [
+        click.option(
+            "--stop-on-impact", is_flag=True, help="Stop when the rocket hits the ground"
+        ),
+        click.option("--stop-at-apogee", is_flag=True, help="Stop once the rocket descends"),
+        click.option(
+            "--stop-after-burnout",
+            type=float,
+            metavar="SECONDS",
+            help="Stop SECONDS after every stage has burnt out",
+        ),
+        click.option(
+            "--stop-altitude", type=float, metavar="METERS", help="Stop at this altitude"
+        ),
+        click.option("--stop-velocity", type=float, metavar="M/S", help="Stop at this velocity"),
+        click.option(
+            "--stop-on-orbit",
+            is_flag=True,
+            help="Stop above the atmosphere at circular orbit speed",
+        ),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def stop_conditions(
+    stop_on_impact,
+    stop_at_apogee,
+    stop_after_burnout,
+    stop_altitude,
+    stop_velocity,
+    stop_on_orbit,
+):
+    # The (name, value) stop conditions selected by stop_options
+    stop = []
+    if stop_on_impact:
+        stop.append(("impact", None))
+    if stop_at_apogee:
+        stop.append(("apogee", None))
+    if stop_after_burnout is not None:
+        stop.append(("burnout", stop_after_burnout))
+    if stop_altitude is not None:
+        stop.append(("altitude", stop_altitude))
+    if stop_velocity is not None:
+        stop.append(("velocity", stop_velocity))
+    if stop_on_orbit:
+        stop.append(("orbit", None))
+    return stop
+
+
+@click.group(cls=DefaultCommandGroup)
+def cli():
+    pass
+
+
+@cli.command("run")
 @click.option("--show-plots", is_flag=True)
 @click.option("--save-plots", is_flag=True)
 @click.option("--verbose", is_flag=True)
-def run_rocket(show_plots, save_plots, verbose):
+@click.option(
+    "--integrator",
+    type=click.Choice(INTEGRATOR_NAMES),
+    default="euler",
+    help="euler steps Rocket.update, rk4 and rk45 integrate the rocket state vector",
+)
+@click.option("--dt", type=float, default=0.01, help="Time step, initial step for rk45")
+@click.option("--rtol", type=float, default=1e-6, help="Relative tolerance for rk45")
+@click.option("--atol", type=float, default=1e-3, help="Absolute tolerance for rk45")
+@click.option(
+    "--kernel",
+    type=click.Choice(list(ROCKET_KERNELS)),
+    default="reference",
+    help="fast steps on plain floats with the same results as the reference Rocket",
+)
+@vehicle_option
+@gravity_options
+@click.option(
+    "--coast",
+    is_flag=True,
+    help="Fly unpowered arcs above the atmosphere in closed form instead of step by step",
+)
+@click.option(
+    "--multirate",
+    is_flag=True,
+    help="Skip atmosphere, reference area and drag updates while their last result holds, "
+    "euler only",
+)
+@click.option(
+    "--rate",
+    "rates",
+    multiple=True,
+    callback=parse_rates,
+    metavar="NAME=SECONDS",
+    help="Update a subsystem at most every SECONDS, implies --multirate. Subsystems: "
+    + ", ".join(subsystem.name for subsystem in SUBSYSTEMS),
+)
+@click.option(
+    "--resume",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Continue the flight from a checkpoint written with --checkpoints",
+)
+@click.option(
+    "--checkpoints",
+    type=click.Path(file_okay=False),
+    help="Write a JSON checkpoint of the rocket at every staging event to this directory",
+)
+@click.option(
+    "--output",
+    type=click.Path(),
+    help='Telemetry file, "Rocket Values.csv" or the "Rocket Values" directory by default',
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(list(TELEMETRY_WRITERS)),
+    default="csv",
+    help="csv file or a directory with one .npy file per channel",
+)
+@click.option(
+    "--chunk-size",
+    type=int,
+    default=GROWTH_CHUNK,
+    help="Telemetry rows held in memory before they are written out",
+)
+@click.option("--plot-dpi", type=int, default=900, help="Resolution of saved plots")
+@click.option(
+    "--plot-format",
+    default="png",
+    help="Image format of saved plots, any format matplotlib can save e.g. png, svg, pdf",
+)
+@click.option(
+    "--plot-workers",
+    type=int,
+    help="Processes rendering saved plots, one per CPU by default",
+)
+@click.option(
+    "--max-points",
+    type=int,
+    default=5000,
+    help="Points per line in plots and rows of the reduced output, 0 keeps every point",
+)
+@click.option(
+    "--decimation",
+    type=click.Choice(list(DECIMATION_METHODS)),
+    default="lttb",
+    help="lttb keeps the look of each line, minmax keeps every peak",
+)
+@click.option(
+    "--reduced-output",
+    type=click.Path(),
+    help="Also write the telemetry decimated to at most --max-points rows to this CSV",
+)
+@click.option(
+    "--timings",
+    type=click.Choice(list(REPORT_FORMATS)),
+    help="Time every phase of the simulation and print the report as a table or JSON",
+)
+@click.option("--t-end", type=float, default=3000, help="Flight time in seconds")
+@stop_options
+@cache_options
+def run_rocket(
+    show_plots,
+    save_plots,
+    verbose,
+    integrator,
+    dt,
+    rtol,
+    atol,
+    kernel,
+    vehicle,
+    j2,
+    latitude,
+    coast,
+    multirate,
+    rates,
+    resume,
+    checkpoints,
+    output,
+    output_format,
+    chunk_size,
+    plot_dpi,
+    plot_format,
+    plot_workers,
+    max_points,
+    decimation,
+    reduced_output,
+    timings,
+    t_end,
+    stop_on_impact,
+    stop_at_apogee,
+    stop_after_burnout,
+    stop_altitude,
+    stop_velocity,
+    stop_on_orbit,
+    no_cache,
+    clear_cache,
+    cache_dir,
+    cache_size,
+):
+    from xrocket.cache import scenario_key
+
+    if (multirate or rates) and integrator != "euler":
+        # The rk4 and rk45 stages recompute every subsystem, so a schedule would only split
+        # the cache
+        raise click.UsageError("--multirate and --rate need --integrator euler")
+    stop = stop_conditions(
+        stop_on_impact,
+        stop_at_apogee,
+        stop_after_burnout,
+        stop_altitude,
+        stop_velocity,
+        stop_on_orbit,
+    )
+    if clear_cache:
+        open_cache(cache_dir).clear()
     if verbose:
         log_setup(logging.DEBUG)
     else:
         log_setup(logging.ERROR)
 
     # Create stages and rocket object instances using settings file
+    gravity_model = earth_gravity(j2, latitude) if j2 else None
+    if vehicle is not None:
+        rocket = build_vehicle(vehicle, kernel, gravity_model)
+    else:
+        rocket = build_rocket(kernel=kernel, gravity_model=gravity_model)
+    if multirate or rates:
+        try:
+            rocket.scheduler = Scheduler(rates)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--rate")
+    start = None
+    if resume is not None:
+        start = load_checkpoint(resume)
+        rocket.restore(start)
+    if checkpoints is not None:
+        rocket.staging_snapshots = []
 
-    # set initial time, dt, gravity, and eventually air resistance and more complex gravity
-    t = 0
-    dt = 0.1  # seconds
-    dt = 0.01  # seconds
-
-    core_stage = Stage(
-        dry_mass=CORE_STAGE["Dry Mass"],
-        prop_mass=CORE_STAGE["Propellant Mass"],
-        mass_flow=CORE_STAGE["Mass Flow"],
-        exhaust_v=CORE_STAGE["Exhaust Velocity"],
-        ref_area=CORE_STAGE["Reference Area"],
+    # Telemetry for use with HUD GUI within pygame, streamed to disk in chunks during the run
+    write_telemetry = (
+        show_plots or save_plots or output is not None or reduced_output is not None
     )
-    srb_stage = Stage(
-        dry_mass=SOLID_ROCKET_BOOSTERS["Dry Mass"],
-        prop_mass=SOLID_ROCKET_BOOSTERS["Propellant Mass"],
-        mass_flow=SOLID_ROCKET_BOOSTERS["Mass Flow"],
-        exhaust_v=SOLID_ROCKET_BOOSTERS["Exhaust Velocity"],
-        ref_area=SOLID_ROCKET_BOOSTERS["Reference Area"],
+    if output is None:
+        output = "Rocket Values.csv" if output_format == "csv" else "Rocket Values"
+    # A run identical to an earlier one copies that run's telemetry from the cache. Timed
+    # runs and runs writing checkpoints always fly
+    cache = None
+    if write_telemetry and not no_cache and not timings and checkpoints is None:
+        cache = open_cache(cache_dir, cache_size)
+    key = scenario_key(
+        t_end=t_end,
+        dt=dt,
+        integrator=integrator,
+        rtol=rtol,
+        atol=atol,
+        start=start,
+        stop=stop,
+        coast=coast,
+        rates=None if rocket.scheduler is None else rocket.scheduler.periods,
+        vehicle=vehicle,
+        gravity=None if gravity_model is None else gravity_model.describe(),
     )
-    interim_stage = Stage(
-        dry_mass=INTERIM_CRYOGENIC_STAGE["Dry Mass"],
-        prop_mass=INTERIM_CRYOGENIC_STAGE["Propellant Mass"],
-        mass_flow=INTERIM_CRYOGENIC_STAGE["Mass Flow"],
-        exhaust_v=INTERIM_CRYOGENIC_STAGE["Exhaust Velocity"],
-        ref_area=INTERIM_CRYOGENIC_STAGE["Reference Area"],
+    if cache is not None and cache.get_telemetry(key, output_format, output):
+        click.echo("Telemetry of an identical run taken from the cache", err=True)
+    else:
+        if write_telemetry:
+            rocket_parameters = TelemetryRecorder(
+                growth_chunk=chunk_size, writer=TELEMETRY_WRITERS[output_format](output)
+            )
+
+        def record(t, rocket):
+            if write_telemetry:
+                rocket_parameters.record(
+                    t=t,
+                    rocket=rocket,
+                    core_stage=rocket.core_stage,
+                    srb_stage=rocket.srb_stage,
+                    interim_stage=rocket.interim_stage,
+                    exploration_stage=rocket.exploration_stage
+                    )
+
+        instrumentation = Instrumentation() if timings else None
+        reason = simulate(
+            rocket,
+            t_end,
+            dt=dt,
+            integrator=integrator,
+            rtol=rtol,
+            atol=atol,
+            callback=record,
+            instrumentation=instrumentation,
+            stop=stop,
+            coast=coast,
+        )
+        if reason != TIME_LIMIT:
+            click.echo(f"Flight stopped at {rocket.time:.2f} seconds, {reason}", err=True)
+        if checkpoints is not None:
+            os.makedirs(checkpoints, exist_ok=True)
+            for snapshot in rocket.staging_snapshots:
+                save_checkpoint(
+                    snapshot,
+                    os.path.join(
+                        checkpoints, f"{snapshot['time']:.3f} {snapshot['current_stage']}.json"
+                    ),
+                )
+
+        if instrumentation is not None:
+            context = {"integrator": integrator, "dt": dt}
+            if rocket.scheduler is not None:
+                context["subsystems"] = rocket.scheduler.report()
+            click.echo(format_report(instrumentation.report(**context), timings))
+
+        if write_telemetry:
+            rocket_parameters.close()
+        if cache is not None:
+            cache.put_telemetry(key, output_format, output)
+
+    max_points = max_points or None
+    if reduced_output is not None:
+        csv_output(
+            decimate(load_telemetry(output), max_points, method=decimation),
+            reduced_output,
+        )
+
+    if show_plots or save_plots:
+        create_plots(
+            load_telemetry(output),
+            show_plots,
+            save_plots,
+            dpi=plot_dpi,
+            image_format=plot_format,
+            workers=plot_workers,
+            max_points=max_points,
+            decimation=decimation,
+        )
+
+
+@cli.command("stream")
+@click.option("--host", help="Address to listen on, 127.0.0.1 by default")
+@click.option("--port", type=int, help="Port to listen on, 8765 by default, 0 picks a free one")
+@click.option(
+    "--clients",
+    type=int,
+    default=0,
+    help="Wait for this many clients to connect before launching",
+)
+@click.option("--realtime", is_flag=True, help="Fly at the pace of the wall clock")
+@click.option(
+    "--speed",
+    type=click.FloatRange(min=0, min_open=True),
+    default=1.0,
+    help="Flight seconds per wall clock second with --realtime",
+)
+@click.option(
+    "--queue-size",
+    type=int,
+    help="Frame batches a client may fall behind before its oldest ones are dropped, 64 by "
+    "default",
+)
+@click.option("--t-end", type=float, default=3000, help="Flight time in seconds")
+@click.option("--integrator", type=click.Choice(INTEGRATOR_NAMES), default="euler")
+@click.option("--dt", type=float, default=0.01, help="Time step, initial step for rk45")
+@click.option("--rtol", type=float, default=1e-6, help="Relative tolerance for rk45")
+@click.option("--atol", type=float, default=1e-3, help="Absolute tolerance for rk45")
+@click.option("--kernel", type=click.Choice(list(ROCKET_KERNELS)), default="reference")
+@vehicle_option
+@gravity_options
+@click.option(
+    "--coast", is_flag=True, help="Fly unpowered arcs above the atmosphere in closed form"
+)
+@click.option("--verbose", is_flag=True)
+@stop_options
+def stream(
+    host,
+    port,
+    clients,
+    realtime,
+    speed,
+    queue_size,
+    t_end,
+    integrator,
+    dt,
+    rtol,
+    atol,
+    kernel,
+    vehicle,
+    j2,
+    latitude,
+    coast,
+    verbose,
+    stop_on_impact,
+    stop_at_apogee,
+    stop_after_burnout,
+    stop_altitude,
+    stop_velocity,
+    stop_on_orbit,
+):
+    # Fly one rocket and publish every step to TCP clients as it happens, e.g. for a HUD,
+    # see xrocket.stream for the protocol. Imported here, asyncio alone adds about a third
+    # to the startup time of every other command
+    import asyncio
+
+    from xrocket.stream import (
+        CLIENT_QUEUE_SIZE,
+        DEFAULT_HOST,
+        DEFAULT_PORT,
+        TelemetryServer,
+        stream_flight,
     )
-    exploration_stage = Stage(
-        dry_mass=EXPLORATION_UPPER_STAGE["Dry Mass"],
-        prop_mass=EXPLORATION_UPPER_STAGE["Propellant Mass"],
-        mass_flow=EXPLORATION_UPPER_STAGE["Mass Flow"],
-        exhaust_v=EXPLORATION_UPPER_STAGE["Exhaust Velocity"],
-        ref_area=EXPLORATION_UPPER_STAGE["Reference Area"],
+
+    log_setup(logging.INFO if verbose else logging.ERROR)
+    gravity_model = earth_gravity(j2, latitude) if j2 else None
+    if vehicle is not None:
+        rocket = build_vehicle(vehicle, kernel, gravity_model)
+    else:
+        rocket = build_rocket(kernel=kernel, gravity_model=gravity_model)
+    stop = stop_conditions(
+        stop_on_impact,
+        stop_at_apogee,
+        stop_after_burnout,
+        stop_altitude,
+        stop_velocity,
+        stop_on_orbit,
     )
 
-    rocket = Rocket(
-        core_stage=core_stage,
-        srb_stage=srb_stage,
-        interim_stage=interim_stage,
-        exploration_stage=exploration_stage,
-        earth_mass=EARTH_MASS,
-        earth_radius=EARTH_RADIUS,
+    async def serve():
+        server = TelemetryServer(
+            host or DEFAULT_HOST,
+            DEFAULT_PORT if port is None else port,
+            queue_size=queue_size or CLIENT_QUEUE_SIZE,
+        )
+        await server.start()
+        click.echo(f"Streaming telemetry on {server.host}:{server.port}", err=True)
+        if clients:
+            click.echo(f"Waiting for {clients} clients", err=True)
+            await server.wait_for_clients(clients)
+        return await stream_flight(
+            rocket,
+            t_end,
+            server,
+            realtime=realtime,
+            speed=speed,
+            dt=dt,
+            integrator=integrator,
+            rtol=rtol,
+            atol=atol,
+            stop=stop,
+            coast=coast,
+        )
+
+    reason = asyncio.run(serve())
+    click.echo(f"Flight ended at {rocket.time:.2f} seconds, {reason}", err=True)
+
+
+@cli.command("sweep")
+@click.argument("spec", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--results",
+    type=click.Path(dir_okay=False),
+    default="Sweep Results.csv",
+    help="Results table, runs already in it are skipped so an interrupted sweep resumes",
+)
+@click.option("--workers", type=int, default=None, help="Processes, all cores by default")
+@click.option("--t-end", type=float, default=3000, help="Flight time of every run in seconds")
+@click.option("--integrator", type=click.Choice(INTEGRATOR_NAMES), default="euler")
+@click.option("--dt", type=float, default=0.01, help="Time step, initial step for rk45")
+@click.option("--rtol", type=float, default=1e-6, help="Relative tolerance for rk45")
+@click.option("--atol", type=float, default=1e-3, help="Absolute tolerance for rk45")
+@click.option(
+    "--fork-at",
+    type=float,
+    help="Fly the first FORK_AT seconds once and fork every run from there, the swept "
+    "parameters then only apply from FORK_AT on. Parameters that flight depends on, the "
+    "stage masses and anything of a stage that burnt before, are refused",
+)
+@click.option(
+    "--coast",
+    is_flag=True,
+    help="Fly unpowered arcs above the atmosphere in closed form instead of step by step",
+)
+@click.option("--verbose", is_flag=True)
+@stop_options
+@cache_options
+def sweep(
+    spec,
+    results,
+    workers,
+    t_end,
+    integrator,
+    dt,
+    rtol,
+    atol,
+    fork_at,
+    coast,
+    verbose,
+    stop_on_impact,
+    stop_at_apogee,
+    stop_after_burnout,
+    stop_altitude,
+    stop_velocity,
+    stop_on_orbit,
+    no_cache,
+    clear_cache,
+    cache_dir,
+    cache_size,
+):
+    # Fly every run of a JSON grid or sample spec (see xrocket.sweep.expand_spec) across
+    # a process pool and collect their summary metrics into one results table
+    from xrocket.sweep import expand_spec, fork_checkpoint, load_spec, run_sweep
+
+    log_setup(logging.INFO if verbose else logging.ERROR)
+    if clear_cache:
+        open_cache(cache_dir).clear()
+    runs = expand_spec(load_spec(spec))
+    checkpoint = None
+    if fork_at is not None:
+        try:
+            checkpoint = fork_checkpoint(runs, fork_at, dt, integrator, rtol, atol, coast)
+        except ValueError as error:
+            raise click.BadParameter(str(error), param_hint="--fork-at")
+
+    def progress(done, total):
+        click.echo(f"{done}/{total} runs done", err=True)
+
+    run_sweep(
+        runs,
+        results,
+        t_end,
+        dt=dt,
+        integrator=integrator,
+        rtol=rtol,
+        atol=atol,
+        workers=workers,
+        progress=progress,
+        fork_at=fork_at,
+        checkpoint=checkpoint,
+        cache=None if no_cache else open_cache(cache_dir, cache_size),
+        stop=stop_conditions(
+            stop_on_impact,
+            stop_at_apogee,
+            stop_after_burnout,
+            stop_altitude,
+            stop_velocity,
+            stop_on_orbit,
+        ),
+        coast=coast,
     )
 
-    # Create dictionary and associated keys for use with HUD GUI within pygame
-    rocket_parameters = {}
-    create_rocket_dict(rocket_parameters)
-
-    # Loop over rocket.update and its related methods while the rocket still has fuel
-    while t < 3000:
-        t += 0.01
-        # fmt: off
-        LOG.debug(f"Time is {t} seconds")
-        rocket.update(dt)
-        if show_plots or save_plots:
-            update_rocket_dict(
-                rocket_parameters=rocket_parameters,
-                t=t,
-                rocket=rocket,
-                core_stage=core_stage,
-                srb_stage=srb_stage,
-                interim_stage=interim_stage,
-                exploration_stage=exploration_stage
-                )
 
-    if show_plots or save_plots:
-        csv_output(rocket_parameters)
+@cli.command("run-batch")
+@click.argument("jobs", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--output-dir",
+    type=click.Path(file_okay=False),
+    default="Batch Results",
+    help="Directory of the job outputs and manifest.jsonl, jobs already in it are skipped",
+)
+@click.option(
+    "--workers",
+    type=int,
+    default=1,
+    help="Warm processes running the jobs, 1 runs them all in this process",
+)
+@click.option("--verbose", is_flag=True)
+def run_batch_jobs(jobs, output_dir, workers, verbose):
+    # Fly every job of a JSON lines file (see xrocket.jobs) in one warm process or a pool
+    # of them, rather than paying the startup of one process per scenario. Exits with
+    # status 1 if any job failed
+    from xrocket.jobs import load_jobs, run_batch
 
+    log_setup(logging.INFO if verbose else logging.ERROR)
+    try:
+        jobs = load_jobs(jobs)
+    except ValueError as error:
+        raise click.BadParameter(str(error), param_hint="JOBS")
 
-    create_plots(rocket_parameters, show_plots, save_plots)
+    def progress(done, total, entry):
+        status = entry["status"] if entry["status"] == "ok" else entry["error"]
+        click.echo(f"{done}/{total} {entry['id']}: {status}", err=True)
 
+    totals = run_batch(jobs, output_dir, workers=workers, progress=progress)
+    startups = list(totals["startup_seconds"].values())
+    if startups:
+        click.echo(
+            f"{totals['jobs']} jobs in {totals['seconds']:.2f} s, {totals['failed']} failed, "
+            f"{len(startups)} processes warmed up in {max(startups):.3f} s at most",
+            err=True,
+        )
+    if totals["failed"]:
+        raise SystemExit(1)
+
+
+@cli.command("optimize")
+@click.option(
+    "--objective",
+    default="apogee",
+    callback=parse_objective,
+    metavar="NAME",
+    show_default=True,
+    help="apogee: highest altitude. horizontal: horizontal speed at the end of the powered "
+    "flight. margin: that speed above circular orbit speed at that altitude",
+)
+@click.option(
+    "--knots",
+    type=int,
+    default=6,
+    show_default=True,
+    help="Knots of the piecewise linear pitch program, spread evenly over the powered flight",
+)
+@click.option(
+    "--population", type=int, default=32, show_default=True, help="Programs per generation"
+)
+@click.option(
+    "--elites", type=int, default=8, show_default=True, help="Best programs the search centres on"
+)
+@click.option("--generations", type=int, default=20, show_default=True)
+@click.option(
+    "--sigma",
+    type=float,
+    default=10.0,
+    show_default=True,
+    metavar="DEGREES",
+    help="Initial spread of the knot angles around the pitches of the vehicle's staging",
+)
+@click.option("--seed", type=int, help="Seed of the sampled programs, for a repeatable search")
+@click.option("--workers", type=int, default=None, help="Processes, all cores by default")
+@click.option(
+    "--no-prune",
+    is_flag=True,
+    help="Fly every program to the end, even once it can no longer beat the elites",
+)
+@click.option("--t-end", type=float, default=3000, help="Flight time limit in seconds")
+@click.option("--dt", type=float, default=0.1, show_default=True, help="Time step of every flight")
+@click.option("--kernel", type=click.Choice(list(ROCKET_KERNELS)), default="fast")
+@vehicle_option
+@gravity_options
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default="Pitch Program.json",
+    help="JSON file of the best program, the baseline and the convergence history",
+)
+@click.option(
+    "--history",
+    type=click.Path(dir_okay=False),
+    help="CSV file of the convergence history, a row per generation",
+)
+@click.option("--verbose", is_flag=True)
+def optimize_pitch(
+    objective,
+    knots,
+    population,
+    elites,
+    generations,
+    sigma,
+    seed,
+    workers,
+    no_prune,
+    t_end,
+    dt,
+    kernel,
+    vehicle,
+    j2,
+    latitude,
+    output,
+    history,
+    verbose,
+):
+    # Search for the pitch program maximizing an objective of the flight, flying every
+    # generation of programs across a process pool, see xrocket.optimize
+    from xrocket.optimize import optimize, save_history, save_result
+
+    log_setup(logging.INFO if verbose else logging.ERROR)
+    settings = {
+        "objective": objective,
+        "knots": knots,
+        "t_end": t_end,
+        "dt": dt,
+        "vehicle": vehicle,
+        "kernel": kernel,
+        "j2": j2,
+        "latitude": latitude,
+    }
+
+    def progress(entry):
+        click.echo(
+            f"Generation {entry['generation']}/{generations}: best {entry['best']:.6g}, "
+            f"elite mean {entry['elite_mean']:.6g}, sigma {entry['sigma']:.2f} deg, "
+            f"{entry['pruned']} pruned, {entry['failed']} failed, "
+            f"{entry['evaluations_per_second']:.1f} evaluations/s",
+            err=True,
+        )
+
+    try:
+        result = optimize(
+            settings,
+            population=population,
+            elites=elites,
+            generations=generations,
+            sigma=sigma,
+            seed=seed,
+            workers=workers,
+            prune=not no_prune,
+            progress=progress,
+        )
+    except ValueError as error:
+        raise click.UsageError(str(error))
+    save_result(result, output)
+    if history:
+        save_history(result["history"], history)
+
+    unit = result["unit"]
+    click.echo(
+        f"{result['evaluations']} evaluations in {result['seconds']:.2f} s, "
+        f"{result['evaluations_per_second']:.1f} evaluations/s, {result['pruned']} pruned",
+        err=True,
+    )
+    click.echo(f"Baseline {objective}: {result['baseline']['score']:.6g} {unit}")
+    click.echo(f"Best {objective}: {result['best']['score']:.6g} {unit}")
+    if result["best"]["angles"] is not None:
+        for t, angle in zip(result["times"], result["best"]["angles"]):
+            click.echo(f"  t = {t:8.2f} s  pitch {angle:7.2f} deg")
+
+
+@cli.group("benchmark")
+def benchmark():
+    # Time and memory benchmarks of the simulation, telemetry and plotting paths
+    pass
+
+
+@benchmark.command("run")
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default="benchmark.json",
+    help="JSON file the results are written to, e.g. to keep as a baseline",
+)
+@click.option("--repeat", type=int, default=3, help="Timed runs of every case, the best counts")
+@click.option(
+    "--case",
+    "cases",
+    multiple=True,
+    callback=parse_cases,
+    metavar="NAME",
+    help="Case to run, may be given more than once, every case by default",
+)
+def benchmark_run(output, repeat, cases):
+    from xrocket.benchmark import run_benchmarks, save_results
+
+    def progress(name, result):
+        click.echo(
+            f"{name}: {result['seconds']:.4f} s, peak {result['peak_memory'] / 1e3:.0f} kB",
+            err=True,
+        )
+
+    save_results(run_benchmarks(cases, repeat=repeat, progress=progress), output)
+
+
+@benchmark.command("compare")
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False), required=False)
+@click.option(
+    "--threshold",
+    type=float,
+    help="Slowdown or memory growth over the baseline flagged as a regression, 0.1 is 10%, "
+    "the default",
+)
+@click.option("--repeat", type=int, default=3, help="Timed runs of every case, the best counts")
+def benchmark_compare(baseline, current, threshold, repeat):
+    # Compare CURRENT results, or a fresh run of the cases in BASELINE, against BASELINE.
+    # Exits with status 1 if any case regressed
+    from xrocket.benchmark import (
+        BENCHMARKS,
+        DEFAULT_THRESHOLD,
+        compare_results,
+        format_comparison,
+        load_results,
+        run_benchmarks,
+    )
+
+    if threshold is None:
+        threshold = DEFAULT_THRESHOLD
+    baseline = load_results(baseline)
+    if current is None:
+        cases = [name for name in baseline["results"] if name in BENCHMARKS]
+        current = run_benchmarks(cases, repeat=repeat)
+    else:
+        current = load_results(current)
+
+    rows = compare_results(baseline, current, threshold)
+    click.echo(format_comparison(rows))
+    if any(regressed for *_, regressed in rows):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
-if __name__ == "__main__":
-    run_rocket()
+    cli()
 
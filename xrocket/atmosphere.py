@@ -0,0 +1,118 @@
+import bisect
+import math
+
+import numpy as np
+
+# U.S. Standard Atmosphere 1976, lower 86 km
+# Reference: https://ntrs.nasa.gov/citations/19770009539
+GAS_CONSTANT = 8.31432  # J / (mol K) [R*]
+MOLAR_MASS = 0.0289644  # kg / mol [M0]
+STANDARD_GRAVITY = 9.80665  # m / s**2 [g0]
+HEAT_CAPACITY_RATIO = 1.4  # [gamma]
+GEOPOTENTIAL_RADIUS = 6356766  # m [r0]
+
+# Base geopotential altitude (m), base temperature (K), temperature lapse rate (K / m)
+LAYERS = [
+    (0, 288.15, -0.0065),
+    (11000, 216.65, 0.0),
+    (20000, 216.65, 0.001),
+    (32000, 228.65, 0.0028),
+    (47000, 270.65, 0.0),
+    (51000, 270.65, -0.0028),
+    (71000, 214.65, -0.002),
+]
+SEA_LEVEL_PRESSURE = 101325  # Pa
+
+# Air density is taken as zero above the top of the tables
+ATMOSPHERE_TOP = 86000  # m, geometric
+TABLE_STEP = 250  # m
+
+
+def _standard_atmosphere(altitude):
+    # Temperature (K) and pressure (Pa) at a geometric altitude from the layer equations
+    h = GEOPOTENTIAL_RADIUS * altitude / (GEOPOTENTIAL_RADIUS + altitude)
+    pressure = SEA_LEVEL_PRESSURE
+    for index, (h_base, t_base, lapse) in enumerate(LAYERS):
+        h_top = LAYERS[index + 1][0] if index + 1 < len(LAYERS) else math.inf
+        dh = min(h, h_top) - h_base
+        if lapse == 0:
+            layer_pressure = pressure * math.exp(
+                -STANDARD_GRAVITY * MOLAR_MASS * dh / (GAS_CONSTANT * t_base)
+            )
+        else:
+            layer_pressure = pressure * (t_base / (t_base + lapse * dh)) ** (
+                STANDARD_GRAVITY * MOLAR_MASS / (GAS_CONSTANT * lapse)
+            )
+        if h <= h_top:
+            return t_base + lapse * dh, layer_pressure
+        pressure = layer_pressure
+
+
+def _build_tables():
+    altitudes = np.arange(0, ATMOSPHERE_TOP + TABLE_STEP, TABLE_STEP, dtype=float)
+    temperatures = []
+    densities = []
+    for altitude in altitudes:
+        temperature, pressure = _standard_atmosphere(altitude)
+        temperatures.append(temperature)
+        densities.append(pressure * MOLAR_MASS / (GAS_CONSTANT * temperature))
+    temperatures = np.array(temperatures)
+    speeds_of_sound = np.sqrt(
+        HEAT_CAPACITY_RATIO * GAS_CONSTANT * temperatures / MOLAR_MASS
+    )
+    return altitudes, np.array(densities), temperatures, speeds_of_sound
+
+
+ALTITUDES, DENSITIES, TEMPERATURES, SPEEDS_OF_SOUND = _build_tables()
+
+# Plain lists for the scalar lookup, indexing them is much cheaper than indexing arrays
+_ALTITUDE_LIST = ALTITUDES.tolist()
+_DENSITY_LIST = DENSITIES.tolist()
+_TEMPERATURE_LIST = TEMPERATURES.tolist()
+_SPEED_OF_SOUND_LIST = SPEEDS_OF_SOUND.tolist()
+
+
+def atmosphere(altitude):
+    # Air density (kg / m**3), temperature (K) and speed of sound (m / s) at a geometric
+    # altitude (m), linearly interpolated between table rows. Takes a scalar or an array
+    # of altitudes and returns the same. Below sea level the sea level row is used, above
+    # the top of the tables density is zero and temperature and speed of sound stay at
+    # their last value
+    if not isinstance(altitude, (int, float)) and np.ndim(altitude):
+        altitude = np.asarray(altitude, dtype=float)
+        density = np.interp(altitude, ALTITUDES, DENSITIES)
+        density[altitude > ATMOSPHERE_TOP] = 0
+        return (
+            density,
+            np.interp(altitude, ALTITUDES, TEMPERATURES),
+            np.interp(altitude, ALTITUDES, SPEEDS_OF_SOUND),
+        )
+
+    if altitude <= 0:
+        return _DENSITY_LIST[0], _TEMPERATURE_LIST[0], _SPEED_OF_SOUND_LIST[0]
+    if altitude > ATMOSPHERE_TOP:
+        return 0.0, _TEMPERATURE_LIST[-1], _SPEED_OF_SOUND_LIST[-1]
+    index = bisect.bisect_left(_ALTITUDE_LIST, altitude)
+    low = index - 1
+    fraction = (altitude - _ALTITUDE_LIST[low]) / (
+        _ALTITUDE_LIST[index] - _ALTITUDE_LIST[low]
+    )
+    return (
+        _DENSITY_LIST[low] + fraction * (_DENSITY_LIST[index] - _DENSITY_LIST[low]),
+        _TEMPERATURE_LIST[low]
+        + fraction * (_TEMPERATURE_LIST[index] - _TEMPERATURE_LIST[low]),
+        _SPEED_OF_SOUND_LIST[low]
+        + fraction * (_SPEED_OF_SOUND_LIST[index] - _SPEED_OF_SOUND_LIST[low]),
+    )
+
+
+def air_density(altitude):
+    return atmosphere(altitude)[0]
+
+
+def temperature(altitude):
+    return atmosphere(altitude)[1]
+
+
+def speed_of_sound(altitude):
+    return atmosphere(altitude)[2]
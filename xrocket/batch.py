@@ -0,0 +1,363 @@
+import copy
+import logging
+import warnings
+
+import numpy as np
+
+from xrocket.atmosphere import atmosphere
+from xrocket.drag import load_drag_curve
+from xrocket.gravity import PointMassGravity
+from xrocket.settings import EARTH_MASS, EARTH_RADIUS
+from xrocket.vehicle import SLS_STAGING, compile_vehicle
+
+LOG = logging.getLogger(__name__)
+
+# Arrays that change in flight, plan_staging walks copies of them
+STAGE_ARRAYS = (
+    "dry_mass",
+    "prop_mass",
+    "stage_total_mass",
+    "mass_flow",
+    "exhaust_velocity",
+    "stage_reference_area",
+    "stage_thrust",
+    "firing",
+    "attached",
+    "phase",
+    "theta",
+)
+
+
+def _stage_column(stages, key, n):
+    # Each settings value may be a scalar or an array of n dispersed values
+    columns = [np.broadcast_to(np.asarray(stage[key], dtype=float), (n,)) for stage in stages]
+    return np.stack(columns, axis=1).copy()
+
+
+class BatchRocket:
+    # Vectorized counterpart of Rocket: every attribute holds one value per vehicle
+    # (shape (n,)) or one value per vehicle and stage (shape (n, stages)) and update(dt)
+    # advances all vehicles at once, mirroring the order of Rocket.update. stages are
+    # settings dictionaries flown through the phases of an xrocket.vehicle.StagingTable,
+    # the SLS sequence of settings.py by default. Like Rocket, every vehicle stages at the
+    # burnouts of its own schedule, see plan_staging
+    def __init__(self, stages, *args, **kwargs):
+        if isinstance(stages, dict):
+            # BatchRocket(core, srb, interim, exploration, earth_mass, earth_radius, n, ...)
+            # of the SLS, from before the stages came as one list
+            warnings.warn(
+                "BatchRocket(core_stage, srb_stage, interim_stage, exploration_stage, ...) "
+                "is deprecated, pass the stages as one list: BatchRocket([core_stage, "
+                "srb_stage, interim_stage, exploration_stage], ...)",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            stages, args = [stages, *args[:3]], args[3:]
+        self._setup(stages, *args, **kwargs)
+
+    def _setup(
+        self,
+        stages,
+        earth_mass,
+        earth_radius,
+        n,
+        drag_curve=None,
+        staging=None,
+        gravity_model=None,
+    ):
+        self.n = n
+        self.staging = staging if staging is not None else SLS_STAGING
+        stages = list(stages)
+        if len(stages) != len(self.staging.stage_names):
+            raise ValueError(
+                f"{len(stages)} stages for a staging table of {len(self.staging.stage_names)}"
+            )
+        k = len(stages)
+
+        # Stage values, settings dictionaries use the same keys as settings.py
+        self.dry_mass = _stage_column(stages, "Dry Mass", n)
+        self.prop_mass = _stage_column(stages, "Propellant Mass", n)
+        self.stage_total_mass = self.dry_mass + self.prop_mass
+        self.mass_flow = _stage_column(stages, "Mass Flow", n)
+        self.mass_flow_copy = self.mass_flow.copy()
+        self.exhaust_velocity = _stage_column(stages, "Exhaust Velocity", n)
+        self.exhaust_velocity_copy = self.exhaust_velocity.copy()
+        self.stage_reference_area = _stage_column(stages, "Reference Area", n)
+        self.stage_thrust = np.zeros((n, k))
+        self.firing = np.ones((n, k), dtype=bool)
+        self.attached = np.ones((n, k), dtype=bool)
+        # Bit of every stage in the burnt out masks of StagingTable.transitions
+        self.stage_bits = 1 << np.arange(k)
+        self.transitions = np.array(self.staging.transitions)
+
+        # Phase id of every vehicle in the staging table, current_stage holds their names
+        self.phase = np.zeros(n, dtype=int)
+        # Flight time of every vehicle, and its burnouts ahead as (n, k) arrays of times
+        # and stage columns, padded with infinite times. next_event indexes the next one
+        self.time = np.zeros(n)
+        self.event_times = None
+        self.event_stages = None
+        self.next_event = np.zeros(n, dtype=int)
+        self.reference_area = np.zeros(n)
+        self.air_density = np.full(n, 1.225)
+        self.speed_of_sound = np.full(n, 340.294)
+
+        # Forces
+        self.drag_force = np.zeros(n)
+
+        # Update values
+        self.rocket_acceleration = np.zeros(n)
+        self.rocket_velocity = np.zeros(n)
+        self.pos = np.zeros((n, 2))
+        self.theta = np.full(n, float(self.staging.pitch))
+
+        # Values used to calculate drag force
+        self.drag_coefficient = np.zeros(n)
+        self.mach_speed = np.zeros(n)
+        # Drag curve of each phase, the "Drag Curve" file of the stage leading it or drag_curve
+        drag_curve = drag_curve if drag_curve is not None else load_drag_curve()
+        stage_curves = [
+            load_drag_curve(stage["Drag Curve"]) if stage.get("Drag Curve") else drag_curve
+            for stage in stages
+        ]
+        self.drag_curves = [stage_curves[leading] for leading in self.staging.leading]
+        self.earth_mass = earth_mass
+        self.earth_radius = earth_radius
+        if gravity_model is None:
+            gravity_model = PointMassGravity(earth_mass, earth_radius)
+        self.gravity_model = gravity_model
+
+    @property
+    def current_stage(self):
+        # Name of the phase of every vehicle, as Rocket.current_stage
+        return np.array(self.staging.phase_names)[self.phase]
+
+    # Masses
+    @property
+    def total_dry_mass(self):
+        return self.dry_mass.sum(axis=1)
+
+    @property
+    def total_propellant_mass(self):
+        return self.prop_mass.sum(axis=1)
+
+    @property
+    def total_mass(self):
+        return self.stage_total_mass.sum(axis=1)
+
+    # Forces
+    @property
+    def gravity_acceleration(self):
+        # One gravity model call over every vehicle
+        return self.gravity_model.acceleration(self.pos[:, 1])
+
+    @property
+    def weight(self):
+        return self.total_mass * self.gravity_acceleration
+
+    @property
+    def gravity(self):
+        return -self.gravity_acceleration
+
+    @property
+    def thrust(self):
+        return np.where(self.firing, self.stage_thrust, 0).sum(axis=1)
+
+    @property
+    def resultant_force(self):
+        return self.thrust + self.weight + self.drag_force
+
+    def flight_controller(self, vehicles):
+        # Rocket.flight_controller for the vehicles of the boolean mask vehicles: each
+        # enters the phase the staging table gives for its stages burnt out, if any, and
+        # applies its shutdowns, jettisons, ignitions and pitch
+        staging = self.staging
+        burnt_out = ((self.prop_mass <= 0) * self.stage_bits).sum(axis=1)
+        phase = self.transitions[burnt_out]
+        entering = vehicles & (phase >= 0)
+        for phase_id in np.unique(phase[entering]):
+            selected = entering & (phase == phase_id)
+            for index in staging.shutdown[phase_id]:
+                self.firing[selected, index] = False
+            for index in staging.jettison[phase_id]:
+                self.firing[selected, index] = False
+                self.attached[selected, index] = False
+            for index in staging.ignite[phase_id]:
+                self.firing[selected, index] = True
+            self.phase[selected] = phase_id
+            pitch = staging.pitches[phase_id]
+            if pitch is not None:
+                self.theta[selected] = pitch
+
+    def stage_event(self, vehicles, stages=None):
+        # Rocket.stage_event for the vehicles of the boolean mask vehicles: burn out column
+        # stages[i] of every such vehicle i if given, then run the flight controller and
+        # pick up its firing and attachment flags without draining any propellant
+        if stages is not None:
+            rows = np.flatnonzero(vehicles)
+            columns = stages[rows]
+            self.prop_mass[rows, columns] = 0.0
+            self.stage_total_mass[rows, columns] = self.dry_mass[rows, columns]
+        self.flight_controller(vehicles)
+        selected = vehicles[:, None]
+        self.mass_flow = np.where(
+            selected, np.where(self.firing, self.mass_flow_copy, 0), self.mass_flow
+        )
+        self.exhaust_velocity = np.where(
+            selected, np.where(self.firing, self.exhaust_velocity_copy, 0), self.exhaust_velocity
+        )
+        detached = selected & ~self.attached
+        self.dry_mass = np.where(detached, 0, self.dry_mass)
+        self.stage_reference_area = np.where(detached, 0, self.stage_reference_area)
+        self.stage_thrust = np.where(
+            selected,
+            np.where(self.prop_mass > 0, self.exhaust_velocity * self.mass_flow, 0),
+            self.stage_thrust,
+        )
+
+    def plan_staging(self):
+        # Rocket.plan_staging for every vehicle at once: walk the flight controller from
+        # burnout to burnout on copies of the stage arrays. Returns (n, k) arrays of the
+        # burnout times and the stage burning out, infinite times once a vehicle has none
+        # left
+        rocket = copy.copy(self)
+        for name in STAGE_ARRAYS:
+            setattr(rocket, name, getattr(self, name).copy())
+        everyone = np.ones(self.n, dtype=bool)
+        rocket.stage_event(everyone)
+        t = self.time.copy()
+        times = []
+        stages = []
+        rows = np.arange(self.n)
+        while True:
+            burning = (rocket.mass_flow < 0) & (rocket.prop_mass > 0)
+            burn_times = np.where(
+                burning, rocket.prop_mass / np.where(burning, -rocket.mass_flow, 1), np.inf
+            )
+            # The lowest column on a tie, as min over (time, index) pairs in Rocket
+            column = burn_times.argmin(axis=1)
+            burn_time = burn_times[rows, column]
+            burns = np.isfinite(burn_time)
+            if not burns.any():
+                break
+            step = np.where(burns, burn_time, 0.0)
+            rocket.prop_mass = np.maximum(rocket.prop_mass + rocket.mass_flow * step[:, None], 0.0)
+            rocket.stage_total_mass = np.maximum(rocket.prop_mass + rocket.dry_mass, 0.0)
+            t = t + step
+            rocket.stage_event(burns, column)
+            times.append(np.where(burns, t, np.inf))
+            stages.append(column)
+        times.append(np.full(self.n, np.inf))
+        stages.append(np.zeros(self.n, dtype=int))
+        return np.stack(times, axis=1), np.stack(stages, axis=1)
+
+    def update_stages(self, dt):
+        # Stage.update for every stage of every vehicle: calc_mass, check_firing,
+        # check_attachment and calc_thrust in that order. dt may hold one step per vehicle
+        dt = np.asarray(dt)[..., None]
+        self.prop_mass = np.maximum(self.prop_mass + self.mass_flow * dt, 0.0)
+        self.stage_total_mass = np.maximum(self.prop_mass + self.dry_mass, 0.0)
+        self.mass_flow = np.where(self.firing, self.mass_flow_copy, 0)
+        self.exhaust_velocity = np.where(self.firing, self.exhaust_velocity_copy, 0)
+        self.dry_mass = np.where(self.attached, self.dry_mass, 0)
+        self.stage_reference_area = np.where(self.attached, self.stage_reference_area, 0)
+        self.stage_thrust = np.where(
+            self.prop_mass > 0, self.exhaust_velocity * self.mass_flow, 0
+        )
+
+    def calc_air_density(self):
+        self.air_density, _, self.speed_of_sound = atmosphere(self.pos[:, 1])
+
+    def calc_reference_area(self):
+        # Sum of the reference areas the phase of every vehicle adds up and subtracts
+        area = self.stage_reference_area
+        by_phase = np.stack(
+            [
+                area[:, first] + area[:, list(added)].sum(axis=1)
+                - area[:, list(subtracted)].sum(axis=1)
+                for first, added, subtracted in self.staging.area_terms
+            ],
+            axis=1,
+        )
+        self.reference_area = np.take_along_axis(by_phase, self.phase[:, None], axis=1)[:, 0]
+
+    def calc_drag_coefficient(self):
+        # One vectorized lookup per distinct curve over the vehicles flying on it
+        curves = set(self.drag_curves)
+        if len(curves) == 1:
+            self.drag_coefficient = self.drag_curves[0](self.mach_speed)
+            return
+        for curve in curves:
+            phases = [phase for phase, other in enumerate(self.drag_curves) if other is curve]
+            flying = np.isin(self.phase, phases)
+            self.drag_coefficient[flying] = curve(self.mach_speed[flying])
+
+    def calc_drag_force(self, dt):
+        self.mach_speed = self.rocket_velocity / self.speed_of_sound
+        self.calc_drag_coefficient()
+        drag = (
+            0.5
+            * self.air_density
+            * (self.rocket_velocity**2)
+            * self.drag_coefficient
+            * self.reference_area
+        )
+        self.drag_force = np.where(self.rocket_velocity > 0, -drag, drag)
+
+    def calc_acc_vel(self, dt):
+        self.rocket_acceleration = self.resultant_force / self.total_mass
+        self.rocket_velocity = self.rocket_velocity + self.rocket_acceleration * dt
+
+    def move(self, dt):
+        theta = np.radians(self.theta)
+        distance = self.rocket_velocity * dt + 0.5 * self.rocket_acceleration * dt**2
+        self.pos[:, 0] += distance * np.cos(theta)
+        self.pos[:, 1] += distance * np.sin(theta)
+
+    def update(self, dt):
+        # Rocket.update for every vehicle: a step holding burnouts is split at them, so
+        # every vehicle stages exactly at its own burnout times
+        if self.event_times is None:
+            # Like the first event of Rocket's schedule, run the flight controller now
+            self.event_times, self.event_stages = self.plan_staging()
+            self.stage_event(np.ones(self.n, dtype=bool))
+        rows = np.arange(self.n)
+        t_end = self.time + dt
+        while True:
+            event_time = self.event_times[rows, self.next_event]
+            due = event_time <= t_end
+            if not due.any():
+                break
+            # Vehicles without a burnout in the step, or at the current time, stand still
+            ahead = due & (event_time > self.time)
+            if ahead.any():
+                self.step(np.where(ahead, event_time - self.time, 0.0))
+                self.time = np.where(ahead, event_time, self.time)
+            self.stage_event(due, self.event_stages[rows, self.next_event])
+            self.next_event = self.next_event + due
+        self.step(t_end - self.time)
+        self.time = t_end
+
+    def step(self, dt):
+        # Advance every vehicle by its entry of dt with the current staging
+        self.update_stages(dt)
+        self.calc_air_density()
+        self.calc_reference_area()
+        self.calc_drag_force(dt)
+        self.calc_acc_vel(dt)
+        self.move(dt)
+
+
+def build_batch(vehicle, n, gravity_model=None):
+    # BatchRocket of n vehicles flying a vehicle definition from
+    # xrocket.vehicle.load_vehicle, as xrocket.simulation.build_vehicle builds a Rocket.
+    # Any stage setting may be replaced by an array of n dispersed values
+    return BatchRocket(
+        list(vehicle["stages"].values()),
+        EARTH_MASS,
+        EARTH_RADIUS,
+        n,
+        drag_curve=load_drag_curve(vehicle["drag_curve"]) if vehicle.get("drag_curve") else None,
+        staging=compile_vehicle(vehicle),
+        gravity_model=gravity_model,
+    )
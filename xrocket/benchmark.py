@@ -0,0 +1,203 @@
+import datetime
+import gc
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from xrocket.plots import create_plots, create_rocket_dict, csv_output, update_rocket_dict
+from xrocket.scheduler import Scheduler
+from xrocket.simulation import build_rocket, simulate
+from xrocket.telemetry import CHANNELS
+
+# Benchmark cases by name. Each case sets up its inputs and returns the function to
+# time, so only the work under test is measured. Cases run inside a temporary directory
+# and write their files relative to it
+BENCHMARKS = {}
+
+# Relative slowdown or memory growth over the baseline that counts as a regression
+DEFAULT_THRESHOLD = 0.1
+
+
+def benchmark(name):
+    def register(case):
+        BENCHMARKS[name] = case
+        return case
+
+    return register
+
+
+def _telemetry(rows):
+    # Telemetry dictionary of the given length with every channel filled
+    time_channel = np.linspace(0, 3000, rows)
+    return {
+        channel: time_channel if channel == "Time" else np.sin(time_channel / (index + 1))
+        for index, channel in enumerate(CHANNELS)
+    }
+
+
+@benchmark("rocket_update")
+def rocket_update():
+    # 1000 Rocket.update steps of 0.01 s, staging included
+    rocket = build_rocket()
+
+    def run():
+        for _ in range(1000):
+            rocket.update(0.01)
+
+    return run
+
+
+def _full_run(dt, integrator="euler", kernel="reference", coast=False, multirate=False):
+    def case():
+        rocket = build_rocket(kernel=kernel)
+        if multirate:
+            rocket.scheduler = Scheduler()
+        return lambda: simulate(rocket, 3000, dt=dt, integrator=integrator, coast=coast)
+
+    return case
+
+
+for _dt in (0.1, 0.05, 0.01):
+    benchmark(f"run_euler_dt_{_dt}")(_full_run(_dt))
+benchmark("run_rk45")(_full_run(0.01, "rk45"))
+benchmark("run_euler_dt_0.01_fast")(_full_run(0.01, kernel="fast"))
+benchmark("run_euler_dt_0.01_coast")(_full_run(0.01, coast=True))
+benchmark("run_euler_dt_0.01_multirate")(_full_run(0.01, multirate=True))
+
+
+@benchmark("update_rocket_dict")
+def record_rocket_dict():
+    # 10000 telemetry rows appended to the create_rocket_dict lists
+    rocket = build_rocket()
+    rocket.update(0.01)
+
+    def run():
+        rocket_parameters = {}
+        create_rocket_dict(rocket_parameters)
+        for step in range(10000):
+            update_rocket_dict(
+                rocket_parameters,
+                step * 0.01,
+                rocket,
+                rocket.core_stage,
+                rocket.srb_stage,
+                rocket.interim_stage,
+                rocket.exploration_stage,
+            )
+
+    return run
+
+
+def _csv_output(rows):
+    def case():
+        rocket_parameters = _telemetry(rows)
+        return lambda: csv_output(rocket_parameters, "Rocket Values.csv")
+
+    return case
+
+
+for _rows in (10000, 100000):
+    benchmark(f"csv_output_{_rows}")(_csv_output(_rows))
+
+
+@benchmark("create_plots")
+def save_plots():
+    # Every plot saved at 100 dpi from 300000 rows, the length of a dt 0.01 run
+    rocket_parameters = _telemetry(300000)
+    return lambda: create_plots(rocket_parameters, False, True, dpi=100, max_points=5000)
+
+
+def measure(case, repeat=3):
+    # Best and mean time over repeat runs, then the peak of Python allocations over one
+    # more run under tracemalloc. Allocations of worker processes are not included
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            return _measure(case, repeat)
+        finally:
+            os.chdir(cwd)
+
+
+def _measure(case, repeat):
+    times = []
+    for _ in range(repeat):
+        run = case()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    run = case()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "seconds": min(times),
+        "mean_seconds": sum(times) / len(times),
+        "peak_memory": peak_memory,
+    }
+
+
+def run_benchmarks(names=None, repeat=3, progress=None):
+    # Results of the named cases, every case by default. progress(name, result) is
+    # called after every case
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Unknown benchmark {name}")
+        results[name] = measure(BENCHMARKS[name], repeat=repeat)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def save_results(results, path):
+    with open(path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+def load_results(path):
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # One row per case and metric found in both: (case, metric, baseline, current, ratio,
+    # regressed) where a regression is a ratio above 1 + threshold
+    rows = []
+    for name, result in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        for metric in ("seconds", "peak_memory"):
+            before = baseline["results"][name][metric]
+            after = result[metric]
+            ratio = after / before if before else 1.0
+            rows.append((name, metric, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'Benchmark':<24}{'Metric':<13}{'Baseline':>14}{'Current':>14}{'Ratio':>8}"]
+    for name, metric, before, after, ratio, regressed in rows:
+        lines.append(
+            f"{name:<24}{metric:<13}{before:>14.6g}{after:>14.6g}{ratio:>8.2f}"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return "\n".join(lines)
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+
+from xrocket.drag import DEFAULT_DRAG_CURVE
+from xrocket.settings import EARTH_MASS, EARTH_RADIUS
+from xrocket.simulation import stage_settings
+
+LOG = logging.getLogger(__name__)
+
+# Part of every cache key. It must change whenever a change to the physics or to the
+# output of an integrator changes the results of a flight, so that older entries are no
+# longer found.
+# 2: rk4 and rk45 thrust follows the stages burning since the last staging event
+MODEL_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "xrocket",
+)
+DEFAULT_CACHE_SIZE = 2**30  # bytes
+
+# Telemetry of an entry by output format, see xrocket.telemetry.TELEMETRY_WRITERS
+TELEMETRY_FILES = {"csv": "telemetry.csv", "npy": "telemetry"}
+SUMMARY_FILE = "summary.json"
+
+
+def _file_digest(path):
+    with open(path, "rb") as data_file:
+        return hashlib.sha256(data_file.read()).hexdigest()
+
+
+def scenario_key(
+    overrides=None,
+    t_end=3000,
+    dt=0.01,
+    integrator="euler",
+    rtol=1e-6,
+    atol=1e-3,
+    start=None,
+    stop=None,
+    coast=False,
+    rates=None,
+    vehicle=None,
+    gravity=None,
+):
+    # Hash of everything a flight depends on: the stage settings with overrides, the
+    # contents of the drag curves, Earth, the integrator settings and MODEL_VERSION.
+    # start is anything else the flight starts from, e.g. a checkpoint or fork time, stop
+    # the stop conditions of xrocket.termination, coast whether arcs above the atmosphere
+    # are flown in closed form and rates the subsystem periods of an
+    # xrocket.scheduler.Scheduler, if any. vehicle is a definition from
+    # xrocket.vehicle.load_vehicle flown instead of the settings.py stages and overrides,
+    # gravity the describe() of an xrocket.gravity model other than point mass Earth
+    if vehicle is None:
+        settings = stage_settings(overrides)
+        default_curve = DEFAULT_DRAG_CURVE
+    else:
+        settings = vehicle["stages"]
+        default_curve = vehicle.get("drag_curve") or DEFAULT_DRAG_CURVE
+    drag_curves = {
+        path: _file_digest(path)
+        for path in [default_curve]
+        + [values["Drag Curve"] for values in settings.values() if values.get("Drag Curve")]
+    }
+    scenario = {
+        "model_version": MODEL_VERSION,
+        "settings": settings,
+        "drag_curves": drag_curves,
+        "earth": [EARTH_MASS, EARTH_RADIUS],
+        "t_end": t_end,
+        "dt": dt,
+        "integrator": integrator,
+        # Only the adaptive integrator uses its tolerances
+        "tolerances": [rtol, atol] if integrator == "rk45" else None,
+        "start": start,
+        "stop": [list(condition) for condition in stop or ()],
+        "coast": coast,
+        "rates": rates,
+    }
+    if gravity is not None:
+        scenario["gravity"] = gravity
+    if vehicle is not None:
+        scenario["vehicle"] = {
+            "pitch": vehicle.get("pitch", 90),
+            "stages": list(settings),
+            "phases": vehicle["phases"],
+        }
+    encoded = json.dumps(scenario, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _copy(source, destination):
+    # Copy a telemetry file, or every file of a telemetry directory
+    if os.path.isdir(source):
+        os.makedirs(destination, exist_ok=True)
+        for name in os.listdir(source):
+            shutil.copyfile(os.path.join(source, name), os.path.join(destination, name))
+    else:
+        shutil.copyfile(source, destination)
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+class ResultsCache:
+    # Telemetry and summaries of flights on disk, one directory per scenario_key. Entries
+    # are written to a temporary name and renamed into place, so a reader never sees half
+    # an entry. Every hit marks its entry as used, and once the cache is over max_bytes the
+    # least recently used entries are removed
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    def _hit(self, key, name):
+        path = os.path.join(self._entry(key), name)
+        if not os.path.exists(path):
+            return None
+        os.utime(self._entry(key))
+        LOG.info(f"Cache hit {key[:12]} {name}")
+        return path
+
+    def _put(self, key, name, write, evict=True):
+        # write(path) creates the file or directory name of entry key
+        entry = self._entry(key)
+        os.makedirs(entry, exist_ok=True)
+        path = os.path.join(entry, name)
+        temporary = os.path.join(entry, f".{name}.{uuid.uuid4().hex}")
+        write(temporary)
+        try:
+            os.replace(temporary, path)
+        except OSError:
+            # Another process stored the same directory first
+            shutil.rmtree(temporary, ignore_errors=True)
+        os.utime(entry)
+        if evict:
+            self.evict()
+
+    def get_summary(self, key):
+        path = self._hit(key, SUMMARY_FILE)
+        if path is None:
+            return None
+        with open(path) as summary_file:
+            return json.load(summary_file)
+
+    def put_summary(self, key, summary):
+        # Summaries take a few hundred bytes, call evict once done storing many of them
+        def write(path):
+            with open(path, "w") as summary_file:
+                json.dump(summary, summary_file)
+
+        self._put(key, SUMMARY_FILE, write, evict=False)
+
+    def get_telemetry(self, key, output_format, destination):
+        # Copy the cached telemetry to destination, False if there is none
+        path = self._hit(key, TELEMETRY_FILES[output_format])
+        if path is None:
+            return False
+        _copy(path, destination)
+        return True
+
+    def put_telemetry(self, key, output_format, source):
+        self._put(key, TELEMETRY_FILES[output_format], lambda path: _copy(source, path))
+
+    def entries(self):
+        # (last used, size in bytes, path) of every entry, least recently used first
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                entries.append((os.path.getmtime(path), _size(path), path))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            LOG.info(f"Evicted {os.path.basename(path)[:12]} from the cache")
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
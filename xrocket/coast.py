@@ -0,0 +1,184 @@
+import logging
+import math
+
+import numpy as np
+
+from xrocket.atmosphere import ATMOSPHERE_TOP
+
+LOG = logging.getLogger(__name__)
+
+# Kepler's equation is solved by Newton's method, falling back to bisection whenever a
+# Newton step leaves the bracket
+MAX_ITERATIONS = 60
+TOLERANCE = 1e-14
+
+
+def coasting(rocket):
+    # True when gravity is the only force on the rocket: above the atmosphere, where air
+    # density is zero, with no stage burning propellant and a pitch that climbs or falls.
+    # Only point mass gravity has the closed form of RadialArc, which also needs a pitch
+    # program, if any, to hold its last angle
+    stages = rocket.stages
+    program = rocket.pitch_program
+    return (
+        rocket.gravity_model.keplerian
+        and (
+            program is None
+            or (program.fixed(rocket.time) and rocket.theta == program(rocket.time))
+        )
+        and rocket.altitude > ATMOSPHERE_TOP
+        and math.sin(math.radians(rocket.theta)) > 0
+        and not any(
+            mass_flow and prop_mass > 0
+            for mass_flow, prop_mass in zip(stages.mass_flow, stages.prop_mass)
+        )
+    )
+
+
+class RadialArc:
+    # Unpowered flight of a rocket from its current state. The rocket flies along a fixed
+    # pitch theta with gravity along its flight path, so with r = (R + altitude) / sin(theta)
+    # the motion is dr/dt = v, dv/dt = -mu / r**2 where mu = GM / sin(theta)**2: the
+    # radial Kepler problem. Its closed form solution goes through the eccentric anomaly
+    # eta. Bound arcs (negative energy, a the semi-major axis) follow
+    #     r = a (1 - cos eta), t = (eta - sin eta) / n
+    # and unbound ones
+    #     r = a (cosh eta - 1), t = (sinh eta - eta) / n
+    # with n = sqrt(mu / a**3) and t the time since r = 0
+    def __init__(self, rocket):
+        theta = math.radians(rocket.theta)
+        self.cos_theta = math.cos(theta)
+        self.sin_theta = math.sin(theta)
+        self.t0 = rocket.time
+        rocket.calc_air_density()
+        self.x0, self.y0 = (float(value) for value in rocket.pos)
+        self.mu = rocket.gravity_model.gm / self.sin_theta**2
+        self.r0 = (rocket.earth_radius + self.y0) / self.sin_theta
+        v0 = float(rocket.rocket_velocity)
+        energy = v0**2 / 2 - self.mu / self.r0
+        self.bound = energy < 0
+        self.a = self.mu / (2 * abs(energy))
+        self.n = math.sqrt(self.mu / self.a**3)
+        self.speed_scale = math.sqrt(self.mu / self.a)
+
+        if self.bound:
+            eta = math.acos(max(-1.0, min(1.0, 1 - self.r0 / self.a)))
+            self.eta0 = eta if v0 >= 0 else 2 * math.pi - eta
+        else:
+            eta = math.acosh(1 + self.r0 / self.a)
+            self.eta0 = eta if v0 >= 0 else -eta
+        self.m0 = self.mean_anomaly(self.eta0)
+        self.eta = self.eta0
+
+        # The arc returns into the atmosphere on its way down, bound arcs always do
+        r_top = (rocket.earth_radius + ATMOSPHERE_TOP) / self.sin_theta
+        if self.bound:
+            self.eta_reentry = 2 * math.pi - math.acos(max(-1.0, min(1.0, 1 - r_top / self.a)))
+        elif v0 < 0:
+            self.eta_reentry = -math.acosh(1 + r_top / self.a)
+        else:
+            self.eta_reentry = math.inf
+        self.reentry_time = (
+            self.t0 + (self.mean_anomaly(self.eta_reentry) - self.m0) / self.n
+            if math.isfinite(self.eta_reentry)
+            else math.inf
+        )
+
+    def mean_anomaly(self, eta):
+        if self.bound:
+            return eta - math.sin(eta)
+        return math.sinh(eta) - eta
+
+    def radius_velocity(self, eta):
+        if self.bound:
+            one_minus_cos = 1 - math.cos(eta)
+            return self.a * one_minus_cos, self.speed_scale * math.sin(eta) / one_minus_cos
+        cosh_minus_one = math.cosh(eta) - 1
+        return self.a * cosh_minus_one, self.speed_scale * math.sinh(eta) / cosh_minus_one
+
+    def anomaly(self, t):
+        # Eccentric anomaly at time t, from the anomaly of the last call onwards
+        target = self.m0 + self.n * (t - self.t0)
+        low = self.eta0
+        if math.isfinite(self.eta_reentry):
+            high = self.eta_reentry
+        else:
+            # sinh eta - eta >= eta**3 / 6
+            high = max(self.eta0, (6 * target) ** (1 / 3))
+        eta = min(max(self.eta, low), high)
+        for _ in range(MAX_ITERATIONS):
+            error = self.mean_anomaly(eta) - target
+            if abs(error) <= TOLERANCE * max(1.0, abs(target)):
+                break
+            if error > 0:
+                high = eta
+            else:
+                low = eta
+            slope = 1 - math.cos(eta) if self.bound else math.cosh(eta) - 1
+            eta = eta - error / slope if slope > 0 else low - 1
+            if not low < eta < high:
+                eta = (low + high) / 2
+        self.eta = eta
+        return eta
+
+    def state(self, t):
+        # Position and velocity at time t
+        r, velocity = self.radius_velocity(self.anomaly(t))
+        distance = r - self.r0
+        return (
+            self.x0 + distance * self.cos_theta,
+            self.y0 + distance * self.sin_theta,
+            velocity,
+        )
+
+    def apply(self, rocket, t):
+        # Put the rocket in its state at time t and update what stepping would derive from
+        # it. Air density stays zero along the arc, so only the Mach number and drag
+        # coefficient change and the drag force stays a signed zero as in calc_drag_force
+        x, y, velocity = self.state(t)
+        rocket.pos = np.array([x, y])
+        rocket.rocket_velocity = velocity
+        rocket.time = t
+        rocket.air_density = 0.0
+        rocket.mach_speed = velocity / rocket.speed_of_sound
+        rocket.calc_drag_coefficient()
+        rocket.drag_force = -0.0 if velocity > 0 else 0.0
+        rocket.invalidate(rocket.POSITION_QUANTITIES)
+        rocket.rocket_acceleration = rocket.resultant_force / rocket.total_mass
+
+
+def coast(rocket, t_end, dt, callback=None, stop=None):
+    # Fly an unpowered arc above the atmosphere in closed form rather than step by step, on
+    # the time grid rocket.time + dt, + 2 dt, ... that stepping would take. The arc runs
+    # while the next grid time is at most t_end and before both the next staging event and
+    # the return into the atmosphere, the caller steps on from there. Grid times are only
+    # evaluated when callback(t, rocket) or stop(t, rocket) is given, otherwise the rocket
+    # moves straight to the last one. Returns the time reached and the stop reason, if any
+    arc = RadialArc(rocket)
+    t_exit = min(rocket.staging_schedule[0][0], arc.reentry_time)
+    timer = rocket.instrumentation
+    sample = callback is not None or stop is not None
+    t = rocket.time
+    t_start = t
+    reason = None
+    while t + dt <= t_end and t + dt < t_exit:
+        t += dt
+        if not sample:
+            continue
+        if timer is not None:
+            start = timer.clock()
+            arc.apply(rocket, t)
+            timer.lap("coast", start)
+        else:
+            arc.apply(rocket, t)
+        if callback is not None:
+            callback(t, rocket)
+        if stop is not None:
+            reason = stop(t, rocket)
+            if reason is not None:
+                break
+    if not sample and t > t_start:
+        arc.apply(rocket, t)
+    if t > t_start:
+        LOG.info(f"Coasted from {t_start} to {t} seconds in closed form")
+    return t, reason
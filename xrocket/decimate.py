@@ -0,0 +1,147 @@
+import numpy as np
+
+# Shape preserving downsampling of telemetry, so plots and reduced exports hold a fixed
+# number of points whatever the step size of the run.
+# lttb: largest triangle three buckets, keeps the point of every bucket that spans the
+#       largest triangle with its neighbours, reads like the full line
+# minmax: minimum and maximum of every equally wide time bucket, keeps every peak
+# Either way at most max_points points are kept, whatever the number of channels
+# Reference: https://skemman.is/bitstream/1946/15343/3/SS_MSthesis.pdf
+DECIMATION_METHODS = ("lttb", "minmax")
+
+
+def _ends(n, max_points):
+    # The first and last point, as many of them as max_points allows
+    return np.unique([0, n - 1])[: max(max_points, 0)]
+
+
+def lttb_indices(x, y, max_points):
+    # Indices of at most max_points points of (x, y) picked by largest triangle three buckets.
+    # y may also hold one column per channel, the triangle areas of the channels then add up
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if max_points >= n:
+        return np.arange(n)
+    if max_points < 3:
+        return _ends(n, max_points)
+
+    # The first and last points are always kept, the rest is split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Average point of the next bucket, or the last point for the final bucket
+        if bucket + 2 < len(edges):
+            next_start, next_end = end, edges[bucket + 2]
+            x_next = x[next_start:next_end].mean()
+            y_next = y[next_start:next_end].mean()
+        else:
+            x_next, y_next = x[-1], y[-1]
+
+        x_a, y_a = x[selected], y[selected]
+        x_bucket = x[start:end]
+        if y.ndim > 1:
+            x_bucket = x_bucket[:, None]
+        area = np.abs((x_a - x_next) * (y[start:end] - y_a) - (x_a - x_bucket) * (y_next - y_a))
+        if y.ndim > 1:
+            area = np.nansum(area, axis=1)
+        selected = start + int(np.nanargmax(area)) if np.any(area == area) else start
+        indices[bucket + 1] = selected
+    return indices
+
+
+def minmax_indices(x, y, max_points):
+    # Indices of the lowest and highest y in each of (max_points - 2) // 2 equally wide x
+    # buckets, plus the first and last point. x must be increasing
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    buckets = (max_points - 2) // 2
+    if max_points >= n:
+        return np.arange(n)
+    if buckets < 1 or x[-1] <= x[0]:
+        return _ends(n, max_points)
+
+    bucket = np.minimum(((x - x[0]) / (x[-1] - x[0]) * buckets).astype(int), buckets - 1)
+    # Within each bucket sort by y, so each bucket starts at its minimum and ends at its
+    # maximum. NaN sorts last and is only kept when a bucket holds nothing else
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    first = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    last = np.r_[first[1:], n] - 1
+    finite = ~np.isnan(y[order])
+    # Highest non NaN value of each bucket
+    last_finite = np.maximum.reduceat(np.where(finite, np.arange(n), -1), first)
+    last = np.where(last_finite >= first, last_finite, last)
+    return np.unique(np.r_[0, order[first], order[last], n - 1])
+
+
+DECIMATORS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def _normalized(column):
+    # column scaled to a range of one, so channels of any unit weigh the same
+    column = np.asarray(column, dtype=float)
+    finite = column[np.isfinite(column)]
+    spread = finite.max() - finite.min() if len(finite) else 0.0
+    return (column - (finite.min() if len(finite) else 0.0)) / (spread or 1.0)
+
+
+def decimate_indices(x, columns, max_points, method="lttb"):
+    # At most max_points sorted indices that keep the shape of every column in columns
+    # against x, one set of rows for all of them. lttb picks the rows whose triangles span
+    # the largest area summed over the normalized columns. minmax shares max_points among
+    # the columns, each keeping its extremes in correspondingly wider buckets
+    if method not in DECIMATORS:
+        raise ValueError(f"Unknown decimation method {method}")
+    columns = list(columns)
+    if not columns or max_points >= len(x):
+        return np.arange(len(x))
+    if len(columns) == 1:
+        return np.asarray(DECIMATORS[method](x, columns[0], max_points))
+    if method == "lttb":
+        return lttb_indices(x, np.column_stack([_normalized(c) for c in columns]), max_points)
+    if max_points < 2:
+        return _ends(len(x), max_points)
+
+    def union(budget):
+        return np.unique(
+            np.concatenate([minmax_indices(x, column, budget) for column in columns])
+        )
+
+    # Every column keeps the first and last point, which all of them share, so an even
+    # split always fits. Columns often share their extremes, so bisect for the largest
+    # number of points per column whose rows together still fit
+    low = (max_points - 2) // len(columns) + 2
+    high = max_points
+    indices = union(low)
+    while low < high:
+        middle = (low + high + 1) // 2
+        candidate = union(middle)
+        if len(candidate) <= max_points:
+            indices, low = candidate, middle
+        else:
+            high = middle - 1
+    return indices
+
+
+def decimate(telemetry, max_points, method="lttb", channels=None, x_channel="Time"):
+    # Dictionary of the telemetry channels (every channel by default) reduced to the rows
+    # decimate_indices keeps against the x channel. max_points of None keeps every row
+    if channels is None:
+        channels = [channel for channel in telemetry if channel != x_channel]
+    x = np.asarray(telemetry[x_channel])
+    if max_points is None:
+        indices = slice(None)
+    else:
+        indices = decimate_indices(
+            x, [np.asarray(telemetry[channel]) for channel in channels], max_points, method
+        )
+    reduced = {x_channel: x[indices]}
+    for channel in channels:
+        reduced[channel] = np.asarray(telemetry[channel])[indices]
+    return reduced
@@ -0,0 +1,120 @@
+import bisect
+import csv
+import functools
+import os
+
+import numpy as np
+
+# Drag coefficient against Mach number loosely based on the curve used in the artemis simulation
+# Reference: https://www.researchgate.net/publication/362270344_Preliminary_Launch_Trajectory_Simulation_for_Artemis_I_with_the_Space_Launch_System
+DEFAULT_DRAG_CURVE = os.path.join(os.path.dirname(__file__), "data", "artemis_drag.csv")
+
+INTERPOLATION_METHODS = ("linear", "pchip")
+
+
+def _pchip_slopes(mach, drag_coefficient):
+    # Fritsch Carlson slopes for a monotone piecewise cubic, the curve never overshoots
+    # the data between two points
+    h = np.diff(mach)
+    delta = np.diff(drag_coefficient) / h
+    slopes = np.zeros_like(drag_coefficient)
+    if len(h) == 1:
+        slopes[:] = delta[0]
+        return slopes
+
+    for k in range(1, len(mach) - 1):
+        if delta[k - 1] * delta[k] > 0:
+            w1 = 2 * h[k] + h[k - 1]
+            w2 = h[k] + 2 * h[k - 1]
+            slopes[k] = (w1 + w2) / (w1 / delta[k - 1] + w2 / delta[k])
+
+    # One sided three point estimates at both ends, kept shape preserving
+    for end, (h0, h1, d0, d1) in (
+        (0, (h[0], h[1], delta[0], delta[1])),
+        (-1, (h[-1], h[-2], delta[-1], delta[-2])),
+    ):
+        slope = ((2 * h0 + h1) * d0 - h0 * d1) / (h0 + h1)
+        if np.sign(slope) != np.sign(d0):
+            slope = 0
+        elif np.sign(d0) != np.sign(d1) and abs(slope) > abs(3 * d0):
+            slope = 3 * d0
+        slopes[end] = slope
+    return slopes
+
+
+class DragCurve:
+    # Drag coefficient as a function of Mach number, interpolated linearly or with a
+    # monotone cubic (pchip) between the points given and held constant outside them.
+    # The cubic of every interval is precomputed, so a lookup is one bisect or
+    # searchsorted plus a polynomial. Call it with a scalar or an ndarray of Mach numbers
+    def __init__(self, mach, drag_coefficient, method="pchip"):
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(f"Unknown interpolation method {method}")
+        mach = np.asarray(mach, dtype=float)
+        drag_coefficient = np.asarray(drag_coefficient, dtype=float)
+        if len(mach) < 2 or len(mach) != len(drag_coefficient):
+            raise ValueError("A drag curve needs at least two Mach, drag coefficient pairs")
+        if np.any(np.diff(mach) <= 0):
+            raise ValueError("Mach numbers of a drag curve must be increasing")
+
+        self.mach = mach
+        self.drag_coefficient = drag_coefficient
+        self.method = method
+
+        h = np.diff(mach)
+        delta = np.diff(drag_coefficient) / h
+        if method == "linear":
+            c2 = np.zeros_like(h)
+            c3 = np.zeros_like(h)
+            c1 = delta
+        else:
+            slopes = _pchip_slopes(mach, drag_coefficient)
+            c1 = slopes[:-1]
+            c2 = (3 * delta - 2 * slopes[:-1] - slopes[1:]) / h
+            c3 = (slopes[:-1] + slopes[1:] - 2 * delta) / h**2
+        # cd = c0 + c1 * s + c2 * s**2 + c3 * s**3 with s the Mach number past the interval start
+        self.coefficients = np.stack([drag_coefficient[:-1], c1, c2, c3], axis=1)
+
+        self._mach_list = mach.tolist()
+        self._coefficient_list = self.coefficients.tolist()
+        self._first = float(drag_coefficient[0])
+        self._last = float(drag_coefficient[-1])
+
+    @classmethod
+    def from_file(cls, path, method="pchip"):
+        # CSV file with "Mach" and "Drag Coefficient" columns
+        with open(path, newline="") as curve_file:
+            rows = list(csv.DictReader(curve_file))
+        return cls(
+            [float(row["Mach"]) for row in rows],
+            [float(row["Drag Coefficient"]) for row in rows],
+            method=method,
+        )
+
+    def __call__(self, mach):
+        if not isinstance(mach, (int, float)) and np.ndim(mach):
+            mach = np.asarray(mach, dtype=float)
+            index = np.clip(
+                np.searchsorted(self.mach, mach, side="right") - 1, 0, len(self.mach) - 2
+            )
+            s = mach - self.mach[index]
+            c0, c1, c2, c3 = self.coefficients[index].T
+            drag_coefficient = c0 + s * (c1 + s * (c2 + s * c3))
+            drag_coefficient[mach <= self.mach[0]] = self._first
+            drag_coefficient[mach >= self.mach[-1]] = self._last
+            return drag_coefficient
+
+        if mach <= self._mach_list[0]:
+            return self._first
+        if mach >= self._mach_list[-1]:
+            return self._last
+        index = bisect.bisect_right(self._mach_list, mach) - 1
+        c0, c1, c2, c3 = self._coefficient_list[index]
+        s = mach - self._mach_list[index]
+        return c0 + s * (c1 + s * (c2 + s * c3))
+
+
+@functools.lru_cache(maxsize=None)
+def load_drag_curve(path=DEFAULT_DRAG_CURVE, method="pchip"):
+    # Curves are read once per path and method and then shared
+    return DragCurve.from_file(path, method=method)
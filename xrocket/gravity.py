@@ -1,4 +1,14 @@
-from xrocket.settings import GRAVITATIONAL_CONSTANT
+import math
+
+import numpy as np
+
+from xrocket.settings import (
+    EARTH_J2,
+    EARTH_MASS,
+    EARTH_RADIUS,
+    GRAVITATIONAL_CONSTANT,
+    LAUNCH_LATITUDE,
+)
 
 
 def gravity_acceleration_calc(
@@ -6,7 +16,77 @@ def gravity_acceleration_calc(
 ):
     # Calculate the acceleration due to gravity of a large object on a small object
     # Made for universal application for different planetary bodies & objects
+    # Rockets use a gravity model below, which computes GM only once
     gravity_acceleration = (GRAVITATIONAL_CONSTANT * big_object_mass) / (
         (big_object_radius + small_object_distance) ** 2
     )
     return -gravity_acceleration
+
+
+class PointMassGravity:
+    # Gravity of a spherical body with GM computed once. Altitudes and positions may be
+    # floats or numpy arrays of any shape. acceleration is the model the rocket flies, down
+    # along its altitude, and radial the full vector in the plane of flight: x downrange
+    # and y up from the launch site, with the centre of the body at (0, -radius)
+    keplerian = True
+
+    def __init__(self, mass, radius):
+        self.mass = mass
+        self.radius = radius
+        self.gm = GRAVITATIONAL_CONSTANT * mass
+
+    def acceleration(self, altitude):
+        # Negative, pointing down. Same arithmetic as gravity_acceleration_calc
+        return -(self.gm / (self.radius + altitude) ** 2)
+
+    def radial(self, x, y):
+        # (x, y) acceleration pointing at the centre of the body
+        distance_y = self.radius + y
+        distance = np.hypot(x, distance_y)
+        scale = -self.gm / distance**3
+        return scale * x, scale * distance_y
+
+    def describe(self):
+        # Parameters of the model as plain values, e.g. for cache keys
+        return {"model": "point mass", "mass": self.mass, "radius": self.radius}
+
+
+class J2Gravity(PointMassGravity):
+    # Point mass gravity plus the J2 term of an oblate body, radial component only, for a
+    # flight staying near one geocentric latitude (degrees). The term strengthens gravity
+    # near the equator and weakens it near the poles, by about 0.1% at the surface of Earth.
+    # Not a Kepler potential, so xrocket.coast steps instead of flying arcs in closed form
+    keplerian = False
+
+    def __init__(self, mass, radius, j2, latitude=0.0):
+        super().__init__(mass, radius)
+        self.j2 = j2
+        self.latitude = latitude
+        # g = GM / r**2 * (1 + j2_coefficient / r**2)
+        self.j2_coefficient = (
+            -1.5 * j2 * (3 * math.sin(math.radians(latitude)) ** 2 - 1) * radius**2
+        )
+
+    def acceleration(self, altitude):
+        distance_squared = (self.radius + altitude) ** 2
+        return -(self.gm / distance_squared) * (1 + self.j2_coefficient / distance_squared)
+
+    def radial(self, x, y):
+        distance_y = self.radius + y
+        distance_squared = x * x + distance_y * distance_y
+        scale = (
+            -self.gm
+            / (distance_squared * np.sqrt(distance_squared))
+            * (1 + self.j2_coefficient / distance_squared)
+        )
+        return scale * x, scale * distance_y
+
+    def describe(self):
+        return {**super().describe(), "model": "j2", "j2": self.j2, "latitude": self.latitude}
+
+
+def earth_gravity(j2=False, latitude=LAUNCH_LATITUDE):
+    # Gravity model of the Earth of settings.py, with its J2 term at latitude if j2
+    if j2:
+        return J2Gravity(EARTH_MASS, EARTH_RADIUS, EARTH_J2, latitude)
+    return PointMassGravity(EARTH_MASS, EARTH_RADIUS)
@@ -0,0 +1,115 @@
+import json
+import time
+from collections import defaultdict
+
+# Phases timed by an attached Instrumentation, in report order
+# flight_controller: staging, Rocket.stage_event
+# stage_update: StageSet.update, every stage at once
+# atmosphere: Rocket.calc_air_density
+# drag: reference area and drag force
+# integration: acceleration, velocity and position, for rk4 and rk45 the whole solver
+#              step including its derivative evaluations
+# coast: closed form coasting above the atmosphere, see xrocket.coast
+# telemetry: the simulate callback, recording a telemetry row
+PHASES = (
+    "flight_controller",
+    "stage_update",
+    "atmosphere",
+    "drag",
+    "integration",
+    "coast",
+    "telemetry",
+)
+
+REPORT_FORMATS = ("table", "json")
+
+
+class Instrumentation:
+    # Phase timers and call counters for the simulation hot path. Rocket and StageSet only
+    # time their phases while an Instrumentation is attached to them, otherwise the hot
+    # path pays one attribute check per step
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.times = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.steps = 0
+        self.wall_time = 0.0
+
+    def attach(self, rocket):
+        rocket.instrumentation = self
+        rocket.stages.instrumentation = self
+
+    def detach(self, rocket):
+        rocket.instrumentation = None
+        rocket.stages.instrumentation = None
+
+    def lap(self, phase, start):
+        # Add the time since start to phase and return the current time for the next phase
+        now = self.clock()
+        self.times[phase] += now - start
+        self.calls[phase] += 1
+        return now
+
+    def timed_callback(self, callback):
+        # Wrap a simulate callback so every call counts as a step and is timed as telemetry
+        def timed(t, rocket):
+            self.steps += 1
+            if callback is not None:
+                start = self.clock()
+                callback(t, rocket)
+                self.lap("telemetry", start)
+
+        return timed
+
+    def report(self, **context):
+        # Dictionary of the timings, context (e.g. integrator and dt) is included as given
+        phases = {}
+        for phase in list(PHASES) + sorted(set(self.times) - set(PHASES)):
+            if not self.calls[phase]:
+                continue
+            seconds = self.times[phase]
+            phases[phase] = {
+                "calls": self.calls[phase],
+                "seconds": seconds,
+                "microseconds_per_call": 1e6 * seconds / self.calls[phase],
+                "share": seconds / self.wall_time if self.wall_time else 0.0,
+            }
+        return {
+            **context,
+            "steps": self.steps,
+            "wall_time": self.wall_time,
+            "steps_per_second": self.steps / self.wall_time if self.wall_time else 0.0,
+            "phases": phases,
+        }
+
+
+def format_report(report, report_format="table"):
+    if report_format == "json":
+        return json.dumps(report, indent=2)
+    if report_format != "table":
+        raise ValueError(f"Unknown report format {report_format}")
+
+    lines = []
+    for key, value in report.items():
+        if key in ("steps", "wall_time", "steps_per_second", "phases"):
+            continue
+        if isinstance(value, dict):
+            # Nested context, e.g. the subsystems of a scheduler, one entry per line
+            lines.append(f"{key}:")
+            for name, entry in value.items():
+                if isinstance(entry, dict):
+                    entry = ", ".join(f"{field} {item}" for field, item in entry.items())
+                lines.append(f"  {name}: {entry}")
+        else:
+            lines.append(f"{key}: {value}")
+    lines.append(
+        f"{report['steps']} steps in {report['wall_time']:.3f} s, "
+        f"{report['steps_per_second']:.0f} steps/s"
+    )
+    lines.append(f"{'Phase':<20}{'Calls':>12}{'Seconds':>12}{'us/call':>12}{'Share':>9}")
+    for phase, timing in report["phases"].items():
+        lines.append(
+            f"{phase:<20}{timing['calls']:>12}{timing['seconds']:>12.4f}"
+            f"{timing['microseconds_per_call']:>12.3f}{timing['share']:>9.1%}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,193 @@
+import logging
+
+import numpy as np
+
+from xrocket.coast import coast as fly_coast
+from xrocket.coast import coasting
+
+LOG = logging.getLogger(__name__)
+
+
+class RK4:
+    # Classic fourth order Runge Kutta with a fixed step
+    order = 4
+    adaptive = False
+
+    def step(self, f, t, y, h, k1):
+        k2 = f(t + h / 2, y + h / 2 * k1)
+        k3 = f(t + h / 2, y + h / 2 * k2)
+        k4 = f(t + h, y + h * k3)
+        return y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4), None, None
+
+
+class RK45:
+    # Dormand Prince 5(4) pair, the difference between both solutions estimates the error
+    # of the step. The last stage is evaluated at the new state so it is handed back as
+    # the first stage of the next step (first same as last)
+    order = 5
+    adaptive = True
+
+    C = np.array([0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1, 1])
+    A = [
+        [],
+        [1 / 5],
+        [3 / 40, 9 / 40],
+        [44 / 45, -56 / 15, 32 / 9],
+        [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+        [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+        [35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+    ]
+    # Weights of the fifth order solution minus the weights of the fourth order one
+    E = np.array(
+        [
+            35 / 384 - 5179 / 57600,
+            0,
+            500 / 1113 - 7571 / 16695,
+            125 / 192 - 393 / 640,
+            -2187 / 6784 + 92097 / 339200,
+            11 / 84 - 187 / 2100,
+            -1 / 40,
+        ]
+    )
+
+    def step(self, f, t, y, h, k1):
+        k = [k1]
+        for c, a in zip(self.C[1:], self.A[1:]):
+            y_stage = y + h * sum(a_j * k_j for a_j, k_j in zip(a, k))
+            k.append(f(t + c * h, y_stage))
+        # The seventh stage was taken at t + h with the fifth order weights
+        y_new = y_stage
+        error = h * sum(e_j * k_j for e_j, k_j in zip(self.E, k))
+        return y_new, error, k[-1]
+
+
+# Integrators of the state vector. Euler flights step Rocket.update instead, see
+# xrocket.simulation.simulate
+INTEGRATORS = {"rk4": RK4, "rk45": RK45}
+
+
+class _CountedDerivatives:
+    def __init__(self, f):
+        self.f = f
+        self.nfev = 0
+
+    def __call__(self, t, y):
+        self.nfev += 1
+        return self.f(t, y)
+
+
+def integrate(
+    rocket,
+    t_end,
+    method="rk45",
+    dt=0.01,
+    rtol=1e-6,
+    atol=1e-3,
+    max_step=10.0,
+    callback=None,
+    stop=None,
+    coast=False,
+):
+    # Integrate the rocket state from rocket.time to t_end. Fixed step methods take steps
+    # of dt, adaptive ones start at dt and then size the step to keep the local error
+    # within atol + rtol * |y|. Steps end exactly on the burnouts of the rocket's staging
+    # schedule, so the dynamics are smooth within every step and a step can run straight
+    # up to the next staging event. The stages burning stay fixed from one event to the
+    # next, see Rocket.freeze_burning.
+    # callback(t, rocket) runs after every accepted step with the rocket set to that state.
+    # stop(t, rocket), see xrocket.termination.stop_check, ends the integration at the
+    # first accepted step it returns a reason for.
+    # With coast, unpowered arcs above the atmosphere are flown in closed form, see
+    # xrocket.coast, in steps of dt for fixed step methods and of max_step otherwise
+    if method not in INTEGRATORS:
+        raise ValueError(f"Unknown integrator {method}")
+    integrator = INTEGRATORS[method]()
+    f = _CountedDerivatives(rocket.derivatives)
+
+    if rocket.staging_schedule is None:
+        rocket.staging_schedule = rocket.plan_staging()
+    schedule = rocket.staging_schedule
+    t = rocket.time
+    y = rocket.get_state()
+    rocket.freeze_burning()
+    k1 = None
+    h = dt
+    steps = 0
+    rejected = 0
+    reason = None
+
+    while t < t_end:
+        if schedule[0][0] <= t:
+            while schedule[0][0] <= t:
+                event_time, index = schedule.pop(0)
+                rocket.stage_event(index)
+                LOG.debug(f"Staging at {t} seconds, now {rocket.current_stage}")
+            y = rocket.get_state()
+            rocket.freeze_burning()
+            k1 = None
+        if coast and coasting(rocket):
+            t, reason = fly_coast(
+                rocket,
+                t_end,
+                max_step if integrator.adaptive else dt,
+                callback,
+                stop,
+            )
+            if reason is not None or t >= t_end:
+                break
+            y = rocket.get_state()
+            rocket.freeze_burning()
+            k1 = None
+        if k1 is None:
+            k1 = f(t, y)
+
+        t_next_event = schedule[0][0]
+        h_step = min(h, max_step, t_end - t, t_next_event - t)
+        if rocket.instrumentation is not None:
+            start = rocket.instrumentation.clock()
+            y_new, error, k_last = integrator.step(f, t, y, h_step, k1)
+            rocket.instrumentation.lap("integration", start)
+        else:
+            y_new, error, k_last = integrator.step(f, t, y, h_step, k1)
+
+        if integrator.adaptive:
+            scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+            error_norm = np.sqrt(np.mean((error / scale) ** 2))
+            if error_norm == 0:
+                factor = 5.0
+            else:
+                factor = min(5.0, max(0.2, 0.9 * error_norm ** (-1 / integrator.order)))
+            if error_norm > 1:
+                rejected += 1
+                h = h_step * factor
+                # The stage evaluations left the rocket off the accepted state, which the
+                # coasting check reads
+                rocket.set_state(y)
+                continue
+            if h_step == h:
+                # Steps cut short by an event or t_end keep the step size for later
+                h = h_step * factor
+
+        if h_step == t_next_event - t:
+            # Land on the event time itself rather than a rounding error short of it
+            t = t_next_event
+        else:
+            t += h_step
+        y = y_new
+        k1 = k_last
+        steps += 1
+
+        rocket.set_state(y)
+        rocket.time = t
+        if callback is not None:
+            callback(t, rocket)
+        if stop is not None:
+            reason = stop(t, rocket)
+            if reason is not None:
+                break
+
+    rocket.burning = None
+    LOG.info(
+        f"{method} took {steps} steps ({rejected} rejected) and {f.nfev} force evaluations"
+    )
+    return {"steps": steps, "rejected": rejected, "nfev": f.nfev, "reason": reason}
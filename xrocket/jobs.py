@@ -0,0 +1,247 @@
+import functools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Nothing here imports numpy or the simulation at import time, workers import them once in
+# warm_up and every job after that runs in a warm process
+
+LOG = logging.getLogger(__name__)
+
+# Keys of a job and their defaults. A job file holds one JSON object per line, e.g.
+#     {"id": "heavy core", "overrides": {"CORE_STAGE.Dry Mass": 90000}, "t_end": 600}
+#     {"vehicle": "two_stage.json", "stop": [["impact", null]], "telemetry": "npy"}
+# id names the job and its output directory, the line number by default. overrides are
+# "<name>.<key>" stage settings as in xrocket.simulation.stage_settings, vehicle a TOML or
+# JSON file of xrocket.vehicle flown instead. stop holds [name, value] stop conditions of
+# xrocket.termination, rates subsystem periods of xrocket.scheduler with multirate, j2 and
+# latitude the gravity model of xrocket.gravity. telemetry is "csv" or "npy" to write the
+# telemetry of the job, the summary metrics are always written. Vehicle paths are relative
+# to the job file
+JOB_DEFAULTS = {
+    "id": None,
+    "overrides": {},
+    "vehicle": None,
+    "kernel": "fast",
+    "integrator": "euler",
+    "dt": 0.01,
+    "rtol": 1e-6,
+    "atol": 1e-3,
+    "t_end": 3000,
+    "stop": [],
+    "coast": False,
+    "multirate": False,
+    "rates": {},
+    "j2": False,
+    "latitude": None,
+    "telemetry": None,
+}
+
+MANIFEST_FILE = "manifest.jsonl"
+SUMMARY_FILE = "summary.json"
+TELEMETRY_FILES = {"csv": "telemetry.csv", "npy": "telemetry"}
+
+# Seconds this process took to import the simulation and load its data, see warm_up
+_startup_seconds = None
+
+
+def load_jobs(path):
+    # Jobs of a JSON lines file with the defaults filled in. Blank lines are skipped
+    jobs = []
+    directory = os.path.dirname(os.path.abspath(path))
+    with open(path) as jobs_file:
+        for line_number, line in enumerate(jobs_file, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as error:
+                raise ValueError(f"Line {line_number}: {error}")
+            if not isinstance(job, dict):
+                raise ValueError(f"Line {line_number}: a job is a JSON object")
+            unknown = set(job) - set(JOB_DEFAULTS)
+            if unknown:
+                raise ValueError(f"Line {line_number}: unknown keys {sorted(unknown)}")
+            job = {**JOB_DEFAULTS, **job}
+            if job["id"] is None:
+                job["id"] = str(line_number)
+            job["id"] = str(job["id"])
+            if job["id"] in {"", ".", ".."} or os.sep in job["id"] or "/" in job["id"]:
+                raise ValueError(f"Line {line_number}: {job['id']!r} is not a directory name")
+            if job["vehicle"] is not None:
+                job["vehicle"] = os.path.join(directory, job["vehicle"])
+            if job["telemetry"] not in (None, *TELEMETRY_FILES):
+                raise ValueError(f"Line {line_number}: unknown telemetry {job['telemetry']}")
+            if (job["multirate"] or job["rates"]) and job["integrator"] != "euler":
+                raise ValueError(f"Line {line_number}: multirate and rates need integrator euler")
+            jobs.append(job)
+    ids = [job["id"] for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Job ids must be unique")
+    return jobs
+
+
+def completed_jobs(output_dir):
+    # Ids of the jobs the manifest of output_dir lists as done, a resumed batch skips them
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as manifest_file:
+        entries = [json.loads(line) for line in manifest_file if line.strip()]
+    return {entry["id"] for entry in entries if entry["status"] == "ok"}
+
+
+def warm_up():
+    # Import the simulation and load the default drag curve and staging table, once per
+    # process. Worker pools run it as their initializer
+    global _startup_seconds
+    if _startup_seconds is not None:
+        return _startup_seconds
+    start = time.perf_counter()
+    from xrocket.simulation import build_rocket
+
+    build_rocket()
+    _startup_seconds = time.perf_counter() - start
+    LOG.info(f"Process {os.getpid()} warmed up in {_startup_seconds:.3f} seconds")
+    return _startup_seconds
+
+
+@functools.lru_cache(maxsize=None)
+def _load_vehicle(path):
+    # Vehicle files are read once per process, however many jobs fly them
+    from xrocket.vehicle import load_vehicle
+
+    return load_vehicle(path)
+
+
+def _build(job):
+    from xrocket.gravity import earth_gravity
+    from xrocket.scheduler import Scheduler
+    from xrocket.settings import LAUNCH_LATITUDE
+    from xrocket.simulation import build_rocket, build_vehicle
+
+    gravity_model = None
+    if job["j2"]:
+        latitude = job["latitude"] if job["latitude"] is not None else LAUNCH_LATITUDE
+        gravity_model = earth_gravity(True, latitude)
+    if job["vehicle"] is not None:
+        if job["overrides"]:
+            raise ValueError("overrides apply to the settings.py stages, not to a vehicle")
+        rocket = build_vehicle(_load_vehicle(job["vehicle"]), job["kernel"], gravity_model)
+    else:
+        rocket = build_rocket(job["overrides"], job["kernel"], gravity_model)
+    if job["multirate"] or job["rates"]:
+        rocket.scheduler = Scheduler(job["rates"])
+    return rocket
+
+
+def run_job(job, output_dir):
+    # Fly one job from load_jobs and write its outputs to output_dir/<id>. Returns its
+    # manifest entry, with the error instead of outputs if the job failed
+    warm_up()
+    from xrocket.simulation import flight_summary
+    from xrocket.telemetry import TELEMETRY_WRITERS, TelemetryRecorder
+
+    start = time.perf_counter()
+    job_dir = os.path.join(output_dir, job["id"])
+    entry = {"id": job["id"], "worker": os.getpid(), "startup_seconds": _startup_seconds}
+    recorder = None
+    try:
+        rocket = _build(job)
+        os.makedirs(job_dir, exist_ok=True)
+        callback = None
+        if job["telemetry"] is not None:
+            telemetry_path = os.path.join(job_dir, TELEMETRY_FILES[job["telemetry"]])
+            writer = TELEMETRY_WRITERS[job["telemetry"]](telemetry_path)
+            recorder = TelemetryRecorder(writer=writer)
+
+            def callback(t, rocket):
+                recorder.record(
+                    t,
+                    rocket,
+                    rocket.core_stage,
+                    rocket.srb_stage,
+                    rocket.interim_stage,
+                    rocket.exploration_stage,
+                )
+
+        summary, reason = flight_summary(
+            rocket,
+            job["t_end"],
+            job["dt"],
+            job["integrator"],
+            job["rtol"],
+            job["atol"],
+            stop=[tuple(condition) for condition in job["stop"]],
+            coast=job["coast"],
+            callback=callback,
+        )
+        if recorder is not None:
+            recorder.close()
+            recorder = None
+        summary_path = os.path.join(job_dir, SUMMARY_FILE)
+        with open(summary_path, "w") as summary_file:
+            json.dump(
+                {"reason": reason, "flight_time": float(rocket.time), "summary": summary},
+                summary_file,
+                indent=2,
+            )
+        outputs = [summary_path]
+        if job["telemetry"] is not None:
+            outputs.append(telemetry_path)
+        entry.update(status="ok", reason=reason, outputs=outputs)
+    except Exception as error:
+        # One bad job does not stop the batch, the manifest records what went wrong
+        LOG.info(f"Job {job['id']} failed", exc_info=True)
+        entry.update(status="error", error=f"{type(error).__name__}: {error}")
+    finally:
+        if recorder is not None:
+            recorder.close()
+    entry["seconds"] = time.perf_counter() - start
+    return entry
+
+
+def run_batch(jobs, output_dir, workers=1, progress=None):
+    # Run jobs from load_jobs and append one manifest entry per finished job to
+    # output_dir/manifest.jsonl as they finish, skipping jobs the manifest lists as done.
+    # workers=1 runs every job in this process, more run them over a pool of that many
+    # processes, each warmed up once. progress(done, total, entry) is called after every
+    # job. Returns totals of the batch: jobs run, failures, wall time and startup times
+    os.makedirs(output_dir, exist_ok=True)
+    done = completed_jobs(output_dir)
+    pending = [job for job in jobs if job["id"] not in done]
+    if done:
+        LOG.info(f"Resuming batch, {len(done)} of {len(jobs)} jobs already done")
+
+    start = time.perf_counter()
+    startups = {}
+    failed = 0
+    finished = len(done)
+    with open(os.path.join(output_dir, MANIFEST_FILE), "a") as manifest_file:
+
+        def record(entry):
+            nonlocal failed, finished
+            manifest_file.write(json.dumps(entry) + "\n")
+            manifest_file.flush()
+            startups[entry["worker"]] = entry["startup_seconds"]
+            failed += entry["status"] != "ok"
+            finished += 1
+            if progress is not None:
+                progress(finished, len(jobs), entry)
+
+        if workers <= 1:
+            for job in pending:
+                record(run_job(job, output_dir))
+        elif pending:
+            with ProcessPoolExecutor(max_workers=workers, initializer=warm_up) as executor:
+                futures = [executor.submit(run_job, job, output_dir) for job in pending]
+                for future in as_completed(futures):
+                    record(future.result())
+    return {
+        "jobs": len(pending),
+        "failed": failed,
+        "seconds": time.perf_counter() - start,
+        "startup_seconds": startups,
+    }
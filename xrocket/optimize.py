@@ -0,0 +1,492 @@
+import bisect
+import csv
+import json
+import logging
+import math
+import time
+from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from xrocket.atmosphere import ATMOSPHERE_TOP
+from xrocket.gravity import earth_gravity
+from xrocket.settings import LAUNCH_LATITUDE
+from xrocket.simulation import build_rocket, build_vehicle, simulate
+from xrocket.termination import StopCondition
+
+LOG = logging.getLogger(__name__)
+
+# Search for the pitch program that maximizes an objective of the flight. A program is a
+# piecewise linear theta(t) through knots spread evenly over the powered flight, and the
+# search a cross entropy method: every generation samples a population of knot angles
+# around the mean of the best programs found so far (the elites) and flies them across a
+# process pool. A flight that can no longer beat the worst elite is pruned as soon as a
+# bound on its objective says so, see Evaluator
+
+# Pitches a program may take, in degrees. Outside of them the rocket points below the
+# horizon
+MIN_PITCH = 0.0
+MAX_PITCH = 180.0
+# Smallest spread of the sampled angles, in degrees, so the search never stops moving
+MIN_SIGMA = 0.05
+# Margin on the thrust a flight has left, for the steps split at staging events
+THRUST_MARGIN = 1.001
+
+PRUNED = "pruned"
+HISTORY_FIELDS = (
+    "generation",
+    "evaluations",
+    "pruned",
+    "failed",
+    "best",
+    "elite_mean",
+    "sigma",
+    "seconds",
+    "evaluations_per_second",
+)
+
+
+class PitchProgram:
+    # Pitch in degrees as a piecewise linear function of the flight time through knots of
+    # (time, angle), held at the first angle before the first knot and at the last angle
+    # after the last knot. Set as Rocket.pitch_program
+    def __init__(self, times, angles):
+        if not times or len(times) != len(angles):
+            raise ValueError("A pitch program needs one angle for every knot time")
+        if any(later <= earlier for earlier, later in zip(times, times[1:])):
+            raise ValueError("Knot times must increase")
+        self.times = tuple(float(t) for t in times)
+        self.angles = tuple(float(angle) for angle in angles)
+
+    def __call__(self, t):
+        times = self.times
+        if t <= times[0]:
+            return self.angles[0]
+        if t >= times[-1]:
+            return self.angles[-1]
+        index = bisect.bisect_right(times, t)
+        t0, t1 = times[index - 1], times[index]
+        angle0, angle1 = self.angles[index - 1], self.angles[index]
+        return angle0 + (angle1 - angle0) * (t - t0) / (t1 - t0)
+
+    def fixed(self, t):
+        # True when the pitch no longer changes from t on
+        return t >= self.times[-1]
+
+
+def knot_times(knots, end):
+    # knots times spread evenly from launch to end
+    if knots < 1:
+        raise ValueError("A pitch program needs at least one knot")
+    return tuple(float(t) for t in np.linspace(0, end, knots))
+
+
+def coast_apogee(gm, earth_radius, altitude, velocity, sin_theta):
+    # Highest altitude of a rocket coasting along a pitch of sine sin_theta without drag,
+    # the top of the radial arc of xrocket.coast.RadialArc, infinite when it escapes. An
+    # upper bound on the apogee of the rocket anywhere below the atmosphere too, and larger
+    # for a steeper pitch
+    if sin_theta <= 0 or velocity <= 0:
+        return altitude
+    denominator = gm / (earth_radius + altitude) - velocity**2 * sin_theta / 2
+    if denominator <= 0:
+        return math.inf
+    return gm / denominator - earth_radius
+
+
+class Objective(StopCondition):
+    # Stop condition keeping the score of a flight, the value to maximize. It ends the
+    # flight once the score is settled, or once the bounds of the evaluator show the score
+    # cannot exceed value, the worst elite so far. program is the PitchProgram flown, None
+    # for the pitches of the vehicle's staging
+    def __init__(self, evaluator, value=-math.inf, program=None):
+        super().__init__(value)
+        self.evaluator = evaluator
+        self.program = program
+        self.score = None
+        # Pitch held from the end of the powered flight on, bounds reach further without it
+        self.final_pitch = None
+        if program is not None and program.fixed(evaluator.powered_end):
+            self.final_pitch = program.angles[-1]
+
+    def settle(self, score, reason):
+        self.score = score
+        self.reason = reason
+        return True
+
+    def can_prune(self, rocket):
+        # The bounds of Evaluator.burnout_bounds hold while the rocket flies forwards along
+        # its flight path, drag slowing it down. Flying backwards drag pushes it, so no
+        # flight is pruned then
+        return self.value > -math.inf and rocket.rocket_velocity >= 0
+
+    def prune(self, bound):
+        return self.value > -math.inf and bound <= self.value and self.settle(-math.inf, PRUNED)
+
+    @abstractmethod
+    def final_score(self, rocket):
+        # Score of a flight that ran to its end time
+        pass
+
+
+class ApogeeObjective(Objective):
+    # Highest altitude reached. Once the rocket coasts above the atmosphere the rest of the
+    # climb follows in closed form
+    def __init__(self, evaluator, value=-math.inf, program=None):
+        super().__init__(evaluator, value, program)
+        self.highest = -math.inf
+        self.final_sin = 1.0
+        if self.final_pitch is not None:
+            self.final_sin = math.sin(math.radians(self.final_pitch))
+
+    def __call__(self, t, rocket):
+        evaluator = self.evaluator
+        altitude = rocket.altitude
+        self.highest = max(self.highest, altitude)
+        if rocket.time < evaluator.powered_end:
+            if not evaluator.bounded or not self.can_prune(rocket):
+                return False
+            speed, altitude = evaluator.burnout_bounds(rocket)
+            return self.prune(
+                coast_apogee(
+                    rocket.gravity_model.gm, rocket.earth_radius, altitude, speed, self.final_sin
+                )
+            )
+        if rocket.rocket_velocity <= 0:
+            return self.settle(self.highest, "apogee")
+        program = self.program
+        if not evaluator.keplerian or (
+            program is not None
+            and not (program.fixed(rocket.time) and rocket.theta == program(rocket.time))
+        ):
+            return False
+        apogee = coast_apogee(
+            rocket.gravity_model.gm,
+            rocket.earth_radius,
+            altitude,
+            rocket.rocket_velocity,
+            math.sin(math.radians(rocket.theta)),
+        )
+        if self.prune(apogee):
+            return True
+        if altitude > ATMOSPHERE_TOP:
+            return self.settle(max(apogee, self.highest), "vacuum apogee")
+        return False
+
+    def final_score(self, rocket):
+        return self.highest
+
+
+class HorizontalSpeed(Objective):
+    # Horizontal speed at the end of the powered flight, where a program flies its last
+    # angle
+    def __init__(self, evaluator, value=-math.inf, program=None):
+        super().__init__(evaluator, value, program)
+        self.final_cos = 1.0
+        if self.final_pitch is not None:
+            self.final_cos = abs(math.cos(math.radians(self.final_pitch)))
+
+    def speed(self, rocket):
+        return abs(rocket.rocket_velocity * math.cos(math.radians(rocket.theta)))
+
+    def __call__(self, t, rocket):
+        evaluator = self.evaluator
+        if rocket.time >= evaluator.powered_end:
+            return self.settle(self.final_score(rocket), "burnout")
+        if not self.can_prune(rocket):
+            return False
+        speed, _ = evaluator.burnout_bounds(rocket)
+        return self.prune(speed * self.final_cos)
+
+    def final_score(self, rocket):
+        return self.speed(rocket)
+
+
+class OrbitMargin(HorizontalSpeed):
+    # Horizontal speed above the circular orbit speed sqrt(GM / r) at the end of the
+    # powered flight, negative when short of orbit
+    def __call__(self, t, rocket):
+        evaluator = self.evaluator
+        if rocket.time >= evaluator.powered_end:
+            return self.settle(self.final_score(rocket), "burnout")
+        if not self.can_prune(rocket):
+            return False
+        speed, altitude = evaluator.burnout_bounds(rocket)
+        return self.prune(speed * self.final_cos - self.circular_speed(rocket, altitude))
+
+    def circular_speed(self, rocket, altitude):
+        return math.sqrt(rocket.gravity_model.gm / (rocket.earth_radius + altitude))
+
+    def final_score(self, rocket):
+        return self.speed(rocket) - self.circular_speed(rocket, rocket.altitude)
+
+
+# Objectives by name, with the unit of their score
+OBJECTIVES = {"apogee": ApogeeObjective, "horizontal": HorizontalSpeed, "margin": OrbitMargin}
+OBJECTIVE_UNITS = {"apogee": "m", "horizontal": "m/s", "margin": "m/s"}
+
+
+class Evaluator:
+    # Flies pitch programs of knots evenly spread over the powered flight and scores them.
+    # Propellant and thrust do not depend on the trajectory, so one flight of the vehicle's
+    # own staging gives the thrust per mass of every step, profile, and from it the speed
+    # any flight can still gain. That bounds speed, altitude and apogee of flights still
+    # under way, for pruning. Bounds on the apogee need point mass gravity
+    def __init__(
+        self,
+        objective="apogee",
+        knots=6,
+        t_end=3000,
+        dt=0.1,
+        vehicle=None,
+        kernel="fast",
+        j2=False,
+        latitude=LAUNCH_LATITUDE,
+        profile=None,
+    ):
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective {objective}")
+        self.objective = objective
+        self.t_end = t_end
+        self.dt = dt
+        gravity_model = earth_gravity(j2, latitude) if j2 else None
+        if vehicle is not None:
+            self.rocket = build_vehicle(vehicle, kernel, gravity_model)
+        else:
+            self.rocket = build_rocket(kernel=kernel, gravity_model=gravity_model)
+        self.rocket.staging_schedule = self.rocket.plan_staging()
+        self.powered_end = max(
+            [event_time for event_time, index in self.rocket.staging_schedule[:-1]]
+        )
+        if self.powered_end <= 0 or t_end <= 0:
+            raise ValueError("Nothing to optimize without a powered flight")
+        self.times = knot_times(knots, min(self.powered_end, t_end))
+        self.keplerian = self.rocket.gravity_model.keplerian
+        self.bounded = self.keplerian and self.times[-1] <= self.powered_end
+
+        self.pitch_history = None
+        if profile is None:
+            profile, self.pitch_history = self.fly_profile()
+        self.profile = profile
+        # remaining[n] is the speed thrust alone adds after step n, and climb[n] the height
+        # that speed adds by the end of the powered flight. climb[n] sums the speed gained
+        # up to and including every step k after n, remaining[n] - remaining[k - 1]
+        last = len(profile) - 1
+        self.remaining = [0.0] * (last + 2)
+        for step in range(last, 0, -1):
+            gain = max(profile[step], profile[step - 1]) * THRUST_MARGIN * dt
+            self.remaining[step - 1] = self.remaining[step] + gain
+        self.climb = [0.0] * (last + 2)
+        later = 0.0
+        for step in range(last, -1, -1):
+            self.climb[step] = dt * ((last - step + 1) * self.remaining[step] - later)
+            later += self.remaining[step]
+
+    def fly_profile(self):
+        # Thrust per mass after every step and (time, theta) of every step of the powered
+        # flight with the pitches of the vehicle's staging
+        rocket = self.rocket.fork()
+        profile = [0.0]
+        pitch_history = [(rocket.time, rocket.theta)]
+
+        def record(t, rocket):
+            profile.append(rocket.thrust / rocket.total_mass)
+            pitch_history.append((t, rocket.theta))
+
+        simulate(rocket, min(self.powered_end, self.t_end), self.dt, callback=record)
+        profile[0] = profile[1] if len(profile) > 1 else 0.0
+        return profile, pitch_history
+
+    def staged_pitches(self):
+        # Pitch of the vehicle's staging at every knot, where the search starts
+        times, pitches = zip(*self.pitch_history)
+        return [
+            float(pitches[min(bisect.bisect_left(times, t), len(times) - 1)])
+            for t in self.times
+        ]
+
+    def burnout_bounds(self, rocket):
+        # Highest speed and altitude the rocket may have at the end of the powered flight,
+        # for a rocket flying forwards. Thrust alone bounds the altitude, drag only takes
+        # speed away. Gravity acts along the flight path, so the speed also loses at least
+        # the gravity at that altitude for the rest of the burn, which holds as long as the
+        # rocket does not stall and fall back
+        step = min(int(rocket.time / self.dt + 0.5), len(self.remaining) - 1)
+        velocity = max(rocket.rocket_velocity, 0.0)
+        burn_time = max(self.powered_end - rocket.time, 0.0)
+        altitude = (
+            rocket.altitude
+            + velocity * (burn_time + self.dt)
+            + self.climb[step]
+            + (velocity + self.remaining[step]) * self.dt
+        )
+        gravity = -rocket.gravity_model.acceleration(altitude)
+        speed = velocity + self.remaining[step] - gravity * max(burn_time - self.dt, 0.0)
+        return max(speed, 0.0), altitude
+
+    def __call__(self, angles=None, threshold=-math.inf):
+        # Score of a flight with a pitch program through the knot angles, or with the
+        # vehicle's staging pitches, and the reason it ended. Flights hitting the ground
+        # score -inf, as do flights pruned for not beating threshold
+        rocket = self.rocket.fork()
+        if angles is not None:
+            rocket.pitch_program = PitchProgram(self.times, angles)
+        objective = OBJECTIVES[self.objective](self, threshold, rocket.pitch_program)
+        reason = simulate(rocket, self.t_end, self.dt, stop=[("impact", None), objective])
+        if objective.score is not None:
+            return objective.score, reason
+        if reason != "time limit":
+            return -math.inf, reason
+        return objective.final_score(rocket), reason
+
+
+# Evaluator of a worker process, built once by _start_worker
+_evaluator = None
+
+
+def _start_worker(settings):
+    global _evaluator
+    _evaluator = Evaluator(**settings)
+
+
+def _evaluate(task):
+    angles, threshold = task
+    return _evaluator(angles, threshold)
+
+
+def optimize(
+    settings,
+    population=32,
+    elites=8,
+    generations=20,
+    sigma=10.0,
+    seed=None,
+    workers=1,
+    prune=True,
+    progress=None,
+):
+    # Search for the pitch program maximizing the objective of Evaluator(**settings).
+    # Every generation samples population programs around the mean of the elites best
+    # programs so far, with the spread of their angles, sigma degrees at first. workers=1
+    # flies them in this process, more over a pool of that many processes, None all cores.
+    # progress(entry) is called with the history entry of every generation. Returns the
+    # baseline flight of the vehicle's own staging, the best program and the history
+    if elites < 1 or population < elites:
+        raise ValueError("Need at least one elite and no more elites than the population")
+    start = time.perf_counter()
+    evaluator = Evaluator(**settings)
+    baseline_score, baseline_reason = evaluator()
+    rng = np.random.default_rng(seed)
+    mean = np.array(evaluator.staged_pitches())
+    spread = np.full(len(mean), float(sigma))
+    # The best programs so far as (score, angles, reason), best first
+    archive = []
+    history = []
+    evaluations = 0
+    pruned = 0
+
+    executor = None
+    if workers is None or workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_start_worker,
+            initargs=({**settings, "profile": evaluator.profile},),
+        )
+    try:
+        for generation in range(1, generations + 1):
+            generation_start = time.perf_counter()
+            threshold = archive[elites - 1][0] if prune and len(archive) >= elites else -math.inf
+            samples = np.clip(
+                rng.normal(mean, spread, (population, len(mean))), MIN_PITCH, MAX_PITCH
+            )
+            tasks = [(angles.tolist(), threshold) for angles in samples]
+            if executor is None:
+                results = [evaluator(*task) for task in tasks]
+            else:
+                results = list(executor.map(_evaluate, tasks))
+            seconds = time.perf_counter() - generation_start
+
+            evaluations += len(results)
+            generation_pruned = sum(reason == PRUNED for _, reason in results)
+            pruned += generation_pruned
+            archive.extend(
+                (score, task[0], reason)
+                for (score, reason), task in zip(results, tasks)
+                if score > -math.inf
+            )
+            archive.sort(key=lambda entry: entry[0], reverse=True)
+            del archive[elites:]
+            if archive:
+                elite_angles = np.array([angles for _, angles, _ in archive])
+                mean = elite_angles.mean(axis=0)
+                spread = np.maximum(elite_angles.std(axis=0), MIN_SIGMA)
+
+            entry = {
+                "generation": generation,
+                "evaluations": evaluations,
+                "pruned": generation_pruned,
+                "failed": sum(
+                    score == -math.inf and reason != PRUNED for score, reason in results
+                ),
+                "best": archive[0][0] if archive else -math.inf,
+                "elite_mean": float(np.mean([score for score, _, _ in archive]))
+                if archive
+                else -math.inf,
+                "sigma": float(spread.mean()),
+                "seconds": seconds,
+                "evaluations_per_second": len(results) / seconds,
+            }
+            history.append(entry)
+            LOG.info(f"Generation {generation}: {entry}")
+            if progress is not None:
+                progress(entry)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    seconds = time.perf_counter() - start
+    best = archive[0] if archive else (-math.inf, None, None)
+    return {
+        "objective": evaluator.objective,
+        "unit": OBJECTIVE_UNITS[evaluator.objective],
+        "times": list(evaluator.times),
+        "baseline": {
+            "score": baseline_score,
+            "reason": baseline_reason,
+            "angles": evaluator.staged_pitches(),
+        },
+        "best": {"score": best[0], "reason": best[2], "angles": best[1]},
+        "evaluations": evaluations,
+        "pruned": pruned,
+        "seconds": seconds,
+        "evaluations_per_second": evaluations / sum(entry["seconds"] for entry in history)
+        if history
+        else 0.0,
+        "history": history,
+    }
+
+
+def save_history(history, path):
+    # History of optimize as a CSV table with a row per generation
+    with open(path, "w", newline="") as history_file:
+        writer = csv.DictWriter(history_file, fieldnames=HISTORY_FIELDS)
+        writer.writeheader()
+        writer.writerows(history)
+
+
+def _finite(value):
+    # value with every infinite or NaN number in it as None, which JSON has no numbers for
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def save_result(result, path):
+    # Result of optimize as a JSON file, scores of -inf (no flight scored) as null
+    with open(path, "w") as result_file:
+        json.dump(_finite(result), result_file, indent=2, allow_nan=False)
@@ -1,27 +1,16 @@
 import csv
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from xrocket.decimate import decimate
+from xrocket.telemetry import CHANNELS, telemetry_row
 
 
 def create_rocket_dict(rocket_parameters):
     # Create dictionary and associated keys for use with HUD GUI within pygame
-    rocket_parameters["Time"] = []
-    rocket_parameters["Altitude"] = []
-    rocket_parameters["X Position"] = []
-    rocket_parameters["Velocity"] = []
-    rocket_parameters["Acceleration"] = []
-    rocket_parameters["Thrust"] = []
-    rocket_parameters["Weight"] = []
-    rocket_parameters["Gravity Acceleration"] = []
-    rocket_parameters["Drag Force"] = []
-    rocket_parameters["Resultant Force"] = []
-    rocket_parameters["Mach Speed"] = []
-    rocket_parameters["Air Density"] = []
-    rocket_parameters["Reference Area"] = []
-    rocket_parameters["Current Total Mass"] = []
-    rocket_parameters["Total Fuel Remaining"] = []
-    rocket_parameters["Core Fuel Remaining"] = []
-    rocket_parameters["SRB Fuel Remaining"] = []
-    rocket_parameters["Interim Fuel Remaining"] = []
-    rocket_parameters["Exploration Fuel Remaining"] = []
+    # xrocket.telemetry.TelemetryRecorder holds the same channels in far less memory
+    for channel in CHANNELS:
+        rocket_parameters[channel] = []
 
 
 def update_rocket_dict(
@@ -33,30 +22,14 @@ def update_rocket_dict(
     interim_stage,
     exploration_stage,
 ):
-    rocket_parameters["Time"].append(t)
-    rocket_parameters["Total Fuel Remaining"].append(rocket.total_propellant_mass)
-    rocket_parameters["Core Fuel Remaining"].append(core_stage.prop_mass)
-    rocket_parameters["SRB Fuel Remaining"].append(srb_stage.prop_mass)
-    rocket_parameters["Interim Fuel Remaining"].append(interim_stage.prop_mass)
-    rocket_parameters["Exploration Fuel Remaining"].append(exploration_stage.prop_mass)
-    rocket_parameters["Current Total Mass"].append(rocket.total_mass)
-    rocket_parameters["Altitude"].append(rocket.pos[1])
-    rocket_parameters["X Position"].append(rocket.pos[0])
-    rocket_parameters["Velocity"].append(rocket.rocket_velocity)
-    rocket_parameters["Acceleration"].append(rocket.rocket_acceleration)
-    rocket_parameters["Thrust"].append(rocket.thrust)
-    rocket_parameters["Drag Force"].append(rocket.drag_force)
-    rocket_parameters["Weight"].append(rocket.weight)
-    rocket_parameters["Gravity Acceleration"].append(rocket.gravity)
-    rocket_parameters["Resultant Force"].append(rocket.resultant_force)
-    rocket_parameters["Mach Speed"].append(rocket.mach_speed)
-    rocket_parameters["Air Density"].append(rocket.air_density)
-    rocket_parameters["Reference Area"].append(rocket.reference_area)
-
-
-def csv_output(rocket_parameters):
+    row = telemetry_row(t, rocket, core_stage, srb_stage, interim_stage, exploration_stage)
+    for channel, value in zip(CHANNELS, row):
+        rocket_parameters[channel].append(value)
+
+
+def csv_output(rocket_parameters, path="Rocket Values.csv"):
     # fmt: off
-    with open("Rocket Values.csv", "w") as new_file:
+    with open(path, "w") as new_file:
         writer = csv.writer(new_file)
         key_list = list(rocket_parameters.keys())
 
@@ -71,265 +44,214 @@ def csv_output(rocket_parameters):
 # ---------------------------------------------------------------------------
 
 
-def altitude_plot(rocket_parameters, show_plots, save_plots):
+# Every figure create_plots renders: the file name, y axis label and the (channel, label)
+# pairs plotted against time. The position plot is 3D and plots (y channel, z channel)
+# pairs against time instead
+PlotSpec = namedtuple("PlotSpec", ["filename", "ylabel", "lines", "zlabel"], defaults=(None,))
+
+ALTITUDE_PLOT = PlotSpec(
+    "Altitude",
+    "Altitude",
+    (("Current Total Mass", "Current Total Mass"), ("Altitude", "Altitude")),
+)
+VELOCITY_PLOT = PlotSpec("Velocity", "Velocity", (("Velocity", "Velocity"),))
+ACCELERATION_PLOT = PlotSpec("Acceleration", "Acceleration", (("Acceleration", "Acceleration"),))
+FORCE_PLOT = PlotSpec(
+    "Forces",
+    "Forces",
+    (
+        ("Drag Force", "Drag Force"),
+        ("Weight", "Weight"),
+        ("Thrust", "Thrust"),
+        ("Resultant Force", "Resultant Force"),
+    ),
+)
+FUEL_PLOT = PlotSpec("Mass", "Mass", (("Interim Fuel Remaining", "Interim Fuel Remaining"),))
+DRAG_FORCE_PLOT = PlotSpec("DragForce", "Drag Force (N)", (("Drag Force", "Drag Force"),))
+WEIGHT_PLOT = PlotSpec("Weight", "Weight", (("Weight", "Weight"),))
+GRAVITY_PLOT = PlotSpec(
+    "Gravity",
+    "Gravitational Acceleration (m/s^2)",
+    (("Gravity Acceleration", "Gravitational Acceleration"),),
+)
+POSITION_PLOT = PlotSpec(
+    "Position", "X Position", (("X Position", "Altitude"),), zlabel="Altitude"
+)
+
+PLOTS = (
+    ALTITUDE_PLOT,
+    VELOCITY_PLOT,
+    ACCELERATION_PLOT,
+    FORCE_PLOT,
+    FUEL_PLOT,
+    DRAG_FORCE_PLOT,
+    WEIGHT_PLOT,
+    GRAVITY_PLOT,
+    POSITION_PLOT,
+)
+
+
+def line_channels(spec, line):
+    # The channels one line of a PlotSpec draws against time
+    return list(line[: 2 if spec.zlabel else 1])
+
+
+def plot_channels(spec):
+    channels = ["Time"]
+    for line in spec.lines:
+        channels.extend(line_channels(spec, line))
+    return channels
+
+
+def _use_style(headless):
     import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
-
-    plt.style.use("cyberpunk")
-
-    # fmt: off
-    fig = plt.figure()
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Current Total Mass"],label="Current Total Mass",)
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Altitude"],label="Altitude",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Altitude")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("Altitude.png", dpi=900)
-    if show_plots:
-        plt.show()
 
-
-def position_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
+    if headless:
+        matplotlib.use("Agg")
+    import mplcyberpunk  # registers the cyberpunk style
     from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
 
     plt.style.use("cyberpunk")
-    fig = plt.figure()
-    ax = plt.axes(projection="3d")
-    x_axis = rocket_parameters["Time"]
-    y_axis = rocket_parameters["X Position"]
-    z_axis = rocket_parameters["Altitude"]
-    ax.set_xlabel("Time")
-    ax.set_ylabel("X Position")
-    ax.set_zlabel("Altitude")
-    plt.xscale("linear")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    ax.plot3D(x_axis, y_axis, z_axis)
-    mplcyberpunk.make_lines_glow()
-    if show_plots:
-        plt.show()
-    if save_plots:
-        plt.savefig("Position.png", dpi=900)
 
 
-def velocity_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
+def render_plot(spec, lines, show_plots, save_plots, dpi=900, image_format="png"):
+    # Draw one PlotSpec, save it as "<filename>.<image_format>" and/or show it, then close it.
+    # lines holds the data of every line of the spec in order, as plot_data returns it
     import mplcyberpunk
     from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
 
-    plt.style.use("cyberpunk")
-
-    # fmt: off
     fig = plt.figure()
-
-    plt.plot(rocket_parameters["Time"], rocket_parameters["Velocity"],label="Velocity")
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Velocity")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
+    if spec.zlabel:
+        ax = plt.axes(projection="3d")
+        ax.set_xlabel("Time")
+        ax.set_ylabel(spec.ylabel)
+        ax.set_zlabel(spec.zlabel)
+        plt.xscale("linear")
+        plt.yscale("linear")
+        plt.ticklabel_format(useOffset=False, style="plain")
+        for (y_channel, z_channel), data in zip(spec.lines, lines):
+            ax.plot3D(data["Time"], data[y_channel], data[z_channel])
+        mplcyberpunk.make_lines_glow()
+    else:
+        for (channel, label), data in zip(spec.lines, lines):
+            plt.plot(data["Time"], data[channel], label=label)
+        plt.xlabel("Time")
+        plt.xscale("linear")
+        plt.ylabel(spec.ylabel)
+        plt.yscale("linear")
+        plt.ticklabel_format(useOffset=False, style="plain")
+        plt.legend()
+        plt.grid(True)
+        mplcyberpunk.make_lines_glow()
+        plt.tight_layout()
     if save_plots:
-        plt.savefig("Velocity.png", dpi=900)
+        plt.savefig(f"{spec.filename}.{image_format}", dpi=dpi)
     if show_plots:
         plt.show()
+    plt.close(fig)
 
 
-def acceleration_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
-
-    plt.style.use("cyberpunk")
+def _render_saved_plot(spec, lines, dpi, image_format):
+    render_plot(spec, lines, False, True, dpi=dpi, image_format=image_format)
+    return spec.filename
 
-    # fmt: off
-    fig = plt.figure()
 
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Acceleration"],label="Acceleration",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Acceleration")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("Acceleration.png", dpi=900)
-    if show_plots:
-        plt.show()    
+def plot_data(spec, rocket_parameters, max_points=None, decimation="lttb"):
+    # The time and channels of every line of a PlotSpec, each line decimated on its own to
+    # at most max_points points, so one busy line does not add points to the others
+    return [
+        decimate(
+            rocket_parameters, max_points, method=decimation, channels=line_channels(spec, line)
+        )
+        for line in spec.lines
+    ]
 
 
-def force_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
+def create_plots(
+    rocket_parameters,
+    show_plots,
+    save_plots,
+    dpi=900,
+    image_format="png",
+    workers=None,
+    plots=PLOTS,
+    max_points=None,
+    decimation="lttb",
+):
+    # Render every PlotSpec in plots. Shown plots need the interactive backend and the
+    # main process, so they are drawn one after another. Plots that are only saved are
+    # rendered headless with Agg, spread over worker processes that each set up the style
+    # once and only receive the channels their plots use.
+    # Given max_points, every line is decimated to that many points first (see
+    # xrocket.decimate), so drawing no longer depends on the step size of the run
+    if not show_plots and not save_plots:
+        return
 
-    plt.style.use("cyberpunk")
+    if show_plots or workers == 1:
+        _use_style(headless=not show_plots)
+        for spec in plots:
+            render_plot(
+                spec,
+                plot_data(spec, rocket_parameters, max_points, decimation),
+                show_plots,
+                save_plots,
+                dpi,
+                image_format,
+            )
+        return
 
-    # fmt: off
-    fig = plt.figure()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_use_style, initargs=(True,)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _render_saved_plot,
+                spec,
+                plot_data(spec, rocket_parameters, max_points, decimation),
+                dpi,
+                image_format,
+            )
+            for spec in plots
+        ]
+        for future in futures:
+            future.result()
 
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Drag Force"],label="Drag Force",)
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Weight"],label="Weight",)
-    plt.plot(rocket_parameters["Time"], rocket_parameters["Thrust"], label="Thrust")
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Resultant Force"],label="Resultant Force",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Forces")
-    plt.yscale('linear')
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("Forces.png", dpi=900)
-    if show_plots:
-        plt.show()
 
+def altitude_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(ALTITUDE_PLOT,))
 
-def fuel_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
 
-    plt.style.use("cyberpunk")
+def position_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(POSITION_PLOT,))
 
-    # fmt: off
-    fig = plt.figure()
 
-    # plt.plot(rocket_parameters["Time"],rocket_parameters["Current Total Mass"],label="Current Total Mass",)
-    # plt.plot(rocket_parameters["Time"],rocket_parameters["Total Fuel Remaining"],label="Total Fuel Remaining",)
-    # plt.plot(rocket_parameters["Time"],rocket_parameters["Core Fuel Remaining"] ,label="Core Fuel Remaining",)
-    # plt.plot(rocket_parameters["Time"],rocket_parameters["SRB Fuel Remaining"] ,label="SRB Fuel Remaining",)
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Interim Fuel Remaining"] ,label="Interim Fuel Remaining",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Mass")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("Mass.png", dpi=900)
-    if show_plots:
-        plt.show()
+def velocity_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(VELOCITY_PLOT,))
 
 
-def drag_force_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
+def acceleration_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(
+        rocket_parameters, show_plots, save_plots, workers=1, plots=(ACCELERATION_PLOT,)
+    )
 
-    plt.style.use("cyberpunk")
 
-    # fmt: off
-    fig = plt.figure()
+def force_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(FORCE_PLOT,))
 
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Drag Force"],label="Drag Force",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Drag Force (N)")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("DragForce.png", dpi=900)
-    if show_plots:
-        plt.show()
 
+def fuel_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(FUEL_PLOT,))
 
-def weight_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
 
-    plt.style.use("cyberpunk")
+def drag_force_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(
+        rocket_parameters, show_plots, save_plots, workers=1, plots=(DRAG_FORCE_PLOT,)
+    )
 
-    # fmt: off
-    fig = plt.figure()
 
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Weight"],label="Weight",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Weight")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("Weight.png", dpi=900)
-    if show_plots:
-        plt.show()
+def weight_plot(rocket_parameters, show_plots, save_plots):
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(WEIGHT_PLOT,))
 
 
 def gravity_plot(rocket_parameters, show_plots, save_plots):
-    import matplotlib
-    import mplcyberpunk
-    from matplotlib import pyplot as plt
-    from mpl_toolkits import mplot3d
-
-    plt.style.use("cyberpunk")
-
-    # fmt: off
-    fig = plt.figure()
-
-    plt.plot(rocket_parameters["Time"],rocket_parameters["Gravity Acceleration"],label="Gravitational Acceleration",)
-    plt.xlabel("Time")
-    plt.xscale("linear")
-    plt.ylabel("Gravitational Acceleration (m/s^2)")
-    plt.yscale("linear")
-    plt.ticklabel_format(useOffset=False, style="plain")
-    plt.legend()
-    plt.grid(True)
-    mplcyberpunk.make_lines_glow()
-    plt.tight_layout()
-    if save_plots:
-        plt.savefig("Gravity.png", dpi=900)
-    if show_plots:
-        plt.show()
-
-
-def create_plots(rocket_parameters, show_plots, save_plots):
-    if not show_plots and not save_plots:
-        return
-
-    altitude_plot(rocket_parameters, show_plots, save_plots)
-    velocity_plot(rocket_parameters, show_plots, save_plots)
-    acceleration_plot(rocket_parameters, show_plots, save_plots)
-    force_plot(rocket_parameters, show_plots, save_plots)
-    fuel_plot(rocket_parameters, show_plots, save_plots)
-    drag_force_plot(rocket_parameters, show_plots, save_plots)
-    weight_plot(rocket_parameters, show_plots, save_plots)
-    gravity_plot(rocket_parameters, show_plots, save_plots)
-    position_plot(rocket_parameters, show_plots, save_plots)
+    create_plots(rocket_parameters, show_plots, save_plots, workers=1, plots=(GRAVITY_PLOT,))
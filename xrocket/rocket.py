@@ -1,34 +1,97 @@
+import copy
 import logging
 import math
+import warnings
 
 import numpy as np
 
-from xrocket.gravity import gravity_acceleration_calc
+from xrocket.atmosphere import atmosphere
+from xrocket.drag import load_drag_curve
+from xrocket.gravity import PointMassGravity
+from xrocket.stage import STAGE_FIELDS, Stage, StageSet
+from xrocket.vehicle import SLS_STAGING
 
 LOG = logging.getLogger(__name__)
 
+# Rocket attributes that change during a flight, kept in a snapshot along with the
+# position, the staging schedule and the StageSet
+SNAPSHOT_ATTRIBUTES = (
+    "time",
+    "phase",
+    "current_stage",
+    "theta",
+    "rocket_velocity",
+    "rocket_acceleration",
+    "drag_force",
+    "air_density",
+    "speed_of_sound",
+    "reference_area",
+    "drag_coefficient",
+    "mach_speed",
+)
+
+
+def per_step(method):
+    # Read only property computed once and then kept in Rocket._cache until the rocket
+    # invalidates it, so the sums over the stages run once per step however often the
+    # forces, telemetry and logging read them
+    name = method.__name__
+
+    def cached(self):
+        cache = self._cache
+        if name not in cache:
+            cache[name] = method(self)
+        return cache[name]
+
+    return property(cached)
+
 
 class Rocket:
-    def __init__(
+    # Rocket flying a list of Stage instances through the phases of an
+    # xrocket.vehicle.StagingTable, the SLS sequence of settings.py by default, in the
+    # gravity of an xrocket.gravity model, a point mass Earth by default
+    def __init__(self, stages, *args, **kwargs):
+        if isinstance(stages, Stage):
+            # Rocket(core, srb, interim, exploration, earth_mass, earth_radius, drag_curve)
+            # of the SLS, from before the stages came as one list
+            warnings.warn(
+                "Rocket(core_stage, srb_stage, interim_stage, exploration_stage, ...) is "
+                "deprecated, pass the stages as one list: Rocket([core_stage, srb_stage, "
+                "interim_stage, exploration_stage], ...)",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            stages, args = [stages, *args[:3]], args[3:]
+        self._setup(stages, *args, **kwargs)
+
+    def _setup(
         self,
-        core_stage,
-        srb_stage,
-        interim_stage,
-        exploration_stage,
+        stages,
         earth_mass,
         earth_radius,
+        drag_curve=None,
+        staging=None,
+        gravity_model=None,
     ):
-
-        self.current_stage = "Core SRB"
+        self.staging = staging if staging is not None else SLS_STAGING
+        if len(stages) != len(self.staging.stage_names):
+            raise ValueError(
+                f"{len(stages)} stages for a staging table of {len(self.staging.stage_names)}"
+            )
+        # Index of the current phase in the staging table, current_stage is its name
+        self.phase = 0
+        self.current_stage = self.staging.phase_names[0]
+        self.time = 0
+        # (time, stage index) of every burnout ahead, see plan_staging
+        self.staging_schedule = None
         self.reference_area = 0
         self.air_density = 1.225  # kg / m**3 [rho]
+        self.speed_of_sound = 340.294  # m / s
 
-        # List of Stage instances
-        self.stage_objects = [core_stage, srb_stage, interim_stage, exploration_stage]
-        self.core_stage = core_stage
-        self.srb_stage = srb_stage
-        self.interim_stage = interim_stage
-        self.exploration_stage = exploration_stage
+        # List of Stage instances, views of the StageSet the rocket updates them through
+        self.stage_objects = list(stages)
+        self.stages = StageSet(self.stage_objects)
+        self.name_stages()
 
         # Forces
         self.drag_force = 0
@@ -37,180 +100,163 @@ class Rocket:
         self.rocket_acceleration = 0
         self.rocket_velocity = 0
         self.pos = np.array([0, 0])
-        self.theta = 90
+        self.theta = self.staging.pitch
 
         # Values used to calculate drag force
         self.drag_coefficient = 0
         self.mach_speed = 0
+        # Drag curve of every stage that does not carry its own
+        self.drag_curve = drag_curve if drag_curve is not None else load_drag_curve()
         # TODO refactor later
         self.earth_mass = earth_mass
         self.earth_radius = earth_radius
+        if gravity_model is None:
+            gravity_model = PointMassGravity(earth_mass, earth_radius)
+        self.gravity_model = gravity_model
+
+        # Aggregates of the current step, see per_step and invalidate
+        self._cache = {}
+        # xrocket.instrumentation.Instrumentation timing each step, None when not profiling
+        self.instrumentation = None
+        # Given a list, stage_event appends a snapshot of the rocket after every staging
+        self.staging_snapshots = None
+        # xrocket.scheduler.Scheduler skipping subsystems that need not run every step
+        self.scheduler = None
+        # Stages burning from the last staging event to the next one, see freeze_burning,
+        # None to go by the propellant left
+        self.burning = None
+        # Function of the flight time giving theta, e.g. xrocket.optimize.PitchProgram,
+        # flown instead of the pitches of the staging table when set
+        self.pitch_program = None
+
+    # Quantities that depend on the stages, on the position and on the drag force. Anything
+    # changing those outside of the methods below has to call invalidate
+    STAGE_QUANTITIES = None
+    POSITION_QUANTITIES = ("gravity_acceleration", "weight", "gravity", "resultant_force")
+    DRAG_QUANTITIES = ("resultant_force",)
+
+    def invalidate(self, quantities=STAGE_QUANTITIES):
+        # Forget cached quantities, all of them by default
+        if quantities is None:
+            self._cache.clear()
+        else:
+            for quantity in quantities:
+                self._cache.pop(quantity, None)
+
+    def name_stages(self):
+        # The first four stages under the names of the SLS stages, which telemetry and the
+        # plots read. Vehicles with fewer stages get empty stand-ins for the rest
+        padding = [Stage(0, 0, 0, 0, 0) for _ in range(4 - len(self.stage_objects))]
+        (
+            self.core_stage,
+            self.srb_stage,
+            self.interim_stage,
+            self.exploration_stage,
+        ) = (self.stage_objects + padding)[:4]
 
-    # Masses
     @property
+    def altitude(self):
+        return self.pos[1]
+
+    # Masses
+    @per_step
     def total_dry_mass(self):
-        return sum([stage.dry_mass for stage in self.stage_objects])
+        return sum(self.stages.dry_mass)
 
-    @property
+    @per_step
     def total_propellant_mass(self):
-        return sum([stage.prop_mass for stage in self.stage_objects])
+        return sum(self.stages.prop_mass)
 
-    @property
+    @per_step
     def total_mass(self):
-        return sum([stage.total_mass for stage in self.stage_objects])
+        return sum(self.stages.total_mass)
 
     # Forces
-    @property
+    @per_step
+    def gravity_acceleration(self):
+        # Negative, pointing down. Evaluated once per step, weight, gravity and telemetry
+        # all read it from here
+        return self.gravity_model.acceleration(self.pos[1])
+
+    @per_step
     def weight(self):
-        return self.total_mass * gravity_acceleration_calc(
-            big_object_mass=self.earth_mass,
-            big_object_radius=self.earth_radius,
-            small_object_distance=self.pos[1],
-        )
+        return self.total_mass * self.gravity_acceleration
 
-    @property
+    @per_step
     def gravity(self):
-        return -gravity_acceleration_calc(
-            big_object_mass=self.earth_mass,
-            big_object_radius=self.earth_radius,
-            small_object_distance=self.pos[1],
-        )
+        return -self.gravity_acceleration
 
-    @property
+    @per_step
     def thrust(self):
-        return sum([stage.thrust for stage in self.stage_objects if stage.firing])
+        stages = self.stages
+        return sum([thrust for thrust, firing in zip(stages.thrust, stages.firing) if firing])
 
-    @property
+    @per_step
     def resultant_force(self):
         return self.thrust + self.weight + self.drag_force
 
     def flight_controller(self):
-        if self.core_stage.prop_mass > 0 and self.srb_stage.prop_mass > 0:
-            self.interim_stage.firing = False
-            self.current_stage = "Core SRB"
-        elif self.srb_stage.prop_mass <= 0 and self.core_stage.prop_mass > 0:
-            self.interim_stage.firing = False
-            self.srb_stage.firing = False
-            self.srb_stage.attached = False
-            self.current_stage = "Core"
-            self.theta = 90
-        elif self.core_stage.prop_mass <= 0 and self.srb_stage.prop_mass <= 0:
-            self.core_stage.firing = False
-            self.core_stage.attached = False
-            self.srb_stage.firing = False
-            self.srb_stage.attached = False
-            self.interim_stage.firing = True
-            self.current_stage = "Interim"
-            self.theta = 110
-        elif self.interim_stage.prop_mass <= 0:
-            self.interim_stage.firing = False
-            self.interim_stage.attached = False
-            self.exploration_stage.firing = True
-            self.current_stage = "Exploration"
-            self.theta = 150
+        # Enter the phase the staging table gives for the stages burnt out, if any, and
+        # apply its shutdowns, jettisons, ignitions and pitch
+        staging = self.staging
+        stages = self.stages
+        phase = staging.phase_for(stages.prop_mass)
+        if phase < 0:
+            return
+        for index in staging.shutdown[phase]:
+            stages.firing[index] = False
+        for index in staging.jettison[phase]:
+            stages.firing[index] = False
+            stages.attached[index] = False
+        for index in staging.ignite[phase]:
+            stages.firing[index] = True
+        self.phase = phase
+        self.current_stage = staging.phase_names[phase]
+        pitch = staging.pitches[phase]
+        if pitch is not None and self.pitch_program is None:
+            self.theta = pitch
 
     def update_mass(self, dt):
-        stage_dry_masses = [stage.dry_mass for stage in self.stage_objects]
-        stage_prop_masses = [stage.prop_mass for stage in self.stage_objects]
-        stage_total_masses = [stage.total_mass for stage in self.stage_objects]
-
+        if not LOG.isEnabledFor(logging.DEBUG):
+            return
+        if self.scheduler is not None and not self.scheduler.due("mass_log", self):
+            return
+        stages = self.stages
         LOG.debug(
-            f"Core Stage Dry Mass: {stage_dry_masses[0]}\nCore Stage Prop Mass: {stage_prop_masses[0]}\nCore Stage Total Mass: {stage_total_masses[0]}\nSRB Stage Dry Mass: {stage_dry_masses[1]}\nSRB Stage Prop Mass: {stage_prop_masses[1]}\nSRB Stage Total Mass: {stage_total_masses[1]}\nInterim Stage Dry Mass: {stage_dry_masses[2]}\nInterim Stage Prop Mass: {stage_prop_masses[2]}\nInterim Stage Total Mass: {stage_total_masses[2]}\nExploration Stage Dry Mass: {stage_dry_masses[3]}\nExploration Stage Prop Mass: {stage_prop_masses[3]}\nExploration Stage Total Mass: {stage_total_masses[3]}\n"
+            "".join(
+                f"{name} Stage Dry Mass: {stages.dry_mass[index]}\n"
+                f"{name} Stage Prop Mass: {stages.prop_mass[index]}\n"
+                f"{name} Stage Total Mass: {stages.total_mass[index]}\n"
+                for index, name in enumerate(self.staging.stage_names)
+            )
         )
 
     def calc_air_density(self):
-        # Approximate air density based on the "U.S. Standard Atmosphere 1976" model
-        # Reference: https://www.engineeringtoolbox.com/standard-atmosphere-d_604.html
-        if self.pos[1] <= 0:
-            self.air_density = 1.225
-        elif 0 < self.pos[1] <= 1000:
-            self.air_density = 1.112
-        elif 1000 < self.pos[1] <= 2000:
-            self.air_density = 1.007
-        elif 2000 < self.pos[1] <= 3000:
-            self.air_density = 0.9093
-        elif 3000 < self.pos[1] <= 4000:
-            self.air_density = 0.8194
-        elif 4000 < self.pos[1] <= 5000:
-            self.air_density = 0.7364
-        elif 5000 < self.pos[1] <= 6000:
-            self.air_density = 0.661
-        elif 6000 < self.pos[1] <= 7000:
-            self.air_density = 0.5900
-        elif 7000 < self.pos[1] <= 8000:
-            self.air_density = 0.5258
-        elif 8000 < self.pos[1] <= 9000:
-            self.air_density = 0.4671
-        elif 9000 < self.pos[1] <= 10000:
-            self.air_density = 0.4135
-        elif 10000 < self.pos[1] <= 15000:
-            self.air_density = 0.1948
-        elif 15000 < self.pos[1] <= 20000:
-            self.air_density = 0.08891
-        elif 20000 < self.pos[1] <= 25000:
-            self.air_density = 0.04008
-        elif 25000 < self.pos[1] <= 30000:
-            self.air_density = 0.01841
-        elif 30000 < self.pos[1] <= 40000:
-            self.air_density = 0.003996
-        elif 40000 < self.pos[1] <= 50000:
-            self.air_density = 0.001027
-        elif 50000 < self.pos[1] <= 60000:
-            self.air_density = 0.0003097
-        elif 60000 < self.pos[1] <= 70000:
-            self.air_density = 0.00008283
-        elif 70000 < self.pos[1] <= 80000:
-            self.air_density = 0.00001846
-        elif 80000 < self.pos[1]:
-            self.air_density = 0
+        # Interpolated "U.S. Standard Atmosphere 1976" tables, see xrocket.atmosphere
+        self.air_density, _, self.speed_of_sound = atmosphere(self.pos[1])
 
     def calc_reference_area(self):
-        if self.current_stage == "Core SRB":
-            self.reference_area = self.core_stage.reference_area
-        elif self.current_stage == "Core":
-            self.reference_area = (
-                self.core_stage.reference_area - self.srb_stage.reference_area
-            )
-        elif self.current_stage == "Interim":
-            self.reference_area = self.interim_stage.reference_area
-        elif self.current_stage == "Exploration":
-            self.reference_area = self.exploration_stage.reference_area
+        # Sum of the reference areas the current phase adds up and subtracts
+        areas = self.stages.reference_area
+        first, added, subtracted = self.staging.area_terms[self.phase]
+        reference_area = areas[first]
+        for index in added:
+            reference_area = reference_area + areas[index]
+        for index in subtracted:
+            reference_area = reference_area - areas[index]
+        self.reference_area = reference_area
+
+    def calc_drag_coefficient(self):
+        # Interpolate the drag curve of the stage leading the current phase
+        drag_curve = self.stages.drag_curve[self.staging.leading[self.phase]]
+        if drag_curve is None:
+            drag_curve = self.drag_curve
+        self.drag_coefficient = drag_curve(self.mach_speed)
 
     def calc_drag_force(self, dt):
         # update mach speed based from current rocket velocity
-        self.mach_speed = self.rocket_velocity / 343
-        # calculate drag force based loosely on the curve used in artemis simulation
-        # Reference: https://www.researchgate.net/publication/362270344_Preliminary_Launch_Trajectory_Simulation_for_Artemis_I_with_the_Space_Launch_System
-        if self.mach_speed <= 0.25:
-            self.drag_coefficient = 0.25
-        elif 0.25 < self.mach_speed <= 1:
-            self.drag_coefficient = 0.25
-        elif 1.00 < self.mach_speed <= 1.25:
-            self.drag_coefficient = 0.60
-        elif 1.25 < self.mach_speed <= 1.5:
-            self.drag_coefficient = 0.65
-        elif 1.50 < self.mach_speed <= 2.00:
-            self.drag_coefficient = 0.55
-        elif 2.00 < self.mach_speed <= 2.25:
-            self.drag_coefficient = 0.50
-        elif 2.25 < self.mach_speed <= 2.50:
-            self.drag_coefficient = 0.45
-        elif 2.50 < self.mach_speed <= 2.75:
-            self.drag_coefficient = 0.43
-        elif 2.75 < self.mach_speed <= 3.00:
-            self.drag_coefficient = 0.40
-        elif 3.00 < self.mach_speed <= 3.50:
-            self.drag_coefficient = 0.33
-        elif 3.50 < self.mach_speed <= 4.00:
-            self.drag_coefficient = 0.30
-        elif 4.00 < self.mach_speed <= 5.00:
-            self.drag_coefficient = 0.28
-        elif 5.00 < self.mach_speed <= 6.00:
-            self.drag_coefficient = 0.26
-        elif 6.00 < self.mach_speed <= 8.00:
-            self.drag_coefficient = 0.25
-        elif self.mach_speed > 8:
-            self.drag_coefficient = 0.23
+        self.mach_speed = self.rocket_velocity / self.speed_of_sound
+        self.calc_drag_coefficient()
         if self.rocket_velocity > 0:
             self.drag_force = -(
                 0.5
@@ -228,13 +274,16 @@ class Rocket:
                 * self.drag_coefficient
                 * self.reference_area
             )
+        self.invalidate(self.DRAG_QUANTITIES)
 
     def calc_acc_vel(self, dt):
         # Calculate acceleration for variable mass system => a = [resultant force] / m
         self.rocket_acceleration = self.resultant_force / self.total_mass
-        LOG.debug(
-            f"ACCELERATION {self.rocket_acceleration}\nresultant force {self.resultant_force}\ntotal mass {self.total_mass}\n"
-        )
+        debug = LOG.isEnabledFor(logging.DEBUG)
+        if debug:
+            LOG.debug(
+                f"ACCELERATION {self.rocket_acceleration}\nresultant force {self.resultant_force}\ntotal mass {self.total_mass}\n"
+            )
 
         # Use kinematics equation to update velocity
         # Second Law assumes constant "a" but with sufficiently small "dt" we can still use it
@@ -245,9 +294,11 @@ class Rocket:
         # if self.pos == 0:
         #     # Prevent negative velocities while on the launch pad
         #     self.rocket_velocity = 0
-        LOG.debug(f"VEL BEFORE UPDATE {self.rocket_velocity}")
+        if debug:
+            LOG.debug(f"VEL BEFORE UPDATE {self.rocket_velocity}")
         self.rocket_velocity = self.rocket_velocity + self.rocket_acceleration * dt
-        LOG.debug(f"VEL VEL VEL {self.rocket_velocity}")
+        if debug:
+            LOG.debug(f"VEL VEL VEL {self.rocket_velocity}")
 
     def move(self, dt):
         # Calculate delta position[displacement s] of the rocket per dt
@@ -279,21 +330,341 @@ class Rocket:
         # LOG.debug(f"delta_pos is {delta_pos}")
 
         self.pos = self.pos + delta_pos
+        self.invalidate(self.POSITION_QUANTITIES)
         # LOG.debug(f"Acceleration: {self.rocket_acceleration}")
         # LOG.debug(f"Velocity: {self.rocket_velocity}\n")
         # LOG.debug(f"pos: {self.pos}\n")
         delta_pos = 0
 
+    # State vector used by xrocket.integrators
+    # [x, y, velocity, prop mass of every stage in order]
+    def get_state(self):
+        return np.array(
+            [self.pos[0], self.pos[1], self.rocket_velocity] + self.stages.prop_mass,
+            dtype=float,
+        )
+
+    def set_state(self, state):
+        # Load a state vector and recalculate everything derived from it
+        self.pos = state[:2].copy()
+        self.rocket_velocity = state[2]
+        stages = self.stages
+        for index, prop_mass in enumerate(state[3:]):
+            stages.prop_mass[index] = prop_mass
+            stages.total_mass[index] = prop_mass + stages.dry_mass[index]
+        if self.burning is None:
+            stages.calc_thrust()
+        else:
+            for index, burning in enumerate(self.burning):
+                stages.thrust[index] = (
+                    stages.exhaust_velocity[index] * stages.mass_flow[index] if burning else 0
+                )
+        self.invalidate()
+        self.calc_air_density()
+        self.calc_reference_area()
+        self.calc_drag_force(0)
+        self.rocket_acceleration = self.resultant_force / self.total_mass
+
+    def freeze_burning(self):
+        # Take the stages firing with propellant left as the stages burning until the next
+        # staging event. A step ending on a burnout drains the stage to a rounding error
+        # either side of zero, so set_state and derivatives go by this set rather than by
+        # the propellant left, which would cut the thrust for the last stage of the step
+        stages = self.stages
+        self.burning = [
+            bool(mass_flow) and prop_mass > 0
+            for mass_flow, prop_mass in zip(stages.mass_flow, stages.prop_mass)
+        ]
+
+    def burning_mass_flows(self):
+        # Mass flow of every stage, zero for stages that are not burning
+        stages = self.stages
+        if self.burning is None:
+            return [
+                mass_flow if prop_mass > 0 else 0
+                for mass_flow, prop_mass in zip(stages.mass_flow, stages.prop_mass)
+            ]
+        return [
+            mass_flow if burning else 0
+            for mass_flow, burning in zip(stages.mass_flow, self.burning)
+        ]
+
+    def derivatives(self, t, state):
+        self.set_state(state)
+        if self.pitch_program is not None:
+            self.theta = self.pitch_program(t)
+        theta = self.theta * math.pi / 180
+        mass_flows = self.burning_mass_flows()
+        return np.array(
+            [
+                self.rocket_velocity * math.cos(theta),
+                self.rocket_velocity * math.sin(theta),
+                self.rocket_acceleration,
+            ]
+            + mass_flows,
+            dtype=float,
+        )
+
+    def stage_event(self, index=None):
+        # Burn out stage_objects[index] if given, then run the flight controller and let the
+        # stages pick up its firing and attachment flags without draining any propellant
+        stages = self.stages
+        if index is not None:
+            stages.prop_mass[index] = 0.0
+            stages.total_mass[index] = stages.dry_mass[index]
+        if self.instrumentation is not None:
+            start = self.instrumentation.clock()
+            self.flight_controller()
+            self.instrumentation.lap("flight_controller", start)
+        else:
+            self.flight_controller()
+        stages.check_firing()
+        stages.check_attachment()
+        stages.calc_thrust()
+        self.invalidate()
+        if self.scheduler is not None:
+            self.scheduler.reset()
+        if self.staging_snapshots is not None:
+            self.staging_snapshots.append(self.snapshot())
+
+    def plan_staging(self):
+        # Propellant drains linearly at the mass flow of each firing stage, so the next
+        # burnout time follows directly from the remaining propellant. Walk the flight
+        # controller from burnout to burnout on a copy of the rocket to get every staging
+        # event ahead. The first entry runs the flight controller at the current time and
+        # the schedule ends with an event at infinity so callers need no length checks
+        rocket = copy.deepcopy(self)
+        rocket.staging_snapshots = None
+        rocket.stage_event()
+        t = self.time
+        schedule = [(t, None)]
+        while True:
+            burnouts = [
+                (stage.prop_mass / -stage.mass_flow, index)
+                for index, stage in enumerate(rocket.stage_objects)
+                if stage.mass_flow < 0 and stage.prop_mass > 0
+            ]
+            if not burnouts:
+                break
+            burn_time, index = min(burnouts)
+            rocket.stages.calc_mass(burn_time)
+            t += burn_time
+            rocket.stage_event(index)
+            schedule.append((t, index))
+            LOG.debug(f"Staging planned at {t} seconds, now {rocket.current_stage}")
+        schedule.append((math.inf, None))
+        return schedule
+
+    def snapshot(self):
+        # Everything that changes in flight as plain values (JSON serialisable), enough for
+        # restore to continue the flight from here. A few lists, cheap to take at every
+        # staging event. Drag curves, Earth and the stage parameters are not included
+        stages = self.stages
+        return {
+            **{attribute: getattr(self, attribute) for attribute in SNAPSHOT_ATTRIBUTES},
+            "pos": self.pos.tolist(),
+            "staging_schedule": None
+            if self.staging_schedule is None
+            else [list(event) for event in self.staging_schedule],
+            "stages": {
+                field: list(getattr(stages, field))
+                for field in STAGE_FIELDS
+                if field != "drag_curve"
+            },
+        }
+
+    def restore(self, snapshot):
+        # Put the rocket back in the state of a snapshot of this rocket or one built from
+        # the same settings
+        for attribute in SNAPSHOT_ATTRIBUTES:
+            if attribute == "phase" and attribute not in snapshot:
+                # Snapshots taken before phases had ids
+                self.phase = self.staging.phase_ids[snapshot["current_stage"]]
+                continue
+            setattr(self, attribute, snapshot[attribute])
+        self.pos = np.array(snapshot["pos"])
+        self.staging_schedule = (
+            None
+            if snapshot["staging_schedule"] is None
+            else [tuple(event) for event in snapshot["staging_schedule"]]
+        )
+        for field, values in snapshot["stages"].items():
+            getattr(self.stages, field)[:] = values
+        self.invalidate()
+
+    def fork(self):
+        # Independent copy of the rocket in its current state to fly on separately, only
+        # the drag curves are shared
+        rocket = copy.copy(self)
+        rocket.stages = self.stages.copy()
+        rocket.stage_objects = [rocket.stages.view(index) for index in range(len(rocket.stages))]
+        rocket.name_stages()
+        rocket.pos = self.pos.copy()
+        if self.staging_schedule is not None:
+            rocket.staging_schedule = list(self.staging_schedule)
+        rocket._cache = {}
+        rocket.instrumentation = None
+        rocket.staging_snapshots = None
+        if self.scheduler is not None:
+            rocket.scheduler = self.scheduler.copy()
+        return rocket
+
     def update(self, dt):
         # update method that will eventually be integrated into pygame, calling methods in their logical order to calc pos
         # and eventually move the rocket on-screen. dt is passed through as a parameter in the self.all_sprites.update(dt) call
         # in the main game loop in main.py [rocket class will be a member of the all_sprites Group]
-        self.flight_controller()
-        for stage in self.stage_objects:
-            stage.update(dt)
+        # A step holding a staging event is split at the event, so the rocket stages exactly
+        # at burnout and every step in between runs without any staging checks
+        if self.staging_schedule is None:
+            self.staging_schedule = self.plan_staging()
+        t_end = self.time + dt
+        while self.staging_schedule[0][0] <= t_end:
+            event_time, index = self.staging_schedule.pop(0)
+            if event_time > self.time:
+                self.step(event_time - self.time)
+                self.time = event_time
+            self.stage_event(index)
+        self.step(t_end - self.time)
+        self.time = t_end
+
+    def step(self, dt):
+        # Advance the stages and the rocket by dt with the current staging
+        # An attached scheduler skips the subsystems it holds, see xrocket.scheduler. A pitch
+        # program sets theta at the start of the step. An attached instrumentation times the
+        # phases of the step
+        timer = self.instrumentation
+        if self.pitch_program is not None:
+            self.theta = self.pitch_program(self.time)
+        scheduler = self.scheduler
+        self.stages.update(dt)
+        self.invalidate()
         self.update_mass(dt)
-        self.calc_air_density()
-        self.calc_reference_area()
-        self.calc_drag_force(dt)
+        if timer is not None:
+            start = timer.clock()
+        if scheduler is None or scheduler.due("atmosphere", self):
+            self.calc_air_density()
+        if timer is not None:
+            start = timer.lap("atmosphere", start)
+        if scheduler is None or scheduler.due("reference_area", self):
+            self.calc_reference_area()
+        if scheduler is None or scheduler.due("drag", self):
+            self.calc_drag_force(dt)
+        else:
+            self.mach_speed = self.rocket_velocity / self.speed_of_sound
+        if timer is not None:
+            start = timer.lap("drag", start)
         self.calc_acc_vel(dt)
         self.move(dt)
+        if timer is not None:
+            timer.lap("integration", start)
+
+
+class FastRocket(Rocket):
+    # Rocket stepping on plain floats. The position is kept in x and y and pos only builds
+    # an array when it is read, and the sine and cosine of theta are only recomputed when
+    # theta changes, at staging. Flies exactly like Rocket, step for step
+    def __init__(self, *args, **kwargs):
+        self.x = 0.0
+        self.y = 0.0
+        self._trig_theta = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def pos(self):
+        return np.array([self.x, self.y])
+
+    @pos.setter
+    def pos(self, pos):
+        self.x = float(pos[0])
+        self.y = float(pos[1])
+
+    @property
+    def altitude(self):
+        return self.y
+
+    def pitch_trig(self):
+        # Cosine and sine of theta
+        if self.theta != self._trig_theta:
+            radians = self.theta * math.pi / 180
+            self._cos_theta = math.cos(radians)
+            self._sin_theta = math.sin(radians)
+            self._trig_theta = self.theta
+        return self._cos_theta, self._sin_theta
+
+    @per_step
+    def gravity_acceleration(self):
+        return self.gravity_model.acceleration(self.y)
+
+    def calc_air_density(self):
+        self.air_density, _, self.speed_of_sound = atmosphere(self.y)
+
+    def step(self, dt):
+        # Rocket.step in one method and without its debug logging, same arithmetic and timing
+        timer = self.instrumentation
+        if self.pitch_program is not None:
+            self.theta = self.pitch_program(self.time)
+        scheduler = self.scheduler
+        self.stages.update(dt)
+        self._cache.clear()
+        if timer is not None:
+            start = timer.clock()
+        if scheduler is None or scheduler.due("atmosphere", self):
+            self.air_density, _, self.speed_of_sound = atmosphere(self.y)
+        if timer is not None:
+            start = timer.lap("atmosphere", start)
+        if scheduler is None or scheduler.due("reference_area", self):
+            self.calc_reference_area()
+
+        velocity = self.rocket_velocity
+        self.mach_speed = velocity / self.speed_of_sound
+        if scheduler is None or scheduler.due("drag", self):
+            self.calc_drag_coefficient()
+            drag_force = (
+                0.5
+                * self.air_density
+                * (velocity**2)
+                * self.drag_coefficient
+                * self.reference_area
+            )
+            self.drag_force = -drag_force if velocity > 0 else drag_force
+        if timer is not None:
+            start = timer.lap("drag", start)
+
+        self.rocket_acceleration = self.resultant_force / self.total_mass
+        self.rocket_velocity = velocity + self.rocket_acceleration * dt
+        self.move(dt)
+        if timer is not None:
+            timer.lap("integration", start)
+
+    def move(self, dt):
+        cos_theta, sin_theta = self.pitch_trig()
+        velocity = self.rocket_velocity
+        acceleration = self.rocket_acceleration
+        self.x = self.x + (
+            velocity * cos_theta * dt + (0.5 * acceleration * cos_theta) * (dt**2)
+        )
+        self.y = self.y + (
+            velocity * sin_theta * dt + (0.5 * acceleration * sin_theta) * (dt**2)
+        )
+        self.invalidate(self.POSITION_QUANTITIES)
+
+    def get_state(self):
+        return np.array(
+            [self.x, self.y, self.rocket_velocity] + self.stages.prop_mass, dtype=float
+        )
+
+    def derivatives(self, t, state):
+        self.set_state(state)
+        if self.pitch_program is not None:
+            self.theta = self.pitch_program(t)
+        cos_theta, sin_theta = self.pitch_trig()
+        mass_flows = self.burning_mass_flows()
+        return np.array(
+            [
+                self.rocket_velocity * cos_theta,
+                self.rocket_velocity * sin_theta,
+                self.rocket_acceleration,
+            ]
+            + mass_flows,
+            dtype=float,
+        )
@@ -0,0 +1,93 @@
+from collections import defaultdict, namedtuple
+
+from xrocket.atmosphere import ATMOSPHERE_TOP
+
+# A subsystem of Rocket.step that need not run every step. period is the least time in
+# seconds between two evaluations, 0 for every step. hold(rocket), if given, is true
+# while the last evaluation is still exact, and the subsystem is then skipped whatever
+# its period. Every subsystem runs again on the first step after a staging event
+Subsystem = namedtuple("Subsystem", ["name", "period", "hold", "description"])
+
+# Slack for comparing elapsed time to periods, dt added up n times falls short of n * dt
+TIME_EPSILON = 1e-9
+
+
+def _in_vacuum(rocket):
+    # Above the tables air density is zero and the speed of sound constant
+    return rocket.air_density == 0 and rocket.altitude > ATMOSPHERE_TOP
+
+
+def _no_air(rocket):
+    # Without air the drag force is zero whatever the Mach number and drag coefficient, and
+    # stays so once it has been evaluated without air
+    return rocket.air_density == 0 and rocket.drag_force == 0
+
+
+def _until_staging(rocket):
+    return True
+
+
+SUBSYSTEMS = (
+    Subsystem("mass_log", 1.0, None, "Stage mass dump of update_mass, debug logging only"),
+    Subsystem("atmosphere", 0.0, _in_vacuum, "Air density and speed of sound"),
+    Subsystem("reference_area", 0.0, _until_staging, "Reference area of the leading stage"),
+    Subsystem("drag", 0.0, _no_air, "Drag coefficient and drag force, Mach is kept current"),
+)
+
+
+class Scheduler:
+    # Decides, step by step, which subsystems of a rocket run. Stages, acceleration and
+    # position always run at the base rate. The default SUBSYSTEMS only skip work whose
+    # result cannot change, longer periods trade fidelity for speed.
+    # Attach with rocket.scheduler = Scheduler(), euler only: the rk integrators
+    # evaluate everything through Rocket.set_state
+    def __init__(self, periods=None, subsystems=SUBSYSTEMS):
+        periods = periods or {}
+        names = {subsystem.name for subsystem in subsystems}
+        for name in periods:
+            if name not in names:
+                raise ValueError(f"Unknown subsystem {name}")
+        self.subsystems = subsystems
+        self.periods = {
+            subsystem.name: periods.get(subsystem.name, subsystem.period)
+            for subsystem in subsystems
+        }
+        self.holds = {subsystem.name: subsystem.hold for subsystem in subsystems}
+        # Time of the last evaluation of every subsystem, None when due on the next step
+        self.last = dict.fromkeys(self.periods)
+        self.evaluations = defaultdict(int)
+        self.skips = defaultdict(int)
+
+    def copy(self):
+        # Scheduler with the same periods and every subsystem due
+        return Scheduler(self.periods, self.subsystems)
+
+    def reset(self):
+        # Every subsystem runs on the next step, e.g. after staging
+        for name in self.last:
+            self.last[name] = None
+
+    def due(self, name, rocket):
+        # Whether subsystem name runs in this step of rocket, counted as run if it does
+        last = self.last[name]
+        if last is not None:
+            hold = self.holds[name]
+            if (hold is not None and hold(rocket)) or (
+                rocket.time + TIME_EPSILON - last < self.periods[name]
+            ):
+                self.skips[name] += 1
+                return False
+        self.last[name] = rocket.time
+        self.evaluations[name] += 1
+        return True
+
+    def report(self):
+        # Evaluations and skips of every subsystem
+        return {
+            name: {
+                "period": self.periods[name],
+                "evaluations": self.evaluations[name],
+                "skipped": self.skips[name],
+            }
+            for name in self.periods
+        }
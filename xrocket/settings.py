@@ -1,6 +1,8 @@
 GRAVITATIONAL_CONSTANT = 6.6738e-11
 EARTH_MASS = 5.9722e24  # kg
 EARTH_RADIUS = 6.371e6  # m
+EARTH_J2 = 1.08263e-3  # oblateness, see xrocket.gravity.J2Gravity
+LAUNCH_LATITUDE = 28.627  # degrees, Kennedy Space Center Launch Complex 39B
 
 
 """ ----------------------------------------------------------------
@@ -48,6 +50,10 @@ EARTH_RADIUS = 6.371e6  # m
  Solid Rocket Boosters : 10.81 m**2
  Interim Cryogenic Propulsion Stage : 20.43 m**2
  Total Rocket Area Block 1 : 77.04 m**2
+ ------------------------
+ Drag Curve (optional)
+ CSV file with "Mach" and "Drag Coefficient" columns used while the stage
+ leads the rocket, xrocket/data/artemis_drag.csv when left out
  ------------------------"""
 
 
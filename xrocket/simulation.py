@@ -0,0 +1,371 @@
+import json
+import logging
+import math
+
+from xrocket.coast import coast as fly_coast
+from xrocket.coast import coasting
+from xrocket.drag import load_drag_curve
+from xrocket.integrators import INTEGRATORS, integrate
+from xrocket.rocket import FastRocket, Rocket
+from xrocket.settings import (
+    CORE_STAGE,
+    EARTH_MASS,
+    EARTH_RADIUS,
+    EXPLORATION_UPPER_STAGE,
+    INTERIM_CRYOGENIC_STAGE,
+    SOLID_ROCKET_BOOSTERS,
+)
+from xrocket.stage import Stage
+from xrocket.termination import TIME_LIMIT, stop_check
+from xrocket.vehicle import SLS_PHASES, SLS_STAGE_NAMES, compile_vehicle
+
+LOG = logging.getLogger(__name__)
+
+# Stage settings by their name in settings.py, parameters are addressed as "<name>.<key>"
+# e.g. "CORE_STAGE.Mass Flow"
+STAGE_SETTINGS = {
+    "CORE_STAGE": CORE_STAGE,
+    "SOLID_ROCKET_BOOSTERS": SOLID_ROCKET_BOOSTERS,
+    "INTERIM_CRYOGENIC_STAGE": INTERIM_CRYOGENIC_STAGE,
+    "EXPLORATION_UPPER_STAGE": EXPLORATION_UPPER_STAGE,
+}
+
+# Stage settings keys and the StageSet field each of them sets on a rocket in flight
+SETTING_FIELDS = {
+    "Dry Mass": "dry_mass",
+    "Propellant Mass": "prop_mass",
+    "Mass Flow": "mass_flow_copy",
+    "Exhaust Velocity": "exhaust_velocity_copy",
+    "Reference Area": "reference_area",
+    "Drag Curve": "drag_curve",
+}
+
+# Label of each entry of Rocket.stage_objects, as in the telemetry channel names
+STAGE_LABELS = SLS_STAGE_NAMES
+
+# Rocket classes build_rocket can fly. fast keeps its state in plain floats and steps
+# exactly like the reference Rocket
+ROCKET_KERNELS = {"reference": Rocket, "fast": FastRocket}
+
+# Integrators simulate flies, euler steps Rocket.update and the others go through
+# xrocket.integrators
+INTEGRATOR_NAMES = ("euler",) + tuple(INTEGRATORS)
+
+SUMMARY_METRICS = (
+    "Max Altitude",
+    "Max Velocity",
+    "Max Drag Force",
+    "Core Burnout",
+    "SRB Burnout",
+    "Interim Burnout",
+    "Exploration Burnout",
+)
+
+
+def stage_settings(overrides=None):
+    # Copies of the settings.py stage dictionaries with "<name>.<key>" overrides applied
+    settings = {name: dict(values) for name, values in STAGE_SETTINGS.items()}
+    for parameter, value in (overrides or {}).items():
+        name, _, key = parameter.partition(".")
+        if name not in settings or key not in settings[name]:
+            raise ValueError(f"Unknown stage parameter {parameter}")
+        settings[name][key] = value
+    return settings
+
+
+def build_stage(settings):
+    # Stages may name their own drag curve file, otherwise the rocket's curve is used
+    drag_curve = None
+    if settings.get("Drag Curve"):
+        drag_curve = load_drag_curve(settings["Drag Curve"])
+    return Stage(
+        dry_mass=settings["Dry Mass"],
+        prop_mass=settings["Propellant Mass"],
+        mass_flow=settings["Mass Flow"],
+        exhaust_v=settings["Exhaust Velocity"],
+        ref_area=settings["Reference Area"],
+        drag_curve=drag_curve,
+    )
+
+
+def sls_vehicle(settings=None):
+    # Vehicle definition, as xrocket.vehicle.load_vehicle returns them, of the settings.py
+    # stages or of settings from stage_settings
+    settings = settings or stage_settings()
+    return {
+        "name": "SLS",
+        "pitch": 90,
+        "drag_curve": None,
+        "stages": dict(zip(SLS_STAGE_NAMES, settings.values())),
+        "phases": [dict(phase) for phase in SLS_PHASES],
+    }
+
+
+def build_vehicle(vehicle, kernel="reference", gravity_model=None):
+    # Rocket flying a vehicle definition from xrocket.vehicle.load_vehicle, see
+    # ROCKET_KERNELS. gravity_model is one of xrocket.gravity, point mass Earth by default
+    drag_curve = load_drag_curve(vehicle["drag_curve"]) if vehicle.get("drag_curve") else None
+    return ROCKET_KERNELS[kernel](
+        stages=[build_stage(settings) for settings in vehicle["stages"].values()],
+        earth_mass=EARTH_MASS,
+        earth_radius=EARTH_RADIUS,
+        drag_curve=drag_curve,
+        staging=compile_vehicle(vehicle),
+        gravity_model=gravity_model,
+    )
+
+
+def build_rocket(overrides=None, kernel="reference", gravity_model=None):
+    # Rocket built from settings.py, see stage_settings for overrides and build_vehicle
+    return build_vehicle(sls_vehicle(stage_settings(overrides)), kernel, gravity_model)
+
+
+def simulate(
+    rocket,
+    t_end,
+    dt=0.01,
+    integrator="euler",
+    rtol=1e-6,
+    atol=1e-3,
+    callback=None,
+    instrumentation=None,
+    stop=None,
+    coast=False,
+):
+    # Fly the rocket up to t_end. euler steps Rocket.update every dt, any other method
+    # goes through xrocket.integrators. callback(t, rocket) runs after every step.
+    # stop is a list of (name, value) stop conditions from xrocket.termination, the flight
+    # ends after the first step one of them holds for. Returns the reason the flight ended.
+    # With coast, unpowered arcs above the atmosphere are flown in closed form, see
+    # xrocket.coast, with callback still called every dt.
+    # Given an xrocket.instrumentation.Instrumentation, the run is timed phase by phase
+    if instrumentation is not None:
+        instrumentation.attach(rocket)
+        callback = instrumentation.timed_callback(callback)
+        start = instrumentation.clock()
+        try:
+            return simulate(
+                rocket,
+                t_end,
+                dt=dt,
+                integrator=integrator,
+                rtol=rtol,
+                atol=atol,
+                callback=callback,
+                stop=stop,
+                coast=coast,
+            )
+        finally:
+            instrumentation.wall_time += instrumentation.clock() - start
+            instrumentation.detach(rocket)
+
+    check = stop_check(stop)
+    if integrator != "euler":
+        reason = integrate(
+            rocket,
+            t_end,
+            method=integrator,
+            dt=dt,
+            rtol=rtol,
+            atol=atol,
+            callback=callback,
+            stop=check,
+            coast=coast,
+        )["reason"]
+    else:
+        reason = None
+        # Loop over rocket.update and its related methods while the rocket still has fuel
+        t = rocket.time
+        debug = LOG.isEnabledFor(logging.DEBUG)
+        while t < t_end:
+            if coast and coasting(rocket):
+                if rocket.staging_schedule is None:
+                    rocket.staging_schedule = rocket.plan_staging()
+                t, reason = fly_coast(rocket, t_end, dt, callback, check)
+                if reason is not None or t >= t_end:
+                    break
+            t += dt
+            if debug:
+                LOG.debug(f"Time is {t} seconds")
+            rocket.update(dt)
+            if callback is not None:
+                callback(t, rocket)
+            if check is not None:
+                reason = check(t, rocket)
+                if reason is not None:
+                    break
+
+    if reason is None:
+        return TIME_LIMIT
+    LOG.info(f"Flight stopped at {rocket.time} seconds, {reason}")
+    return reason
+
+
+def _empty_summary(stage_names=STAGE_LABELS):
+    # SUMMARY_METRICS for the SLS stages
+    summary = {"Max Altitude": -math.inf, "Max Velocity": -math.inf, "Max Drag Force": 0}
+    summary.update(dict.fromkeys([f"{name} Burnout" for name in stage_names], math.nan))
+    return summary
+
+
+def _fly_summary(
+    rocket,
+    summary,
+    t_end,
+    dt,
+    integrator,
+    rtol,
+    atol,
+    stop=None,
+    coast=False,
+    callback=None,
+):
+    # Fly the rocket up to t_end, adding its burnouts and maxima to summary, and return the
+    # summary and the reason the flight ended. callback(t, rocket) also runs every step.
+    # Burnouts are named after the stages of the rocket's staging table
+    stage_names = rocket.staging.stage_names
+    if rocket.staging_schedule is None:
+        rocket.staging_schedule = rocket.plan_staging()
+    for event_time, index in rocket.staging_schedule:
+        if index is not None and event_time <= t_end:
+            summary[f"{stage_names[index]} Burnout"] = event_time
+
+    def track(t, rocket):
+        summary["Max Altitude"] = max(summary["Max Altitude"], rocket.pos[1])
+        summary["Max Velocity"] = max(summary["Max Velocity"], rocket.rocket_velocity)
+        summary["Max Drag Force"] = max(summary["Max Drag Force"], abs(rocket.drag_force))
+        if callback is not None:
+            callback(t, rocket)
+
+    reason = simulate(
+        rocket,
+        t_end,
+        dt=dt,
+        integrator=integrator,
+        rtol=rtol,
+        atol=atol,
+        callback=track,
+        stop=stop,
+        coast=coast,
+    )
+    # Burnouts planned after the flight stopped never happened
+    for event_time, index in rocket.staging_schedule:
+        if index is not None and event_time > rocket.time:
+            summary[f"{stage_names[index]} Burnout"] = math.nan
+    return {metric: float(value) for metric, value in summary.items()}, reason
+
+
+def flight_summary(
+    rocket,
+    t_end,
+    dt=0.01,
+    integrator="euler",
+    rtol=1e-6,
+    atol=1e-3,
+    stop=None,
+    coast=False,
+    callback=None,
+):
+    # Fly a rocket from the start up to t_end and return its summary metrics, keyed as
+    # SUMMARY_METRICS with a burnout per stage of its vehicle, and the reason the flight
+    # ended. callback(t, rocket) runs after every step
+    summary = _empty_summary(rocket.staging.stage_names)
+    return _fly_summary(
+        rocket, summary, t_end, dt, integrator, rtol, atol, stop, coast, callback
+    )
+
+
+def run_summary(
+    overrides,
+    t_end,
+    dt=0.01,
+    integrator="euler",
+    rtol=1e-6,
+    atol=1e-3,
+    checkpoint=None,
+    stop=None,
+    coast=False,
+):
+    # Summary metrics of one flight, keyed as SUMMARY_METRICS. Given a checkpoint from
+    # summary_checkpoint the flight starts from there with the overrides applied in flight
+    if checkpoint is None:
+        rocket = build_rocket(overrides)
+        summary = _empty_summary()
+    else:
+        rocket = build_rocket()
+        rocket.restore(checkpoint["state"])
+        override_rocket(rocket, overrides)
+        summary = dict(checkpoint["summary"])
+    summary, _ = _fly_summary(rocket, summary, t_end, dt, integrator, rtol, atol, stop, coast)
+    return summary
+
+
+def summary_checkpoint(
+    t_fork, dt=0.01, integrator="euler", rtol=1e-6, atol=1e-3, coast=False
+):
+    # Fly the part every run of a sweep shares once: the snapshot at t_fork and the summary
+    # metrics up to then, for run_summary to fork from, and the "<name>.<key>" parameters
+    # that flight depended on, which no fork can change any more (see fork_conflicts)
+    rocket = build_rocket()
+    phases = {rocket.phase}
+
+    def track(t, rocket):
+        phases.add(rocket.phase)
+
+    summary, _ = _fly_summary(
+        rocket, _empty_summary(), t_fork, dt, integrator, rtol, atol, coast=coast, callback=track
+    )
+
+    # Every stage rides along from launch so its masses count from the start, engines count
+    # once they burnt propellant, areas and drag curves in the phases flown
+    names = list(STAGE_SETTINGS)
+    staging = rocket.staging
+    fixed = {f"{name}.{key}" for name in names for key in ("Dry Mass", "Propellant Mass")}
+    for index, name in enumerate(names):
+        if rocket.stages.prop_mass[index] < STAGE_SETTINGS[name]["Propellant Mass"]:
+            fixed.update(f"{name}.{key}" for key in ("Mass Flow", "Exhaust Velocity"))
+    for phase in phases:
+        first, added, subtracted = staging.area_terms[phase]
+        fixed.update(f"{names[index]}.Reference Area" for index in (first,) + added + subtracted)
+        fixed.add(f"{names[staging.leading[phase]]}.Drag Curve")
+    return {"state": rocket.snapshot(), "summary": summary, "fixed": sorted(fixed)}
+
+
+def fork_conflicts(checkpoint, overrides):
+    # The overrides a branch forked from a summary_checkpoint cannot apply, because the
+    # flight up to the fork already depended on them
+    return sorted(parameter for parameter in overrides if parameter in checkpoint["fixed"])
+
+
+def override_rocket(rocket, overrides):
+    # Change stage parameters of a rocket in flight, e.g. of a branch forked from a
+    # checkpoint, with the "<name>.<key>" overrides of stage_settings. Detached stages keep
+    # no dry mass or reference area and idle stages no mass flow, as when flown from the
+    # start, and the staging ahead is planned again
+    if not overrides:
+        return
+    stage_settings(overrides)
+    stages = rocket.stages
+    for parameter, value in overrides.items():
+        name, _, key = parameter.partition(".")
+        if key == "Drag Curve":
+            value = load_drag_curve(value) if value else None
+        getattr(stages, SETTING_FIELDS[key])[list(STAGE_SETTINGS).index(name)] = value
+    stages.check_firing()
+    stages.check_attachment()
+    for index in range(len(stages)):
+        stages.total_mass[index] = max(stages.prop_mass[index] + stages.dry_mass[index], 0.0)
+    stages.calc_thrust()
+    rocket.invalidate()
+    rocket.staging_schedule = None
+
+
+def save_checkpoint(snapshot, path):
+    # Rocket.snapshot as a JSON file
+    with open(path, "w") as checkpoint_file:
+        json.dump(snapshot, checkpoint_file)
+
+
+def load_checkpoint(path):
+    with open(path) as checkpoint_file:
+        return json.load(checkpoint_file)
@@ -1,57 +1,175 @@
-from xrocket.gravity import gravity_acceleration_calc
-from xrocket.settings import *
+# Quantities of a stage, StageSet holds each of them as one list with an entry per stage
+STAGE_FIELDS = (
+    "dry_mass",
+    "prop_mass",
+    "total_mass",
+    "mass_flow",
+    "mass_flow_copy",
+    "exhaust_velocity",
+    "exhaust_velocity_copy",
+    "reference_area",
+    "drag_curve",
+    "thrust",
+    "firing",
+    "attached",
+)
 
 
-class Stage:
-    def __init__(self, dry_mass, prop_mass, mass_flow, exhaust_v, ref_area):
+class StageSet:
+    # Every stage of a rocket as one list per quantity, entry i of each list belongs to the
+    # i-th stage, so all stages update in one pass rather than four rounds of Stage method
+    # calls. Plain lists rather than arrays, with four stages numpy costs more per call than
+    # it saves. Stage objects are views of one entry
+    __slots__ = STAGE_FIELDS + ("instrumentation",)
 
-        self.dry_mass = dry_mass
-        self.prop_mass = prop_mass
-        self.total_mass = dry_mass + prop_mass
+    def __init__(self, stages=()):
+        for field in STAGE_FIELDS:
+            setattr(self, field, [])
+        # xrocket.instrumentation.Instrumentation timing update, None when not profiling
+        self.instrumentation = None
+        for stage in stages:
+            self.adopt(stage)
 
-        self.mass_flow = mass_flow
-        self.mass_flow_copy = mass_flow
-        self.exhaust_velocity = exhaust_v
-        self.exhaust_velocity_copy = exhaust_v
-        self.reference_area = ref_area
-        self.thrust = 0
+    def __len__(self):
+        return len(self.prop_mass)
 
-        self.firing = True
-        self.attached = True
+    def append(self, values):
+        # Add a stage from a dictionary of STAGE_FIELDS and return its index
+        for field in STAGE_FIELDS:
+            getattr(self, field).append(values[field])
+        return len(self) - 1
 
-    def calc_mass(self, dt):
+    def adopt(self, stage):
+        # Move a Stage, and whatever state it has, into this set. The Stage object stays
+        # valid and from then on reads and writes its entry here
+        index = self.append({field: getattr(stage, field) for field in STAGE_FIELDS})
+        stage._stages = self
+        stage._index = index
+
+    def copy(self):
+        # Independent StageSet with the same values, drag curves are shared
+        stages = StageSet()
+        for field in STAGE_FIELDS:
+            setattr(stages, field, list(getattr(self, field)))
+        return stages
+
+    def view(self, index):
+        # Stage reading and writing entry index of this set
+        stage = Stage.__new__(Stage)
+        stage._stages = self
+        stage._index = index
+        return stage
+
+    def _indices(self, indices):
+        return range(len(self)) if indices is None else indices
+
+    def calc_mass(self, dt, indices=None):
         # Update propellant mass and total mass per delta time
-        self.prop_mass = self.prop_mass + self.mass_flow * dt
-        self.prop_mass = max(self.prop_mass, 0.0)
-        self.total_mass = self.prop_mass + self.dry_mass
-        self.total_mass = max(self.total_mass, 0.0)
+        for i in self._indices(indices):
+            self.prop_mass[i] = max(self.prop_mass[i] + self.mass_flow[i] * dt, 0.0)
+            self.total_mass[i] = max(self.prop_mass[i] + self.dry_mass[i], 0.0)
 
-    def check_firing(self):
+    def check_firing(self, indices=None):
         # Since later stage firings are set to False at outset, need a backup value to repeg to once they begin firing
-        # TODO find a better method of solving this logic
-        if self.firing == True:
-            self.mass_flow = self.mass_flow_copy
-            self.exhaust_velocity = self.exhaust_velocity_copy
-        else:
-            self.mass_flow = 0
-            self.exhaust_velocity = 0
+        for i in self._indices(indices):
+            if self.firing[i]:
+                self.mass_flow[i] = self.mass_flow_copy[i]
+                self.exhaust_velocity[i] = self.exhaust_velocity_copy[i]
+            else:
+                self.mass_flow[i] = 0
+                self.exhaust_velocity[i] = 0
 
-    def check_attachment(self):
-        if self.attached == True:
-            self.dry_mass = self.dry_mass
-            self.reference_area = self.reference_area
-        else:
-            self.dry_mass = 0
-            self.reference_area = 0
+    def check_attachment(self, indices=None):
+        for i in self._indices(indices):
+            if not self.attached[i]:
+                self.dry_mass[i] = 0
+                self.reference_area[i] = 0
 
-    def calc_thrust(self):
+    def calc_thrust(self, indices=None):
         # Calculate Thrust using velocity => T = v * (dm)
-        self.thrust = (
-            self.exhaust_velocity * self.mass_flow if self.prop_mass > 0 else 0
+        for i in self._indices(indices):
+            self.thrust[i] = (
+                self.exhaust_velocity[i] * self.mass_flow[i] if self.prop_mass[i] > 0 else 0
+            )
+
+    def update(self, dt, indices=None):
+        # calc_mass, check_firing, check_attachment and calc_thrust of every stage, or of
+        # the stages at indices, in a single loop
+        if self.instrumentation is not None:
+            start = self.instrumentation.clock()
+        dry_mass = self.dry_mass
+        prop_mass = self.prop_mass
+        total_mass = self.total_mass
+        mass_flow = self.mass_flow
+        exhaust_velocity = self.exhaust_velocity
+        for i in self._indices(indices):
+            prop = max(prop_mass[i] + mass_flow[i] * dt, 0.0)
+            prop_mass[i] = prop
+            total_mass[i] = max(prop + dry_mass[i], 0.0)
+            if self.firing[i]:
+                mass_flow[i] = self.mass_flow_copy[i]
+                exhaust_velocity[i] = self.exhaust_velocity_copy[i]
+            else:
+                mass_flow[i] = 0
+                exhaust_velocity[i] = 0
+            if not self.attached[i]:
+                dry_mass[i] = 0
+                self.reference_area[i] = 0
+            self.thrust[i] = exhaust_velocity[i] * mass_flow[i] if prop > 0 else 0
+        if self.instrumentation is not None:
+            self.instrumentation.lap("stage_update", start)
+
+
+def _stage_field(field):
+    def get(self):
+        return getattr(self._stages, field)[self._index]
+
+    def set(self, value):
+        getattr(self._stages, field)[self._index] = value
+
+    return property(get, set)
+
+
+class Stage:
+    # One stage of a StageSet. A new Stage starts in a StageSet of its own until a Rocket
+    # adopts it into the rocket's set, its attributes always read and write that set
+    __slots__ = ("_stages", "_index")
+
+    def __init__(self, dry_mass, prop_mass, mass_flow, exhaust_v, ref_area, drag_curve=None):
+        self._stages = StageSet()
+        self._index = self._stages.append(
+            {
+                "dry_mass": dry_mass,
+                "prop_mass": prop_mass,
+                "total_mass": dry_mass + prop_mass,
+                "mass_flow": mass_flow,
+                "mass_flow_copy": mass_flow,
+                "exhaust_velocity": exhaust_v,
+                "exhaust_velocity_copy": exhaust_v,
+                "reference_area": ref_area,
+                # xrocket.drag.DragCurve while this stage leads the rocket, None for the rocket's own
+                "drag_curve": drag_curve,
+                "thrust": 0,
+                "firing": True,
+                "attached": True,
+            }
         )
 
+    def calc_mass(self, dt):
+        self._stages.calc_mass(dt, (self._index,))
+
+    def check_firing(self):
+        self._stages.check_firing((self._index,))
+
+    def check_attachment(self):
+        self._stages.check_attachment((self._index,))
+
+    def calc_thrust(self):
+        self._stages.calc_thrust((self._index,))
+
     def update(self, dt):
-        self.calc_mass(dt)
-        self.check_firing()
-        self.check_attachment()
-        self.calc_thrust()
+        self._stages.update(dt, (self._index,))
+
+
+for _field in STAGE_FIELDS:
+    setattr(Stage, _field, _stage_field(_field))
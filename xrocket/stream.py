@@ -0,0 +1,264 @@
+import asyncio
+import functools
+import json
+import logging
+import struct
+import time
+
+from xrocket.simulation import simulate
+from xrocket.telemetry import CHANNELS, telemetry_row
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Batches of frames a client may have waiting before its oldest batch is dropped
+CLIENT_QUEUE_SIZE = 64
+# Steps the simulation hands to the event loop at once, paced runs hand them over sooner
+BATCH_STEPS = 256
+# Seconds clients get to receive the rest of the stream once the flight is over
+FINISH_TIMEOUT = 5.0
+
+# Every message is a type byte followed by its payload, little endian:
+#   HEADER  channel count (uint16), then per channel its name length (uint8) and UTF-8 name
+#   FRAME   Time (float64), then every other channel in CHANNELS order (float32)
+#   END     reason length (uint16) and the UTF-8 reason the flight ended
+# The server sends HEADER on connect, then FRAMEs and finally END. Clients may send JSON
+# lines at any time to change their subscription, {"interval": SECONDS} sends at most one
+# frame per SECONDS of flight time
+HEADER = b"H"
+FRAME = b"F"
+END = b"E"
+
+FRAME_STRUCT = struct.Struct("<cd" + "f" * (len(CHANNELS) - 1))
+_COUNT_STRUCT = struct.Struct("<H")
+
+
+def encode_header(channels=CHANNELS):
+    names = [channel.encode() for channel in channels]
+    return (
+        HEADER
+        + _COUNT_STRUCT.pack(len(names))
+        + b"".join(bytes([len(name)]) + name for name in names)
+    )
+
+
+def encode_frame(row):
+    # Telemetry row in CHANNELS order, see xrocket.telemetry.telemetry_row
+    return FRAME_STRUCT.pack(FRAME, *row)
+
+
+def encode_end(reason):
+    reason = reason.encode()
+    return END + _COUNT_STRUCT.pack(len(reason)) + reason
+
+
+async def read_messages(reader):
+    # Messages from a server as ("header", channel names), ("frame", row) and finally
+    # ("end", reason), for clients built on an asyncio StreamReader
+    while True:
+        try:
+            kind = await reader.readexactly(1)
+        except asyncio.IncompleteReadError:
+            return
+        if kind == FRAME:
+            payload = await reader.readexactly(FRAME_STRUCT.size - 1)
+            yield "frame", FRAME_STRUCT.unpack(kind + payload)[1:]
+        elif kind == HEADER:
+            (count,) = _COUNT_STRUCT.unpack(await reader.readexactly(_COUNT_STRUCT.size))
+            channels = []
+            for _ in range(count):
+                length = (await reader.readexactly(1))[0]
+                channels.append((await reader.readexactly(length)).decode())
+            yield "header", channels
+        elif kind == END:
+            (length,) = _COUNT_STRUCT.unpack(await reader.readexactly(_COUNT_STRUCT.size))
+            yield "end", (await reader.readexactly(length)).decode()
+            return
+        else:
+            raise ValueError(f"Unknown message type {kind!r}")
+
+
+class _Client:
+    def __init__(self, writer, queue_size):
+        self.writer = writer
+        self.peer = writer.get_extra_info("peername")
+        # Batches of encoded frames and the number of frames in each, None for END
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.interval = 0.0
+        self.next_time = -float("inf")
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, item, frames):
+        # Queue without ever waiting: a full queue loses its oldest batch instead
+        if self.queue.full():
+            _, lost = self.queue.get_nowait()
+            self.dropped += lost
+        self.queue.put_nowait((item, frames))
+
+
+class TelemetryServer:
+    # TCP server publishing telemetry frames to every connected client. Each client has its
+    # own decimation interval and a bounded queue that drops its oldest frames once the
+    # client falls behind, so neither a slow client nor a vanished one holds up the
+    # simulation or the other clients
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, queue_size=CLIENT_QUEUE_SIZE):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.clients = set()
+        self._tasks = set()
+        self._server = None
+        self._connected = None
+
+    async def start(self):
+        self._connected = asyncio.Condition()
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        # The port actually bound, e.g. when asked for port 0
+        self.port = self._server.sockets[0].getsockname()[1]
+        LOG.info(f"Telemetry server listening on {self.host}:{self.port}")
+
+    async def wait_for_clients(self, count):
+        async with self._connected:
+            await self._connected.wait_for(lambda: len(self.clients) >= count)
+
+    async def _serve(self, reader, writer):
+        client = _Client(writer, self.queue_size)
+        self.clients.add(client)
+        self._tasks.add(asyncio.current_task())
+        async with self._connected:
+            self._connected.notify_all()
+        LOG.info(f"Client {client.peer} connected")
+        subscription = asyncio.ensure_future(self._subscribe(reader, client))
+        try:
+            writer.write(encode_header())
+            while True:
+                item, frames = await client.queue.get()
+                writer.write(item)
+                await writer.drain()
+                if frames is None:
+                    break
+                client.sent += frames
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            subscription.cancel()
+            self.clients.discard(client)
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+            LOG.info(
+                f"Client {client.peer} left, {client.sent} frames sent, "
+                f"{client.dropped} dropped"
+            )
+
+    async def _subscribe(self, reader, client):
+        # JSON lines from the client, e.g. {"interval": 0.1}
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                client.interval = float(json.loads(line).get("interval", 0.0))
+            except (ValueError, AttributeError):
+                LOG.warning(f"Ignored subscription {line!r} from {client.peer}")
+
+    def publish(self, frames):
+        # Hand a batch of (time, encoded frame) to every client, decimated to its interval
+        for client in self.clients:
+            if not client.interval:
+                selected = [frame for _, frame in frames]
+            else:
+                selected = []
+                for t, frame in frames:
+                    # Frames are due on a grid of the interval, slack for the step sums
+                    if t + 1e-9 >= client.next_time:
+                        selected.append(frame)
+                        client.next_time += client.interval
+                        if client.next_time <= t:
+                            client.next_time = t + client.interval
+            if selected:
+                client.offer(b"".join(selected), len(selected))
+
+    async def finish(self, reason, timeout=FINISH_TIMEOUT):
+        # Send END to every client, give them timeout seconds to receive what they have
+        # queued and stop the server
+        end = encode_end(reason)
+        for client in self.clients:
+            client.offer(end, None)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        for task in list(self._tasks):
+            task.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+
+class _Publisher:
+    # Simulation callback, run in the simulation thread. Encodes every step and hands the
+    # frames to the event loop in batches. In real time, each step waits until the wall
+    # clock catches up with its flight time divided by speed
+    def __init__(self, loop, server, realtime=False, speed=1.0, batch_steps=BATCH_STEPS):
+        self.loop = loop
+        self.server = server
+        self.realtime = realtime
+        self.speed = speed
+        self.batch_steps = batch_steps
+        self.batch = []
+        self.start = None
+
+    def __call__(self, t, rocket):
+        self.batch.append(
+            (
+                t,
+                encode_frame(
+                    telemetry_row(
+                        t,
+                        rocket,
+                        rocket.core_stage,
+                        rocket.srb_stage,
+                        rocket.interim_stage,
+                        rocket.exploration_stage,
+                    )
+                ),
+            )
+        )
+        if self.realtime:
+            now = time.perf_counter()
+            if self.start is None:
+                self.start = (t, now)
+            ahead = self.start[1] + (t - self.start[0]) / self.speed - now
+            if ahead > 0:
+                self.flush()
+                time.sleep(ahead)
+        if len(self.batch) >= self.batch_steps:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            self.loop.call_soon_threadsafe(self.server.publish, self.batch)
+            self.batch = []
+
+
+async def stream_flight(
+    rocket,
+    t_end,
+    server,
+    realtime=False,
+    speed=1.0,
+    batch_steps=BATCH_STEPS,
+    **options,
+):
+    # Fly the rocket with simulate (options are passed on, e.g. dt or stop) in a worker
+    # thread, publishing every step on a started TelemetryServer, then end the stream.
+    # Returns the reason the flight ended
+    loop = asyncio.get_event_loop()
+    publisher = _Publisher(loop, server, realtime, speed, batch_steps)
+    reason = await loop.run_in_executor(
+        None, functools.partial(simulate, rocket, t_end, callback=publisher, **options)
+    )
+    publisher.flush()
+    # Let the last batch reach the clients before END
+    await asyncio.sleep(0)
+    await server.finish(reason)
+    return reason
@@ -0,0 +1,187 @@
+import csv
+import itertools
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from xrocket.cache import scenario_key
+from xrocket.simulation import (
+    SUMMARY_METRICS,
+    fork_conflicts,
+    run_summary,
+    stage_settings,
+    summary_checkpoint,
+)
+
+LOG = logging.getLogger(__name__)
+
+# Distributions a sample spec can draw a parameter from, with their arguments
+DISTRIBUTIONS = {
+    "uniform": lambda rng, low, high, size: rng.uniform(low, high, size),
+    "normal": lambda rng, mean, std, size: rng.normal(mean, std, size),
+    "choice": lambda rng, values, size: rng.choice(values, size),
+}
+
+
+def expand_spec(spec):
+    # Runs described by a sweep spec as a list of parameter override dictionaries.
+    # A grid spec runs every combination of the listed values:
+    #     {"grid": {"CORE_STAGE.Mass Flow": [-2000, -2060], "SOLID_ROCKET_BOOSTERS.Dry Mass": [...]}}
+    # A sample spec draws "samples" runs, repeatable through "seed":
+    #     {"samples": 100, "seed": 1, "parameters": {"CORE_STAGE.Mass Flow": {"normal": [-2060, 20]}}}
+    if "grid" in spec:
+        parameters = list(spec["grid"])
+        runs = [
+            dict(zip(parameters, values))
+            for values in itertools.product(*spec["grid"].values())
+        ]
+    elif "samples" in spec:
+        rng = np.random.default_rng(spec.get("seed"))
+        samples = spec["samples"]
+        columns = {}
+        for parameter, distribution in spec["parameters"].items():
+            name, arguments = next(iter(distribution.items()))
+            if name not in DISTRIBUTIONS:
+                raise ValueError(f"Unknown distribution {name} for {parameter}")
+            columns[parameter] = DISTRIBUTIONS[name](rng, *arguments, samples).tolist()
+        runs = [
+            {parameter: values[index] for parameter, values in columns.items()}
+            for index in range(samples)
+        ]
+    else:
+        raise ValueError('A sweep spec needs either "grid" or "samples"')
+
+    # Fail on a misspelled parameter before any process starts
+    for run in runs[:1]:
+        stage_settings(run)
+    return runs
+
+
+def load_spec(path):
+    with open(path) as spec_file:
+        return json.load(spec_file)
+
+
+def completed_runs(results_path):
+    # Run numbers already in a results table, a resumed sweep skips them
+    if not os.path.exists(results_path):
+        return set()
+    with open(results_path, newline="") as results_file:
+        return {int(row["Run"]) for row in csv.DictReader(results_file)}
+
+
+def fork_checkpoint(runs, fork_at, dt=0.01, integrator="euler", rtol=1e-6, atol=1e-3, coast=False):
+    # summary_checkpoint at fork_at for the runs of a sweep to fork from. Raises ValueError
+    # when a run changes a parameter the shared flight up to fork_at already depended on
+    checkpoint = summary_checkpoint(fork_at, dt, integrator, rtol, atol, coast)
+    conflicts = sorted({parameter for run in runs for parameter in fork_conflicts(checkpoint, run)})
+    if conflicts:
+        raise ValueError(
+            f"{', '.join(conflicts)} already shaped the flight up to {fork_at} seconds, "
+            "sweep them without forking or fork earlier"
+        )
+    return checkpoint
+
+
+def run_sweep(
+    runs,
+    results_path,
+    t_end,
+    dt=0.01,
+    integrator="euler",
+    rtol=1e-6,
+    atol=1e-3,
+    workers=None,
+    progress=None,
+    fork_at=None,
+    cache=None,
+    stop=None,
+    coast=False,
+    checkpoint=None,
+):
+    # Fly every run over a process pool and append one row per finished run to the CSV
+    # table at results_path: run number, parameters and SUMMARY_METRICS. Rows are written
+    # as runs finish, so an interrupted sweep resumes from the runs it has not finished.
+    # progress(done, total) is called after every finished run.
+    # Given fork_at, the flight up to fork_at seconds is flown once and every run forks
+    # from there, with its parameters changed in flight at fork_at. checkpoint is that
+    # flight's fork_checkpoint when already flown, runs changing anything it depended on
+    # raise ValueError before any run starts.
+    # Given an xrocket.cache.ResultsCache, runs found in it are not flown again. stop holds
+    # the stop conditions of every run, see xrocket.termination, and coast flies their
+    # arcs above the atmosphere in closed form, see xrocket.coast
+    if fork_at is not None and checkpoint is None:
+        checkpoint = fork_checkpoint(runs, fork_at, dt, integrator, rtol, atol, coast)
+        LOG.info(f"Runs fork from {fork_at} seconds")
+
+    done = completed_runs(results_path)
+    pending = [(index, run) for index, run in enumerate(runs) if index not in done]
+    if done:
+        LOG.info(f"Resuming sweep, {len(done)} of {len(runs)} runs already done")
+
+    keys = {}
+    cached = {}
+    if cache is not None:
+        for index, run in pending:
+            keys[index] = scenario_key(
+                run,
+                t_end,
+                dt,
+                integrator,
+                rtol,
+                atol,
+                start=fork_at,
+                stop=stop,
+                coast=coast,
+            )
+            summary = cache.get_summary(keys[index])
+            if summary is not None:
+                cached[index] = summary
+        pending = [(index, run) for index, run in pending if index not in cached]
+        LOG.info(f"{len(cached)} runs found in the cache")
+
+    parameters = sorted({parameter for run in runs for parameter in run})
+    fieldnames = ["Run"] + parameters + list(SUMMARY_METRICS)
+    new_file = not os.path.exists(results_path)
+    with open(results_path, "a", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=fieldnames)
+        if new_file:
+            writer.writeheader()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    run_summary,
+                    run,
+                    t_end,
+                    dt,
+                    integrator,
+                    rtol,
+                    atol,
+                    checkpoint,
+                    stop,
+                    coast,
+                ): (index, run)
+                for index, run in pending
+            }
+            finished = len(done)
+            for index, summary in cached.items():
+                writer.writerow({"Run": index, **runs[index], **summary})
+                finished += 1
+            results_file.flush()
+            if cached and progress is not None:
+                progress(finished, len(runs))
+            for future in as_completed(futures):
+                index, run = futures[future]
+                summary = future.result()
+                if cache is not None:
+                    cache.put_summary(keys[index], summary)
+                writer.writerow({"Run": index, **run, **summary})
+                results_file.flush()
+                finished += 1
+                if progress is not None:
+                    progress(finished, len(runs))
+    if cache is not None:
+        cache.evict()
@@ -0,0 +1,188 @@
+import csv
+import os
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+
+# Telemetry channels in output order, the keys of create_rocket_dict and TelemetryRecorder
+CHANNELS = (
+    "Time",
+    "Altitude",
+    "X Position",
+    "Velocity",
+    "Acceleration",
+    "Thrust",
+    "Weight",
+    "Gravity Acceleration",
+    "Drag Force",
+    "Resultant Force",
+    "Mach Speed",
+    "Air Density",
+    "Reference Area",
+    "Current Total Mass",
+    "Total Fuel Remaining",
+    "Core Fuel Remaining",
+    "SRB Fuel Remaining",
+    "Interim Fuel Remaining",
+    "Exploration Fuel Remaining",
+)
+
+TELEMETRY_DTYPE = np.dtype([(channel, np.float64) for channel in CHANNELS])
+
+# Rows added every time a recorder runs out of room, or written out at once when streaming
+GROWTH_CHUNK = 65536
+
+# Every .npy header written by NpyTelemetryWriter takes exactly this many bytes, so it
+# can be rewritten in place with the final row count once the run is over
+NPY_HEADER_SIZE = 128
+
+
+def telemetry_row(t, rocket, core_stage, srb_stage, interim_stage, exploration_stage):
+    # Values of every channel at time t, in CHANNELS order
+    return (
+        t,
+        rocket.pos[1],
+        rocket.pos[0],
+        rocket.rocket_velocity,
+        rocket.rocket_acceleration,
+        rocket.thrust,
+        rocket.weight,
+        rocket.gravity,
+        rocket.drag_force,
+        rocket.resultant_force,
+        rocket.mach_speed,
+        rocket.air_density,
+        rocket.reference_area,
+        rocket.total_mass,
+        rocket.total_propellant_mass,
+        core_stage.prop_mass,
+        srb_stage.prop_mass,
+        interim_stage.prop_mass,
+        exploration_stage.prop_mass,
+    )
+
+
+class CSVTelemetryWriter:
+    # Appends telemetry rows to a CSV file with one column per channel
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(CHANNELS)
+
+    def write(self, rows):
+        self._writer.writerows(rows.tolist())
+
+    def close(self):
+        self._file.close()
+
+
+def _npy_header(length):
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': (%d,), }" % length
+    header = header.ljust(NPY_HEADER_SIZE - 11) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class NpyTelemetryWriter:
+    # Appends telemetry to one float64 .npy file per channel inside the directory at path,
+    # e.g. "Altitude.npy". The headers hold the row count, so they are rewritten on close
+    def __init__(self, path):
+        self.path = path
+        self.length = 0
+        os.makedirs(path, exist_ok=True)
+        self._files = {}
+        for channel in CHANNELS:
+            channel_file = open(os.path.join(path, f"{channel}.npy"), "wb")
+            channel_file.write(_npy_header(0))
+            self._files[channel] = channel_file
+
+    def write(self, rows):
+        for channel, channel_file in self._files.items():
+            rows[channel].astype("<f8").tofile(channel_file)
+        self.length += len(rows)
+
+    def close(self):
+        for channel_file in self._files.values():
+            channel_file.seek(0)
+            channel_file.write(_npy_header(self.length))
+            channel_file.close()
+
+
+TELEMETRY_WRITERS = {"csv": CSVTelemetryWriter, "npy": NpyTelemetryWriter}
+
+
+def load_telemetry(path):
+    # Read back telemetry written by either writer as a dictionary of channel arrays,
+    # .npy channels are memory mapped rather than read in full
+    if os.path.isdir(path):
+        return {
+            channel: np.load(os.path.join(path, f"{channel}.npy"), mmap_mode="r")
+            for channel in CHANNELS
+        }
+    with open(path, newline="") as telemetry_file:
+        header = next(csv.reader(telemetry_file))
+        values = np.loadtxt(telemetry_file, delimiter=",", ndmin=2)
+    return {channel: values[:, index] for index, channel in enumerate(header)}
+
+
+class TelemetryRecorder(Mapping):
+    # Preallocated structured array of telemetry, one row per recorded step. Reads like the
+    # dictionary from create_rocket_dict: recorder["Altitude"] is the array of every
+    # altitude recorded so far, so csv_output and the plots take either one.
+    # Given a writer, the recorder instead streams its rows out every growth_chunk rows and
+    # only ever holds one chunk, call close() at the end of the run to write the rest
+    def __init__(self, capacity=GROWTH_CHUNK, growth_chunk=GROWTH_CHUNK, writer=None):
+        self.growth_chunk = growth_chunk
+        self.writer = writer
+        if writer is not None:
+            capacity = growth_chunk
+        self._rows = np.empty(max(int(capacity), 1), dtype=TELEMETRY_DTYPE)
+        self._length = 0
+
+    @classmethod
+    def for_run(cls, t_end, dt):
+        # Room for every step of a fixed step run from 0 to t_end
+        return cls(capacity=int(t_end / dt) + 2)
+
+    @property
+    def rows(self):
+        return self._rows[: self._length]
+
+    def record(
+        self, t, rocket, core_stage, srb_stage, interim_stage, exploration_stage
+    ):
+        if self._length == len(self._rows):
+            if self.writer is not None:
+                self.flush()
+            else:
+                self._rows = np.resize(self._rows, len(self._rows) + self.growth_chunk)
+        self._rows[self._length] = telemetry_row(
+            t, rocket, core_stage, srb_stage, interim_stage, exploration_stage
+        )
+        self._length += 1
+
+    def clear(self):
+        self._length = 0
+
+    def flush(self):
+        # Hand the rows recorded so far to the writer and start over
+        if self.writer is not None and self._length:
+            self.writer.write(self.rows)
+            self._length = 0
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+
+    def __getitem__(self, channel):
+        if channel not in TELEMETRY_DTYPE.names:
+            raise KeyError(channel)
+        return self._rows[channel][: self._length]
+
+    def __iter__(self):
+        return iter(CHANNELS)
+
+    def __len__(self):
+        return len(CHANNELS)
@@ -0,0 +1,127 @@
+import math
+from abc import ABC, abstractmethod
+
+from xrocket.atmosphere import ATMOSPHERE_TOP
+
+# Conditions that end a flight before its end time. A flight takes a list of
+# (name, value) pairs, e.g. [("impact", None), ("altitude", 100000)], and stops at the
+# end of the first step any of them holds for. Conditions keep state, so stop_check builds
+# new ones for every flight. The list may also hold StopCondition instances, for conditions
+# a caller sets up itself, a fresh one for every flight
+
+
+class StopCondition(ABC):
+    reason = None
+
+    def __init__(self, value=None):
+        self.value = value
+
+    @abstractmethod
+    def __call__(self, t, rocket):
+        # True once the flight should stop at the end of this step
+        pass
+
+
+class GroundImpact(StopCondition):
+    reason = "ground impact"
+
+    def __call__(self, t, rocket):
+        return rocket.altitude < 0
+
+
+class Apogee(StopCondition):
+    # The first step that ends lower than the step before it
+    reason = "apogee"
+
+    def __init__(self, value=None):
+        super().__init__(value)
+        self.previous = -math.inf
+
+    def __call__(self, t, rocket):
+        altitude = rocket.altitude
+        passed = altitude < self.previous
+        self.previous = altitude
+        return passed
+
+
+class Burnout(StopCondition):
+    # value seconds after every stage has burnt all of its propellant
+    reason = "burnout"
+
+    def __init__(self, value=0):
+        super().__init__(value)
+        self.burnout_time = None
+
+    def __call__(self, t, rocket):
+        if self.burnout_time is None:
+            if rocket.total_propellant_mass > 0:
+                return False
+            self.burnout_time = t
+        return t >= self.burnout_time + self.value
+
+
+class AltitudeReached(StopCondition):
+    reason = "altitude reached"
+
+    def __call__(self, t, rocket):
+        return rocket.altitude >= self.value
+
+
+class VelocityReached(StopCondition):
+    reason = "velocity reached"
+
+    def __call__(self, t, rocket):
+        return rocket.rocket_velocity >= self.value
+
+
+class OrbitInsertion(StopCondition):
+    # Above the atmosphere with a horizontal speed of at least the circular orbit speed
+    # sqrt(GM / r) at that altitude
+    reason = "orbit insertion"
+
+    def __call__(self, t, rocket):
+        altitude = rocket.altitude
+        if altitude <= ATMOSPHERE_TOP:
+            return False
+        horizontal_speed = abs(rocket.rocket_velocity * math.cos(math.radians(rocket.theta)))
+        circular_speed = math.sqrt(rocket.gravity_model.gm / (rocket.earth_radius + altitude))
+        return horizontal_speed >= circular_speed
+
+
+STOP_CONDITIONS = {
+    "impact": GroundImpact,
+    "apogee": Apogee,
+    "burnout": Burnout,
+    "altitude": AltitudeReached,
+    "velocity": VelocityReached,
+    "orbit": OrbitInsertion,
+}
+
+TIME_LIMIT = "time limit"
+
+
+def stop_check(stop):
+    # Function of (t, rocket) returning the reason to stop or None, None if there are no
+    # conditions at all
+    conditions = []
+    for condition in stop or ():
+        if isinstance(condition, StopCondition):
+            conditions.append(condition)
+            continue
+        name, value = condition
+        if name not in STOP_CONDITIONS:
+            raise ValueError(f"Unknown stop condition {name}")
+        if value is None:
+            conditions.append(STOP_CONDITIONS[name]())
+        else:
+            conditions.append(STOP_CONDITIONS[name](value))
+    if not conditions:
+        return None
+
+    def check(t, rocket):
+        for condition in conditions:
+            if condition(t, rocket):
+                return condition.reason
+        return None
+
+    return check
@@ -0,0 +1,244 @@
+import json
+import os
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Vehicle definitions describe a rocket of any number of stages and the phases of its
+# flight, as a TOML or JSON file:
+#
+#     name = "Two stage"
+#     pitch = 90                    # initial pitch in degrees, 90 by default
+#     drag_curve = "drag.csv"       # optional, the artemis curve by default
+#
+#     [[stages]]
+#     name = "Booster"
+#     dry_mass = 20000
+#     propellant_mass = 400000
+#     mass_flow = -2500
+#     exhaust_velocity = -3000
+#     reference_area = 10.5
+#     drag_curve = "booster.csv"    # optional, used while the stage leads the rocket
+#
+#     [[phases]]
+#     name = "Boost"
+#     burning = ["Booster"]         # entered once these stages still have propellant
+#     burnt_out = []                # and these have none
+#     ignite = ["Booster"]          # stages that start firing on entry
+#     shutdown = ["Upper"]          # stages that stop firing on entry
+#     jettison = []                 # stages dropped on entry, they stop firing too
+#     pitch = 90                    # pitch from entry on, kept when left out
+#     leading = "Booster"           # stage whose drag curve applies
+#     reference_area = ["Booster"]  # stages whose areas add up, "-Name" subtracts
+#
+# At every staging event the rocket enters the first phase, in the order listed, whose
+# burning and burnt_out conditions hold, and stays in its phase when none does. Stages
+# start out firing and attached. Files name drag curves relative to themselves
+
+# Keys of a stage in a vehicle file and the settings.py keys they stand for
+STAGE_KEYS = {
+    "dry_mass": "Dry Mass",
+    "propellant_mass": "Propellant Mass",
+    "mass_flow": "Mass Flow",
+    "exhaust_velocity": "Exhaust Velocity",
+    "reference_area": "Reference Area",
+    "drag_curve": "Drag Curve",
+}
+PHASE_KEYS = (
+    "name",
+    "burning",
+    "burnt_out",
+    "ignite",
+    "shutdown",
+    "jettison",
+    "pitch",
+    "leading",
+    "reference_area",
+)
+
+# The transition table holds a phase for every combination of burnt out stages
+MAX_STAGES = 12
+
+# Flight of the SLS stages of settings.py, the sequence Rocket has always flown. The
+# exploration stage fires from the start, and once both the core stage and the boosters
+# are spent the interim phase always matches first, so the exploration phase is never
+# reached
+SLS_STAGE_NAMES = ("Core", "SRB", "Interim", "Exploration")
+SLS_PHASES = (
+    {"name": "Core SRB", "burning": ["Core", "SRB"], "shutdown": ["Interim"]},
+    {
+        "name": "Core",
+        "burning": ["Core"],
+        "burnt_out": ["SRB"],
+        "shutdown": ["Interim"],
+        "jettison": ["SRB"],
+        "pitch": 90,
+        "reference_area": ["Core", "-SRB"],
+    },
+    {
+        "name": "Interim",
+        "burnt_out": ["Core", "SRB"],
+        "jettison": ["Core", "SRB"],
+        "ignite": ["Interim"],
+        "pitch": 110,
+    },
+    {
+        "name": "Exploration",
+        "burnt_out": ["Interim"],
+        "jettison": ["Interim"],
+        "ignite": ["Exploration"],
+        "pitch": 150,
+    },
+)
+
+
+class StagingTable:
+    # A vehicle's phases compiled for the step loop. Phases are integer ids into tuples of
+    # stage index tuples, and transitions[mask] is the phase entered when exactly the
+    # stages in the bit mask mask (bit i for stage i) are burnt out, -1 for none
+    def __init__(self, stage_names, phases, pitch=90):
+        stage_names = tuple(stage_names)
+        if not stage_names:
+            raise ValueError("A vehicle needs at least one stage")
+        if len(stage_names) > MAX_STAGES:
+            raise ValueError(f"A vehicle may have at most {MAX_STAGES} stages")
+        if len(set(stage_names)) != len(stage_names):
+            raise ValueError("Stage names must be unique")
+        if not phases:
+            raise ValueError("A vehicle needs at least one phase")
+        self.stage_names = stage_names
+        self.pitch = pitch
+        index = {name: position for position, name in enumerate(stage_names)}
+
+        def indices(phase, key):
+            names = phase.get(key) or []
+            for name in names:
+                if name.lstrip("-") not in index:
+                    raise ValueError(f"Unknown stage {name} in {key} of phase {phase['name']}")
+            return names
+
+        self.phase_names = tuple(phase["name"] for phase in phases)
+        if len(set(self.phase_names)) != len(self.phase_names):
+            raise ValueError("Phase names must be unique")
+        self.phase_ids = {name: phase_id for phase_id, name in enumerate(self.phase_names)}
+
+        burning = []
+        burnt_out = []
+        self.ignite = []
+        self.shutdown = []
+        self.jettison = []
+        self.pitches = []
+        self.leading = []
+        self.area_terms = []
+        for phase in phases:
+            unknown = set(phase) - set(PHASE_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown keys {sorted(unknown)} in phase {phase['name']}")
+            burning.append(_mask(index[name] for name in indices(phase, "burning")))
+            burnt_out.append(_mask(index[name] for name in indices(phase, "burnt_out")))
+            self.ignite.append(tuple(index[name] for name in indices(phase, "ignite")))
+            self.shutdown.append(tuple(index[name] for name in indices(phase, "shutdown")))
+            self.jettison.append(tuple(index[name] for name in indices(phase, "jettison")))
+            self.pitches.append(phase.get("pitch"))
+            # By default the first stage burning or ignited leads, alone setting the area
+            leading = phase.get("leading") or next(
+                iter(indices(phase, "burning") + indices(phase, "ignite")), stage_names[0]
+            )
+            if leading not in index:
+                raise ValueError(f"Unknown leading stage {leading} of phase {phase['name']}")
+            self.leading.append(index[leading])
+            # The first stage named, the other stages added and the stages subtracted
+            names = indices(phase, "reference_area") or [leading]
+            if names[0].startswith("-"):
+                raise ValueError(f"Reference area of phase {phase['name']} starts with a minus")
+            self.area_terms.append(
+                (
+                    index[names[0]],
+                    tuple(index[name] for name in names[1:] if not name.startswith("-")),
+                    tuple(index[name[1:]] for name in names[1:] if name.startswith("-")),
+                )
+            )
+
+        self.transitions = []
+        for mask in range(1 << len(stage_names)):
+            phase_id = -1
+            for candidate, (needs_fuel, needs_empty) in enumerate(zip(burning, burnt_out)):
+                if not mask & needs_fuel and mask & needs_empty == needs_empty:
+                    phase_id = candidate
+                    break
+            self.transitions.append(phase_id)
+
+    def __deepcopy__(self, memo):
+        # Never changed once compiled, so copies of a rocket share it
+        return self
+
+    def phase_for(self, prop_masses):
+        # Phase entered with these propellant masses, -1 for none
+        mask = 0
+        for index, prop_mass in enumerate(prop_masses):
+            if prop_mass <= 0:
+                mask |= 1 << index
+        return self.transitions[mask]
+
+
+def _mask(indices):
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
+
+
+SLS_STAGING = StagingTable(SLS_STAGE_NAMES, SLS_PHASES)
+
+
+def compile_vehicle(vehicle):
+    # StagingTable of a vehicle definition as returned by load_vehicle
+    return StagingTable(list(vehicle["stages"]), vehicle["phases"], vehicle.get("pitch", 90))
+
+
+def load_vehicle(path):
+    # Vehicle definition from a TOML or JSON file as a dictionary with its name, pitch,
+    # drag curve, stages by name as settings.py style dictionaries (e.g. "Dry Mass") and
+    # phases, checked by compiling it once
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise RuntimeError("Reading TOML vehicle files needs Python 3.11 or tomli")
+        with open(path, "rb") as vehicle_file:
+            definition = tomllib.load(vehicle_file)
+    else:
+        with open(path) as vehicle_file:
+            definition = json.load(vehicle_file)
+
+    directory = os.path.dirname(os.path.abspath(path))
+
+    def resolve(curve):
+        return os.path.join(directory, curve) if curve else curve
+
+    stages = {}
+    for stage in definition.get("stages", []):
+        stage = dict(stage)
+        name = stage.pop("name")
+        unknown = set(stage) - set(STAGE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in stage {name}")
+        missing = set(STAGE_KEYS) - set(stage) - {"drag_curve"}
+        if missing:
+            raise ValueError(f"Missing keys {sorted(missing)} in stage {name}")
+        settings = {STAGE_KEYS[key]: value for key, value in stage.items()}
+        settings["Drag Curve"] = resolve(settings.get("Drag Curve"))
+        stages[name] = settings
+
+    vehicle = {
+        "name": definition.get("name", os.path.splitext(os.path.basename(path))[0]),
+        "pitch": definition.get("pitch", 90),
+        "drag_curve": resolve(definition.get("drag_curve")),
+        "stages": stages,
+        "phases": [dict(phase) for phase in definition.get("phases", [])],
+    }
+    compile_vehicle(vehicle)
+    return vehicle